@@ -14,10 +14,18 @@ class AssetStartModel:
     stopLossPercentage: float = 5           # (Usar em base 100%) % Máxima de loss que ele aceita, em caso de não vender na ordem limitada
     fallBackActivated: bool = True          # Define se a estratégia de Fallback será usada (ela pode entrar comprada em mercados subindo)
 
+    # Janelas das estratégias
+    emaFastWindow: int = 7                  # EMA rápida (e período rápido do MACD)
+    emaMidWindow: int = 25                  # EMA intermediária (e período lento do MACD)
+    emaSlowWindow: int = 99                 # EMA lenta (define a condição de mercado)
+    macdSignalWindow: int = 7               # Linha de sinal do MACD
+    maFastWindow: int = 7                   # Média móvel rápida da estratégia de fallback
+    maSlowWindow: int = 40                  # Média móvel lenta da estratégia de fallback
+
     # Ajuste de tempos    
     tempoEntreTrades: int = 30 * 60    # Tempo que o bot espera para verificar o mercado (em segundos)
     delayEntreOrdens: int = 60 * 60    # Tempo que o bot espera depois de realizar uma ordem de compra ou venda (ajuda a diminuir trades de borda)
 
     buyPercentageProtection: float = 2 # (Não implementado) Quantos % abaixo do preço de compra será definida uma ordem de venda
-    tradedPercentage: float = 100 # (Não implementado) Porcentagem do total da carteira, que será negociada
+    tradedPercentage: float = 100 # Porcentagem do patrimônio (na moeda de cotação) usada em cada compra, com o PortfolioAllocator (ALOCAR_POR_PERCENTUAL); sem ele vale o tradedQuantity
     
\ No newline at end of file
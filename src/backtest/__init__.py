@@ -0,0 +1,7 @@
+# backtest/__init__.py
+from .clock import VirtualClock, WallClock
+from .exchange import MatchingEngine, SimulatedExchange, build_symbol_info
+from .replay import ReplayBacktester, ReplayResult
+from .paper import MarketFeed, PaperExchange, PaperTradingSession
+from .optimizer import ParameterOptimizer
+from .walk_forward import WalkForwardRunner, WalkForwardResult
@@ -0,0 +1,74 @@
+# backtest/clock.py
+import importlib
+import time
+from contextlib import contextmanager
+
+# Módulos do robô que leem o relógio: sleep entre ordens, prazos da reprecificação e a espera antes de
+# confirmar uma ordem inexistente
+BOT_TIME_MODULES = ("modules.BinanceRobot", "modules.OrderManager", "modules.OrderTracker")
+
+
+class VirtualClock:
+    """
+    Relógio virtual usado no replay.
+
+    Expõe a mesma interface usada do módulo `time` (time, sleep, monotonic),
+    mas `sleep` apenas avança o tempo simulado, sem bloquear.
+    """
+
+    def __init__(self, start_ms=0):
+        self.now_ms = int(start_ms)
+        self.slept_seconds = 0.0
+
+    def time(self):
+        return self.now_ms / 1000
+
+    def monotonic(self):
+        return self.now_ms / 1000
+
+    def sleep(self, seconds):
+        if seconds <= 0:
+            return
+        self.now_ms += int(seconds * 1000)
+        self.slept_seconds += seconds
+
+    def advance_to(self, timestamp_ms):
+        if timestamp_ms > self.now_ms:
+            self.now_ms = int(timestamp_ms)
+
+    @contextmanager
+    def patch(self, *modules):
+        """
+        Substitui temporariamente o atributo `time` dos módulos informados pelo relógio virtual.
+        Os módulos precisam usar `import time` e chamar `time.sleep`/`time.time`.
+        """
+        originals = [(module, module.time) for module in modules]
+        try:
+            for module in modules:
+                module.time = self
+            yield self
+        finally:
+            for module, original in originals:
+                module.time = original
+
+    def patch_bot(self):
+        """`patch` de todos os módulos do robô que usam `time` (BOT_TIME_MODULES)."""
+        return self.patch(*(importlib.import_module(name) for name in BOT_TIME_MODULES))
+
+
+class WallClock:
+    """Relógio real com a interface do VirtualClock (`now_ms`), para o paper trading ao vivo."""
+
+    @property
+    def now_ms(self):
+        return int(time.time() * 1000)
+
+    def time(self):
+        return time.time()
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
@@ -0,0 +1,180 @@
+# backtest/data.py
+import csv
+import os
+
+import numpy as np
+
+# Colunas do endpoint de klines da Binance, na ordem em que a API devolve
+KLINE_COLUMNS = ["open_time", "open_price", "high_price", "low_price", "close_price",
+                 "volume", "close_time", "quote_asset_volume", "number_of_trades",
+                 "taker_buy_base_asset_volume", "taker_buy_quote_asset_volume", "-"]
+
+
+def load_klines_csv(path):
+    """
+    Lê candles gravados em CSV no formato da API/data.binance.vision (12 colunas, com ou sem cabeçalho).
+    Retorna uma lista de klines no mesmo formato de `client.get_klines`.
+    """
+    klines = []
+    with open(path, newline="") as file:
+        for row in csv.reader(file):
+            if not row or not row[0].strip().lstrip("-").isdigit():
+                continue  # Cabeçalho ou linha vazia
+            open_time = int(row[0])
+            close_time = int(row[6])
+            # data.binance.vision usa microssegundos a partir de 2025
+            if open_time > 10**14:
+                open_time //= 1000
+                close_time //= 1000
+            klines.append([open_time, *row[1:6], close_time, *row[7:12]])
+    klines.sort(key=lambda kline: kline[0])
+    return klines
+
+
+def save_klines_csv(path, klines):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(KLINE_COLUMNS)
+        writer.writerows(klines)
+
+
+def klines_to_arrays(klines):
+    """
+    Converte uma lista de klines em arrays numpy por coluna (open_time, open, high, low, close, volume, close_time).
+    """
+    if not len(klines):
+        return {name: np.empty(0) for name in ("open_time", "open", "high", "low", "close", "volume", "close_time")}
+    table = np.asarray([kline[:7] for kline in klines], dtype=np.float64)
+    return {
+        "open_time": table[:, 0].astype(np.int64),
+        "open": table[:, 1],
+        "high": table[:, 2],
+        "low": table[:, 3],
+        "close": table[:, 4],
+        "volume": table[:, 5],
+        "close_time": table[:, 6].astype(np.int64),
+    }
+
+
+# Colunas gravadas no armazenamento colunar (uma por array no .npz)
+STORE_COLUMNS = {
+    "open_time": np.int64, "open": np.float64, "high": np.float64, "low": np.float64, "close": np.float64,
+    "volume": np.float64, "close_time": np.int64, "quote_volume": np.float64, "trades": np.int64,
+    "taker_base_volume": np.float64, "taker_quote_volume": np.float64,
+}
+
+
+def klines_to_columns(klines):
+    """Converte klines da API em arrays por coluna, com todas as colunas do armazenamento."""
+    columns = {name: np.empty(len(klines), dtype=dtype) for name, dtype in STORE_COLUMNS.items()}
+    for position, name in enumerate(STORE_COLUMNS):
+        columns[name][:] = [kline[position] for kline in klines]
+    return columns
+
+
+def columns_to_klines(columns):
+    """Converte arrays por coluna de volta para o formato de `get_klines` (preços como texto)."""
+    return [
+        [int(row[0]), f"{row[1]:.8f}", f"{row[2]:.8f}", f"{row[3]:.8f}", f"{row[4]:.8f}", f"{row[5]:.8f}",
+         int(row[6]), f"{row[7]:.8f}", int(row[8]), f"{row[9]:.8f}", f"{row[10]:.8f}", "0"]
+        for row in zip(*(columns[name] for name in STORE_COLUMNS))
+    ]
+
+
+def find_gaps(open_times, interval_ms):
+    """Retorna os buracos da série como [(último open_time antes, próximo open_time, candles faltando)]."""
+    if len(open_times) < 2:
+        return []
+    steps = np.diff(open_times)
+    positions = np.flatnonzero(steps != interval_ms)
+    return [(int(open_times[i]), int(open_times[i + 1]), int(steps[i] // interval_ms) - 1) for i in positions]
+
+
+class KlineStore:
+    """
+    Armazenamento colunar comprimido de candles: um .npz por símbolo, intervalo e mês
+    (ex.: data/klines/BTCBRL/1m/2024-01.npz). Cada coluna é um array numpy.
+
+    Os arquivos mensais permitem retomar um download do último candle salvo
+    e carregar apenas o período necessário para um backtest.
+    """
+
+    def __init__(self, root="data/klines"):
+        self.root = root
+
+    def directory(self, symbol, interval):
+        return os.path.join(self.root, symbol, interval)
+
+    def months(self, symbol, interval):
+        directory = self.directory(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith(".npz"))
+
+    def read_month(self, symbol, interval, month):
+        path = os.path.join(self.directory(symbol, interval), f"{month}.npz")
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            return {name: data[name] for name in STORE_COLUMNS}
+
+    def write_month(self, symbol, interval, month, columns):
+        """Mescla com o que já existe no mês (sem duplicar candles) e grava de forma atômica."""
+        existing = self.read_month(symbol, interval, month)
+        if existing is not None and len(existing["open_time"]):
+            merged = {name: np.concatenate([existing[name], columns[name]]) for name in STORE_COLUMNS}
+            _, unique = np.unique(merged["open_time"], return_index=True)
+            columns = {name: merged[name][unique] for name in STORE_COLUMNS}
+        directory = self.directory(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+        temporary = os.path.join(directory, f".{month}.tmp.npz")
+        np.savez_compressed(temporary, **columns)
+        os.replace(temporary, os.path.join(directory, f"{month}.npz"))
+
+    def last_open_time(self, symbol, interval):
+        for month in reversed(self.months(symbol, interval)):
+            columns = self.read_month(symbol, interval, month)
+            if columns is not None and len(columns["open_time"]):
+                return int(columns["open_time"][-1])
+        return None
+
+    def load(self, symbol, interval, start=None, end=None):
+        """Carrega as colunas entre `start` e `end` (open_time em ms, inclusive)."""
+        parts = []
+        for month in self.months(symbol, interval):
+            columns = self.read_month(symbol, interval, month)
+            mask = np.ones(len(columns["open_time"]), dtype=bool)
+            if start is not None:
+                mask &= columns["open_time"] >= start
+            if end is not None:
+                mask &= columns["open_time"] <= end
+            if mask.any():
+                parts.append({name: columns[name][mask] for name in STORE_COLUMNS})
+        if not parts:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in STORE_COLUMNS.items()}
+        return {name: np.concatenate([part[name] for part in parts]) for name in STORE_COLUMNS}
+
+    def load_klines(self, symbol, interval, start=None, end=None):
+        """Mesmo que `load`, no formato de `get_klines` (para o ReplayBacktester)."""
+        return columns_to_klines(self.load(symbol, interval, start, end))
+
+
+def verify_continuity(columns, interval_ms):
+    """
+    Verifica a consistência da série: open_time crescente, close_time coerente com o intervalo
+    e máxima/mínima envolvendo abertura e fechamento. Retorna a lista de problemas encontrados.
+    """
+    problems = []
+    open_times = columns["open_time"]
+    if len(open_times) > 1 and np.any(np.diff(open_times) <= 0):
+        problems.append("open_time fora de ordem ou duplicado")
+    if np.any(columns["close_time"] != open_times + interval_ms - 1):
+        problems.append("close_time incompatível com o intervalo")
+    # Candles semanais começam na segunda-feira, então só verifica o alinhamento até 1d
+    if interval_ms <= 86_400_000 and np.any(open_times % interval_ms != 0):
+        problems.append("open_time desalinhado do intervalo")
+    body_high = np.maximum(columns["open"], columns["close"])
+    body_low = np.minimum(columns["open"], columns["close"])
+    if np.any(columns["high"] < body_high) or np.any(columns["low"] > body_low):
+        problems.append("máxima/mínima não envolvem abertura e fechamento")
+    return problems
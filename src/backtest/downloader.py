@@ -0,0 +1,241 @@
+# backtest/downloader.py
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from binance.exceptions import BinanceAPIException
+from binance.helpers import interval_to_milliseconds
+
+from .data import KlineStore, find_gaps, klines_to_columns, verify_continuity
+
+PAGE_LIMIT = 1000          # Máximo de candles por chamada de /api/v3/klines
+PAGE_WEIGHT = 2            # Peso de /api/v3/klines
+FLUSH_PAGES = 10           # Grava o mês em disco a cada N páginas (progresso para retomar)
+RATE_LIMIT_CODES = (-1003, -1015)
+
+
+def month_start(timestamp_ms):
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    return int(datetime(moment.year, moment.month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def next_month(timestamp_ms):
+    moment = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+    year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp() * 1000)
+
+
+def month_label(timestamp_ms):
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).strftime("%Y-%m")
+
+
+def parse_date(text):
+    """Aceita 'AAAA-MM-DD' (UTC) ou timestamp em ms."""
+    if text is None:
+        return None
+    if str(text).isdigit():
+        return int(text)
+    return int(datetime.strptime(text, "%Y-%m-%d").replace(tzinfo=timezone.utc).timestamp() * 1000)
+
+
+class KlineDownloader:
+    """
+    Download em massa de candles históricos para o `KlineStore`.
+
+    O período de cada símbolo/intervalo é dividido em meses, e cada mês é uma tarefa independente
+    no pool de threads: páginas de 1000 candles com `startTime`/`endTime`, todas passando pelo mesmo
+    `RateLimiter`. Um mês já completo em disco é pulado e um mês incompleto continua do último
+    candle salvo, então o download pode ser interrompido e retomado.
+    """
+
+    def __init__(self, client, store, rate_limiter=None, max_workers=8, max_retries=5, verbose=True):
+        self.client = client
+        self.store = store
+        self.rate_limiter = rate_limiter
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.verbose = verbose
+        self.requests = 0
+        self.candles = 0
+        self._lock = threading.Lock()
+
+    # ---------------------------------------------------------------- Requisições
+
+    def _get_klines(self, **params):
+        for attempt in range(self.max_retries + 1):
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(PAGE_WEIGHT)
+            try:
+                klines = self.client.get_klines(**params)
+                with self._lock:
+                    self.requests += 1
+                self._sync_used_weight()
+                return klines
+            except BinanceAPIException as e:
+                rate_limited = e.status_code in (418, 429) or e.code in RATE_LIMIT_CODES
+                if attempt >= self.max_retries or not (rate_limited or e.status_code >= 500):
+                    raise
+                wait = self._retry_after(e) if rate_limited else 2 ** attempt
+                if self.rate_limiter is not None and rate_limited:
+                    self.rate_limiter.block_for(wait)
+                else:
+                    time.sleep(wait)
+                if self.verbose:
+                    print(f"\n⚠️ {e.message} ({params['symbol']}). Nova tentativa em {wait:.0f}s...")
+            except Exception as e:
+                # Falhas de rede: espera exponencial
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+                if self.verbose:
+                    print(f"\n⚠️ Erro de conexão ({params['symbol']}): {e}. Tentando novamente...")
+
+    @staticmethod
+    def _retry_after(error):
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            return float(headers.get("Retry-After", 60))
+        except (TypeError, ValueError):
+            return 60.0
+
+    def _sync_used_weight(self):
+        response = getattr(self.client, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        used = headers.get("x-mbx-used-weight-1m")
+        if used is not None and self.rate_limiter is not None:
+            self.rate_limiter.update_used_weight(used)
+
+    def first_open_time(self, symbol, interval):
+        """Primeiro candle disponível do par (evita paginar anos antes da listagem)."""
+        klines = self._get_klines(symbol=symbol, interval=interval, startTime=0, limit=1)
+        return int(klines[0][0]) if klines else None
+
+    # ---------------------------------------------------------------- Download
+
+    def _month_tasks(self, symbol, interval, start, end):
+        interval_ms = interval_to_milliseconds(interval)
+        first = self.first_open_time(symbol, interval)
+        if first is None:
+            return []
+        start = max(start or first, first)
+        tasks = []
+        month = month_start(start)
+        while month <= end:
+            month_end = min(next_month(month), end + 1) - 1
+            begin = max(month, start)
+            saved = self.store.read_month(symbol, interval, month_label(month))
+            if saved is not None and len(saved["open_time"]):
+                last = int(saved["open_time"][-1])
+                # Mês completo: o último candle salvo é o último esperado no período
+                if last + interval_ms > month_end:
+                    month = next_month(month)
+                    continue
+                begin = max(begin, last + interval_ms)
+            tasks.append((symbol, interval, begin, month_end))
+            month = next_month(month)
+        return tasks
+
+    def _download_month(self, symbol, interval, begin, end):
+        interval_ms = interval_to_milliseconds(interval)
+        label = month_label(begin)
+        pending, pages, total = [], 0, 0
+        cursor = begin
+        while cursor <= end:
+            klines = self._get_klines(symbol=symbol, interval=interval, startTime=cursor, endTime=end,
+                                      limit=PAGE_LIMIT)
+            if not klines:
+                break
+            pending.extend(klines)
+            pages += 1
+            cursor = int(klines[-1][0]) + interval_ms
+            if pages % FLUSH_PAGES == 0:
+                self.store.write_month(symbol, interval, label, klines_to_columns(pending))
+                total += len(pending)
+                pending = []
+            if len(klines) < PAGE_LIMIT:
+                break
+        if pending:
+            self.store.write_month(symbol, interval, label, klines_to_columns(pending))
+            total += len(pending)
+        with self._lock:
+            self.candles += total
+        return total
+
+    def download(self, symbols, intervals, start=None, end=None):
+        """
+        Baixa os candles de todos os pares e intervalos entre `start` e `end` (ms).
+        Sem `end`, vai até o último candle fechado.
+        """
+        started = time.perf_counter()
+        end = end or int(time.time() * 1000)
+        tasks = []
+        for symbol in symbols:
+            for interval in intervals:
+                last_closed = (end // interval_to_milliseconds(interval)) * interval_to_milliseconds(interval) - 1
+                tasks.extend(self._month_tasks(symbol, interval, start, min(end, last_closed)))
+
+        if self.verbose:
+            print(f"⬇️ {len(tasks)} meses para baixar ({len(symbols)} pares x {len(intervals)} intervalos)")
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._download_month, *task): task for task in tasks}
+            for future in as_completed(futures):
+                symbol, interval, begin, _ = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"\n❌ Falha em {symbol} {interval} {month_label(begin)}: {e}")
+                done += 1
+                if self.verbose:
+                    print(f"\r⬇️ {done}/{len(tasks)} meses | {self.candles} candles | {self.requests} requisições | "
+                          f"{time.perf_counter() - started:.0f}s", end="", flush=True)
+        if self.verbose:
+            print()
+        return self.report(symbols, intervals)
+
+    def report(self, symbols, intervals):
+        """Verifica continuidade e buracos de cada série salva."""
+        report = {}
+        for symbol in symbols:
+            for interval in intervals:
+                interval_ms = interval_to_milliseconds(interval)
+                columns = self.store.load(symbol, interval)
+                gaps = find_gaps(columns["open_time"], interval_ms)
+                problems = verify_continuity(columns, interval_ms)
+                report[(symbol, interval)] = {"candles": len(columns["open_time"]), "gaps": gaps, "problems": problems}
+                if self.verbose:
+                    missing = sum(gap[2] for gap in gaps)
+                    status = "✅" if not problems else "⚠️"
+                    print(f"{status} {symbol} {interval}: {len(columns['open_time'])} candles | "
+                          f"{len(gaps)} buracos ({missing} candles faltando)"
+                          + (f" | {'; '.join(problems)}" if problems else ""))
+        return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download em massa de candles históricos da Binance.")
+    parser.add_argument("symbols", nargs="+", help="Pares, ex.: BTCBRL ETHBRL")
+    parser.add_argument("--intervals", nargs="+", default=["1m"], help="Intervalos, ex.: 1m 15m 1h")
+    parser.add_argument("--start", help="Data inicial (AAAA-MM-DD, UTC). Padrão: listagem do par")
+    parser.add_argument("--end", help="Data final (AAAA-MM-DD, UTC). Padrão: agora")
+    parser.add_argument("--root", default="data/klines", help="Diretório do armazenamento")
+    parser.add_argument("--workers", type=int, default=8, help="Threads de download")
+    parser.add_argument("--weight", type=int, default=6000, help="Limite de peso por minuto da conta/IP")
+    args = parser.parse_args(argv)
+
+    from modules.BinanceClient import BinanceClient
+    from modules.RateLimiter import RateLimiter
+
+    # Candles são públicos: sem chaves, sem sincronização de horário e sem ping inicial
+    client = BinanceClient(sync=False, ping=False)
+    downloader = KlineDownloader(client, KlineStore(args.root), RateLimiter(args.weight), max_workers=args.workers)
+    downloader.download([symbol.upper() for symbol in args.symbols], args.intervals,
+                        start=parse_date(args.start), end=parse_date(args.end))
+
+
+if __name__ == "__main__":
+    # Executar a partir de src/: python -m backtest.downloader BTCBRL ETHBRL --intervals 1m 1h --start 2021-01-01
+    main()
@@ -0,0 +1,509 @@
+# backtest/exchange.py
+import json
+from decimal import Decimal, ROUND_FLOOR
+
+from binance.exceptions import BinanceAPIException
+
+
+def _api_error(code, message):
+    # Reaproveita a exceção do python-binance para que o bot trate o erro como em produção
+    return BinanceAPIException(None, 400, json.dumps({"code": code, "msg": message}))
+
+
+def _floor_to_step(value, step):
+    step = Decimal(str(step))
+    return float((Decimal(str(value)) / step).to_integral_value(rounding=ROUND_FLOOR) * step)
+
+
+def _fmt(value):
+    return f"{value:.8f}"
+
+
+def build_symbol_info(symbol, base_asset, quote_asset, tick_size=0.01, step_size=0.00001, min_notional=10.0):
+    """
+    Monta um `symbol_info` no mesmo formato do exchangeInfo da Binance (apenas os filtros usados pelo bot).
+    """
+    return {
+        "symbol": symbol,
+        "status": "TRADING",
+        "baseAsset": base_asset,
+        "quoteAsset": quote_asset,
+        "orderTypes": ["LIMIT", "LIMIT_MAKER", "MARKET", "STOP_LOSS_LIMIT", "TAKE_PROFIT_LIMIT"],
+        "filters": [
+            {"filterType": "PRICE_FILTER", "minPrice": _fmt(tick_size), "maxPrice": "1000000000.00000000", "tickSize": _fmt(tick_size)},
+            {"filterType": "LOT_SIZE", "minQty": _fmt(step_size), "maxQty": "9000000.00000000", "stepSize": _fmt(step_size)},
+            {"filterType": "NOTIONAL", "minNotional": _fmt(min_notional), "applyMinToMarket": True,
+             "maxNotional": "9000000.00000000", "applyMaxToMarket": False, "avgPriceMins": 5},
+        ],
+    }
+
+
+class MatchingEngine:
+    """
+    Motor de casamento local: saldos, ordens e execuções simuladas.
+
+    Não conhece a origem dos preços. Quem o alimenta (replay de candles ou mercado ao vivo)
+    chama `match_candle` a cada candle fechado e `set_last_price` quando houver preço novo.
+    As respostas seguem o formato da API da Binance para que o bot não perceba a diferença.
+    """
+
+    def __init__(self, clock, fee_rate=0.001, slippage=0.0005, participation_rate=0.1, latency_ms=0):
+        self.clock = clock
+        self.fee_rate = fee_rate                      # Taxa cobrada sobre o ativo recebido
+        self.slippage = slippage                      # Deslize aplicado às ordens a mercado
+        self.participation_rate = participation_rate  # Fração do volume do candle disponível para nossas ordens
+        self.latency_ms = latency_ms                  # Atraso até a ordem chegar ao livro (transactTime e candles elegíveis)
+        self.symbols = {}
+        self.balances = {}
+        self.orders = {}
+        self.last_price = {}
+        self._open_ids = {}
+        self.trades = []                              # Execuções no formato do myTrades
+        self._next_order_id = 1
+        self._next_trade_id = 1
+
+    # ---------------------------------------------------------------- Configuração
+
+    def add_symbol(self, symbol_info):
+        filters = {f["filterType"]: f for f in symbol_info["filters"]}
+        notional = filters.get("NOTIONAL") or filters.get("MIN_NOTIONAL") or {}
+        self.symbols[symbol_info["symbol"]] = {
+            "info": symbol_info,
+            "base": symbol_info["baseAsset"],
+            "quote": symbol_info["quoteAsset"],
+            "tick_size": float(filters["PRICE_FILTER"]["tickSize"]),
+            "step_size": float(filters["LOT_SIZE"]["stepSize"]),
+            "min_qty": float(filters["LOT_SIZE"]["minQty"]),
+            "min_notional": float(notional.get("minNotional", 0)),
+        }
+        self._open_ids.setdefault(symbol_info["symbol"], [])
+
+    def set_balance(self, asset, free, locked=0.0):
+        self.balances[asset] = {"free": float(free), "locked": float(locked)}
+
+    def set_last_price(self, symbol, price):
+        self.last_price[symbol] = float(price)
+
+    def _balance(self, asset):
+        return self.balances.setdefault(asset, {"free": 0.0, "locked": 0.0})
+
+    # ---------------------------------------------------------------- Ordens
+
+    def create_order(self, **params):
+        symbol = params["symbol"]
+        if symbol not in self.symbols:
+            raise _api_error(-1121, "Invalid symbol.")
+        rules = self.symbols[symbol]
+        side = params["side"]
+        order_type = params["type"]
+
+        quantity = _floor_to_step(float(params["quantity"]), rules["step_size"])
+        if quantity < rules["min_qty"] or quantity <= 0:
+            raise _api_error(-1013, "Filter failure: LOT_SIZE")
+
+        client_order_id = params.get("newClientOrderId") or f"sim-{self._next_order_id}"
+        for order_id in self._open_ids[symbol]:
+            if self.orders[order_id]["clientOrderId"] == client_order_id:
+                raise _api_error(-2010, "Duplicate order sent.")
+
+        last_price = self.last_price.get(symbol)
+        if last_price is None:
+            raise _api_error(-1013, "Market is closed.")
+
+        price = 0.0
+        stop_price = 0.0
+        if order_type in ("LIMIT", "LIMIT_MAKER", "STOP_LOSS_LIMIT", "TAKE_PROFIT_LIMIT"):
+            price = _floor_to_step(float(params["price"]), rules["tick_size"])
+        if order_type in ("STOP_LOSS", "STOP_LOSS_LIMIT", "TAKE_PROFIT", "TAKE_PROFIT_LIMIT"):
+            stop_price = _floor_to_step(float(params["stopPrice"]), rules["tick_size"])
+
+        reference_price = price if price else last_price
+        if quantity * reference_price < rules["min_notional"]:
+            raise _api_error(-1013, "Filter failure: NOTIONAL")
+
+        # Preço usado para reservar o saldo (a mercado reserva com folga do deslize)
+        lock_price = reference_price if price else last_price * (1 + self.slippage)
+        if side == "BUY":
+            lock_asset, lock_amount = rules["quote"], quantity * lock_price
+        else:
+            lock_asset, lock_amount = rules["base"], quantity
+        balance = self._balance(lock_asset)
+        if balance["free"] + 1e-12 < lock_amount:
+            raise _api_error(-2010, "Account has insufficient balance for requested action.")
+        balance["free"] -= lock_amount
+        balance["locked"] += lock_amount
+
+        now = self.clock.now_ms + self.latency_ms
+        order = {
+            "symbol": symbol,
+            "orderId": self._next_order_id,
+            "orderListId": -1,
+            "clientOrderId": client_order_id,
+            "price": price,
+            "origQty": quantity,
+            "executedQty": 0.0,
+            "cummulativeQuoteQty": 0.0,
+            "status": "NEW",
+            "timeInForce": params.get("timeInForce", "GTC"),
+            "type": order_type,
+            "side": side,
+            "stopPrice": stop_price,
+            "time": now,
+            "updateTime": now,
+            "isWorking": order_type not in ("STOP_LOSS", "STOP_LOSS_LIMIT", "TAKE_PROFIT", "TAKE_PROFIT_LIMIT"),
+            "lock_price": lock_price,
+            "fills": [],
+        }
+        self._next_order_id += 1
+        self.orders[order["orderId"]] = order
+        self._open_ids[symbol].append(order["orderId"])
+
+        if order_type == "MARKET":
+            fill_price = last_price * (1 + self.slippage) if side == "BUY" else last_price * (1 - self.slippage)
+            self._fill(order, quantity, fill_price)
+        elif order_type in ("LIMIT", "LIMIT_MAKER") and self._is_marketable(order, last_price):
+            if order_type == "LIMIT_MAKER":
+                self._release(order)
+                order["status"] = "EXPIRED"
+                self._open_ids[symbol].remove(order["orderId"])
+            else:
+                self._fill(order, quantity, last_price)
+
+        return self._render(order, transact_time=now)
+
+    @staticmethod
+    def _is_marketable(order, price):
+        return price <= order["price"] if order["side"] == "BUY" else price >= order["price"]
+
+    def _fill(self, order, quantity, price):
+        rules = self.symbols[order["symbol"]]
+        base, quote = self._balance(rules["base"]), self._balance(rules["quote"])
+        notional = quantity * price
+        if order["side"] == "BUY":
+            reserved = quantity * order["lock_price"]
+            quote["locked"] -= reserved
+            quote["free"] += reserved - notional
+            commission = quantity * self.fee_rate
+            base["free"] += quantity - commission
+            commission_asset = rules["base"]
+        else:
+            base["locked"] -= quantity
+            commission = notional * self.fee_rate
+            quote["free"] += notional - commission
+            commission_asset = rules["quote"]
+
+        order["executedQty"] += quantity
+        order["cummulativeQuoteQty"] += notional
+        order["updateTime"] = self.clock.now_ms
+        order["fills"].append({
+            "price": _fmt(price),
+            "qty": _fmt(quantity),
+            "commission": _fmt(commission),
+            "commissionAsset": commission_asset,
+            "tradeId": self._next_trade_id,
+        })
+        self.trades.append({
+            "symbol": order["symbol"], "id": self._next_trade_id, "orderId": order["orderId"], "orderListId": -1,
+            "price": _fmt(price), "qty": _fmt(quantity), "quoteQty": _fmt(notional), "commission": _fmt(commission),
+            "commissionAsset": commission_asset, "time": self.clock.now_ms, "isBuyer": order["side"] == "BUY",
+            "isMaker": order["type"] != "MARKET", "isBestMatch": True,
+        })
+        self._next_trade_id += 1
+
+        if order["origQty"] - order["executedQty"] <= rules["step_size"] / 2:
+            order["status"] = "FILLED"
+            self._release(order)
+            self._open_ids[order["symbol"]].remove(order["orderId"])
+        else:
+            order["status"] = "PARTIALLY_FILLED"
+
+    def _release(self, order):
+        # Devolve ao saldo livre o que ainda estava reservado para a ordem
+        rules = self.symbols[order["symbol"]]
+        remaining = order["origQty"] - order["executedQty"]
+        if order["side"] == "BUY":
+            asset, amount = rules["quote"], remaining * order["lock_price"]
+        else:
+            asset, amount = rules["base"], remaining
+        balance = self._balance(asset)
+        amount = min(max(amount, 0.0), balance["locked"])
+        balance["locked"] -= amount
+        balance["free"] += amount
+
+    def cancel_order(self, symbol, orderId=None, origClientOrderId=None):
+        order = self._find(symbol, orderId, origClientOrderId)
+        if order is None or order["orderId"] not in self._open_ids[symbol]:
+            raise _api_error(-2011, "Unknown order sent.")
+        self._release(order)
+        order["status"] = "CANCELED"
+        order["updateTime"] = self.clock.now_ms
+        self._open_ids[symbol].remove(order["orderId"])
+        return self._render(order)
+
+    def cancel_replace_order(self, **params):
+        """
+        Cancela e recria numa única chamada (endpoint order/cancelReplace, modo STOP_ON_FAILURE):
+        se o cancelamento falha (ordem já executada), a nova ordem não é criada.
+        """
+        symbol = params["symbol"]
+        cancel_response = self.cancel_order(symbol, orderId=params.get("cancelOrderId"),
+                                            origClientOrderId=params.get("cancelOrigClientOrderId"))
+        new_params = {key: value for key, value in params.items()
+                      if key not in ("cancelReplaceMode", "cancelOrderId", "cancelOrigClientOrderId")}
+        return {"cancelResult": "SUCCESS", "newOrderResult": "SUCCESS",
+                "cancelResponse": cancel_response, "newOrderResponse": self.create_order(**new_params)}
+
+    def _find(self, symbol, orderId=None, origClientOrderId=None):
+        if orderId is not None:
+            order = self.orders.get(int(orderId))
+            return order if order is not None and order["symbol"] == symbol else None
+        for order in self.orders.values():
+            if order["symbol"] == symbol and order["clientOrderId"] == origClientOrderId:
+                return order
+        return None
+
+    def get_order(self, symbol, orderId=None, origClientOrderId=None):
+        order = self._find(symbol, orderId, origClientOrderId)
+        if order is None:
+            raise _api_error(-2013, "Order does not exist.")
+        return self._render(order)
+
+    def get_open_orders(self, symbol=None):
+        symbols = [symbol] if symbol else list(self._open_ids)
+        return [self._render(self.orders[order_id]) for s in symbols for order_id in self._open_ids.get(s, [])]
+
+    def get_all_orders(self, symbol, limit=500, orderId=None):
+        orders = [order for order in self.orders.values() if order["symbol"] == symbol]
+        if orderId is not None:
+            orders = [order for order in orders if order["orderId"] >= int(orderId)][:limit]
+        else:
+            orders = orders[-limit:]
+        return [self._render(order) for order in orders]
+
+    def get_my_trades(self, symbol, orderId=None, limit=500):
+        trades = [trade for trade in self.trades if trade["symbol"] == symbol
+                  and (orderId is None or trade["orderId"] == int(orderId))]
+        return [dict(trade) for trade in trades[-limit:]]
+
+    # ---------------------------------------------------------------- Mercado
+
+    def match_candle(self, symbol, open_time, open_price, high, low, close, volume, close_time=None):
+        """
+        Executa as ordens abertas do símbolo contra um candle fechado.
+        Compras limitadas executam quando a mínima toca o preço e vendas quando a máxima toca,
+        limitadas a `participation_rate` do volume do candle (gera execuções parciais).
+        Com `close_time`, ordens que só chegam ao livro depois do fechamento (latência) ficam para o próximo.
+        """
+        available = volume * self.participation_rate
+        for order_id in list(self._open_ids.get(symbol, [])):
+            order = self.orders[order_id]
+            if close_time is not None and order["time"] > close_time:
+                continue
+            # Ordens criadas durante o candle não aproveitam um gap de abertura,
+            # pois não sabemos o que aconteceu antes da criação
+            gap_allowed = order["time"] < open_time
+
+            if not order["isWorking"]:
+                triggered = low <= order["stopPrice"] if order["side"] == "SELL" else high >= order["stopPrice"]
+                if not triggered:
+                    continue
+                order["isWorking"] = True
+                gap_allowed = False
+
+            if order["side"] == "BUY" and low <= order["price"]:
+                fill_price = min(order["price"], open_price) if gap_allowed else order["price"]
+            elif order["side"] == "SELL" and high >= order["price"]:
+                fill_price = max(order["price"], open_price) if gap_allowed else order["price"]
+            else:
+                continue
+
+            remaining = order["origQty"] - order["executedQty"]
+            quantity = _floor_to_step(min(remaining, available), self.symbols[symbol]["step_size"])
+            if quantity <= 0:
+                continue
+            available -= quantity
+            self._fill(order, quantity, fill_price)
+
+        self.set_last_price(symbol, close)
+
+    def equity(self, quote_asset):
+        """Patrimônio total avaliado na moeda de cotação, usando o último preço de cada símbolo."""
+        total = 0.0
+        for asset, balance in self.balances.items():
+            amount = balance["free"] + balance["locked"]
+            if asset == quote_asset:
+                total += amount
+                continue
+            for symbol, rules in self.symbols.items():
+                if rules["base"] == asset and rules["quote"] == quote_asset and symbol in self.last_price:
+                    total += amount * self.last_price[symbol]
+                    break
+        return total
+
+    def get_account(self):
+        return {
+            "makerCommission": int(self.fee_rate * 10000),
+            "takerCommission": int(self.fee_rate * 10000),
+            "canTrade": True,
+            "canWithdraw": False,
+            "canDeposit": False,
+            "updateTime": self.clock.now_ms,
+            "accountType": "SPOT",
+            "balances": [
+                {"asset": asset, "free": _fmt(balance["free"]), "locked": _fmt(balance["locked"])}
+                for asset, balance in self.balances.items()
+            ],
+            "permissions": ["SPOT"],
+        }
+
+    def _render(self, order, transact_time=None):
+        rendered = {
+            "symbol": order["symbol"],
+            "orderId": order["orderId"],
+            "orderListId": order["orderListId"],
+            "clientOrderId": order["clientOrderId"],
+            "price": _fmt(order["price"]),
+            "origQty": _fmt(order["origQty"]),
+            "executedQty": _fmt(order["executedQty"]),
+            "cummulativeQuoteQty": _fmt(order["cummulativeQuoteQty"]),
+            "status": order["status"],
+            "timeInForce": order["timeInForce"],
+            "type": order["type"],
+            "side": order["side"],
+            "stopPrice": _fmt(order["stopPrice"]),
+            "time": order["time"],
+            "updateTime": order["updateTime"],
+            "isWorking": order["isWorking"],
+            "workingTime": order["time"],
+            "origQuoteOrderQty": "0.00000000",
+            "selfTradePreventionMode": "EXPIRE_MAKER",
+        }
+        if transact_time is not None:
+            # Resposta de criação de ordem (formato FULL)
+            rendered["transactTime"] = transact_time
+            rendered["fills"] = list(order["fills"])
+        return rendered
+
+
+class SimulatedExchange:
+    """
+    Cliente simulado alimentado por candles gravados.
+
+    Implementa os métodos do `BinanceClient` usados pelo `BinanceTraderBot`. A cada chamada,
+    os candles fechados até o instante do relógio virtual são repassados ao `MatchingEngine`,
+    e `get_klines` só devolve candles já fechados (sem olhar o futuro).
+    """
+
+    def __init__(self, clock, interval, fee_rate=0.001, slippage=0.0005, participation_rate=0.1):
+        self.clock = clock
+        self.interval = interval
+        self.engine = MatchingEngine(clock, fee_rate=fee_rate, slippage=slippage, participation_rate=participation_rate)
+        self.klines = {}
+        self._cursor = {}
+        self.timestamp_offset = 0
+        self.request_count = 0
+
+    def add_symbol(self, symbol_info, klines):
+        symbol = symbol_info["symbol"]
+        self.engine.add_symbol(symbol_info)
+        self.klines[symbol] = klines
+        self._cursor[symbol] = 0
+        self._sync()
+
+    def set_balance(self, asset, free, locked=0.0):
+        self.engine.set_balance(asset, free, locked)
+
+    def _sync(self):
+        now = self.clock.now_ms
+        for symbol, klines in self.klines.items():
+            cursor = self._cursor[symbol]
+            while cursor < len(klines) and int(klines[cursor][6]) <= now:
+                kline = klines[cursor]
+                self.engine.match_candle(symbol, int(kline[0]), float(kline[1]), float(kline[2]),
+                                         float(kline[3]), float(kline[4]), float(kline[5]))
+                cursor += 1
+            self._cursor[symbol] = cursor
+
+    def _call(self):
+        self.request_count += 1
+        self._sync()
+
+    @property
+    def finished(self):
+        return all(self._cursor[symbol] >= len(klines) for symbol, klines in self.klines.items())
+
+    # ---------------------------------------------------------------- Endpoints públicos
+
+    def ping(self):
+        self._call()
+        return {}
+
+    def get_server_time(self):
+        self._call()
+        return {"serverTime": self.clock.now_ms}
+
+    def get_symbol_info(self, symbol):
+        self._call()
+        rules = self.engine.symbols.get(symbol)
+        return rules["info"] if rules else None
+
+    def get_exchange_info(self):
+        self._call()
+        return {"timezone": "UTC", "serverTime": self.clock.now_ms, "rateLimits": [],
+                "symbols": [rules["info"] for rules in self.engine.symbols.values()]}
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        self._call()
+        if interval != self.interval:
+            raise _api_error(-1120, f"Intervalo {interval} não gravado (disponível: {self.interval}).")
+        klines = self.klines[symbol]
+        cursor = self._cursor[symbol]
+        if startTime is None and endTime is None:
+            return klines[max(0, cursor - limit):cursor]
+        closed = [k for k in klines[:cursor]
+                  if (startTime is None or int(k[0]) >= startTime) and (endTime is None or int(k[0]) <= endTime)]
+        return closed[:limit] if startTime is not None else closed[-limit:]
+
+    def get_symbol_ticker(self, symbol=None):
+        self._call()
+        if symbol:
+            return {"symbol": symbol, "price": _fmt(self.engine.last_price.get(symbol, 0.0))}
+        return self.get_all_tickers()
+
+    def get_all_tickers(self):
+        self._call()
+        return [{"symbol": symbol, "price": _fmt(price)} for symbol, price in self.engine.last_price.items()]
+
+    # ---------------------------------------------------------------- Endpoints assinados
+
+    def get_account(self):
+        self._call()
+        return self.engine.get_account()
+
+    def create_order(self, **params):
+        self._call()
+        return self.engine.create_order(**params)
+
+    def cancel_order(self, symbol, orderId=None, origClientOrderId=None):
+        self._call()
+        return self.engine.cancel_order(symbol, orderId=orderId, origClientOrderId=origClientOrderId)
+
+    def cancel_replace_order(self, **params):
+        self._call()
+        return self.engine.cancel_replace_order(**params)
+
+    def get_order(self, symbol, orderId=None, origClientOrderId=None):
+        self._call()
+        return self.engine.get_order(symbol, orderId=orderId, origClientOrderId=origClientOrderId)
+
+    def get_open_orders(self, symbol=None):
+        self._call()
+        return self.engine.get_open_orders(symbol)
+
+    def get_all_orders(self, symbol, limit=500, orderId=None):
+        self._call()
+        return self.engine.get_all_orders(symbol, limit=limit, orderId=orderId)
+
+    def get_my_trades(self, symbol, orderId=None, limit=500):
+        self._call()
+        return self.engine.get_my_trades(symbol, orderId=orderId, limit=limit)
@@ -0,0 +1,290 @@
+# backtest/optimizer.py
+import itertools
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+
+import numpy as np
+
+from .data import klines_to_arrays
+from .vectorized import DEFAULT_LOOKBACK, DEFAULT_PARAMS, IndicatorCache, run_backtest
+
+WINDOW_PARAMS = ("emaFastWindow", "emaMidWindow", "emaSlowWindow", "macdSignalWindow")
+METRICS = ("total_return", "max_drawdown", "trades", "win_rate", "return_drawdown")
+
+
+class SharedCandles:
+    """
+    Disponibiliza os candles aos processos do pool por arquivos .npy mapeados em memória.
+
+    Cada símbolo vira um array (2, n) com máxima e fechamento. Os workers abrem com
+    `mmap_mode='r'`, então o sistema operacional compartilha as mesmas páginas entre processos.
+    """
+
+    def __init__(self, candles_by_symbol, directory=None):
+        self._owned = directory is None
+        self.directory = directory or tempfile.mkdtemp(prefix="bot_candles_")
+        self.lengths = {}
+        for symbol, candles in candles_by_symbol.items():
+            if not isinstance(candles, dict):
+                candles = klines_to_arrays(candles)
+            table = np.vstack([np.asarray(candles["high"], dtype=np.float64),
+                               np.asarray(candles["close"], dtype=np.float64)])
+            np.save(self.path(self.directory, symbol), table)
+            self.lengths[symbol] = table.shape[1]
+
+    @staticmethod
+    def path(directory, symbol):
+        return os.path.join(directory, f"{symbol}.npy")
+
+    @staticmethod
+    def open(directory, symbol):
+        table = np.load(SharedCandles.path(directory, symbol), mmap_mode="r")
+        return {"high": table[0], "close": table[1]}
+
+    def close(self):
+        if self._owned:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Estado de cada processo do pool (candles mapeados e cache de indicadores)
+_worker = {}
+
+
+def _init_worker(directory, symbols, lookback, fee_rate, slippage):
+    _worker["candles"] = {symbol: SharedCandles.open(directory, symbol) for symbol in symbols}
+    _worker["cache"] = IndicatorCache()
+    _worker["options"] = {"lookback": lookback, "fee_rate": fee_rate, "slippage": slippage}
+
+
+def _evaluate_batch(batch):
+    results = []
+    for combo_id, symbol, params, start, end in batch:
+        result = run_backtest(_worker["candles"][symbol], params, cache=_worker["cache"], symbol=symbol,
+                              start=start, end=end, **_worker["options"])
+        results.append((combo_id, symbol, result.metrics()))
+    return results
+
+
+def valid_combination(params):
+    return params["emaFastWindow"] < params["emaMidWindow"] < params["emaSlowWindow"]
+
+
+def grid_size(param_grid):
+    return int(np.prod([len(values) for values in param_grid.values()], dtype=np.int64))
+
+
+def grid_combinations(param_grid):
+    names = list(param_grid)
+    for values in itertools.product(*param_grid.values()):
+        params = {**DEFAULT_PARAMS, **dict(zip(names, values))}
+        if valid_combination(params):
+            yield params
+
+
+def random_combinations(param_grid, n_samples, seed=None):
+    rng = random.Random(seed)
+    total = grid_size(param_grid)
+    items = list(param_grid.items())
+    combinations, seen = [], set()
+    # Amostra índices da grade sem montá-la inteira
+    while len(combinations) < min(n_samples, total) and len(seen) < total:
+        index = rng.randrange(total)
+        if index in seen:
+            continue
+        seen.add(index)
+        params = dict(DEFAULT_PARAMS)
+        for name, values in reversed(items):
+            index, position = divmod(index, len(values))
+            params[name] = values[position]
+        if valid_combination(params):
+            combinations.append(params)
+    return combinations
+
+
+class ParameterOptimizer:
+    """
+    Otimizador de parâmetros do AssetStartModel (busca em grade, aleatória e successive halving).
+
+    Os backtests vetorizados rodam em um pool de processos. Os candles são compartilhados por
+    arquivos mapeados em memória e as tarefas são agrupadas por janelas de indicadores, para que
+    cada processo reaproveite as séries do seu `IndicatorCache`. Os resultados vão para uma tabela
+    SQLite (`optimization_results`) que pode ser consultada depois.
+
+    Exemplo de grade:
+        {"stopLossPercentage": [1, 2, 3], "emaFastWindow": [5, 7, 9], "emaMidWindow": [21, 25]}
+    """
+
+    def __init__(self, candles_by_symbol, param_grid, max_workers=None, db_path="optimizer_results.db",
+                 objective="return_drawdown", lookback=DEFAULT_LOOKBACK, fee_rate=0.001, slippage=0.002,
+                 verbose=True):
+        unknown = set(param_grid) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"Parâmetros não suportados pela simulação: {', '.join(sorted(unknown))}")
+        if objective not in METRICS:
+            raise ValueError(f"Objetivo inválido: {objective}. Use um de {METRICS}")
+        self.candles_by_symbol = candles_by_symbol
+        self.param_grid = {name: list(values) for name, values in param_grid.items()}
+        self.param_names = list(DEFAULT_PARAMS)
+        self.max_workers = max_workers or os.cpu_count()
+        self.db_path = db_path
+        self.objective = objective
+        self.lookback = lookback
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.verbose = verbose
+        self._create_table()
+
+    # ---------------------------------------------------------------- Geração de combinações
+
+    @property
+    def grid_size(self):
+        return grid_size(self.param_grid)
+
+    def grid_combinations(self):
+        return grid_combinations(self.param_grid)
+
+    def random_combinations(self, n_samples, seed=None):
+        return random_combinations(self.param_grid, n_samples, seed)
+
+    # ---------------------------------------------------------------- Buscas
+
+    def grid_search(self):
+        return self._run("grid", list(self.grid_combinations()))
+
+    def random_search(self, n_samples, seed=None):
+        return self._run("random", self.random_combinations(n_samples, seed))
+
+    def successive_halving(self, n_samples, eta=3, min_fraction=None, seed=None):
+        """
+        Avalia muitas combinações em uma fração recente do histórico e mantém apenas o melhor 1/eta
+        em cada etapa, multiplicando a fração de dados por eta até usar o histórico completo.
+        """
+        combinations = self.random_combinations(n_samples, seed)
+        rounds = max(1, int(np.ceil(np.log(max(len(combinations), 1)) / np.log(eta))))
+        fraction = min_fraction or eta ** -(rounds - 1)
+        run_id = uuid.uuid4().hex[:12]
+        ranking = []
+        # Um pool para todas as etapas: cada worker mantém o seu IndicatorCache de uma etapa para a outra
+        with self._pool() as pool:
+            for stage in range(rounds):
+                fraction = min(1.0, fraction)
+                ranking = self._run("halving", combinations, fraction=fraction, stage=stage, run_id=run_id, pool=pool)
+                keep = max(1, len(ranking) // eta)
+                if fraction >= 1.0 or len(ranking) <= 1:
+                    break
+                combinations = [row["params"] for row in ranking[:keep]]
+                fraction *= eta
+        return ranking
+
+    @contextmanager
+    def _pool(self):
+        """Candles em arquivos mapeados e o pool de processos que os lê (cada worker com o seu IndicatorCache)."""
+        with SharedCandles(self.candles_by_symbol) as shared:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(shared.directory, list(shared.lengths), self.lookback,
+                                               self.fee_rate, self.slippage)) as pool:
+                yield pool
+
+    def _run(self, method, combinations, fraction=1.0, stage=0, run_id=None, pool=None):
+        run_id = run_id or uuid.uuid4().hex[:12]
+        started = time.perf_counter()
+        tasks = []
+        for symbol, length in self._lengths().items():
+            history = length - (self.lookback - 1)
+            start = length - max(2, int(history * fraction))
+            for combo_id, params in enumerate(combinations):
+                tasks.append((combo_id, symbol, params, start, length))
+
+        # Agrupa por símbolo e janelas para aproveitar o cache de indicadores de cada processo
+        tasks.sort(key=lambda task: (task[1], tuple(task[2][name] for name in WINDOW_PARAMS)))
+        batch_size = max(1, min(500, len(tasks) // (self.max_workers * 4) or 1))
+        batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+
+        per_combo = {}
+        done = 0
+        with (nullcontext(pool) if pool is not None else self._pool()) as pool, sqlite3.connect(self.db_path) as db:
+            futures = [pool.submit(_evaluate_batch, batch) for batch in batches]
+            for future in as_completed(futures):
+                rows = []
+                for combo_id, symbol, metrics in future.result():
+                    params = combinations[combo_id]
+                    per_combo.setdefault(combo_id, []).append(metrics)
+                    rows.append(self._row(run_id, method, stage, symbol, params, metrics, fraction))
+                self._insert(db, rows)
+                done += len(rows)
+                if self.verbose:
+                    print(f"\r🔎 Otimização [{method}/{stage}]: {done}/{len(tasks)} backtests", end="", flush=True)
+
+        ranking = []
+        for combo_id, metrics_list in per_combo.items():
+            summary = {name: float(np.mean([m[name] for m in metrics_list])) for name in METRICS}
+            ranking.append({"params": combinations[combo_id], **summary})
+        ranking.sort(key=lambda row: row[self.objective], reverse=True)
+        if self.verbose:
+            print(f"\n✅ {len(combinations)} combinações x {len(self._lengths())} símbolos em "
+                  f"{time.perf_counter() - started:.1f}s (dados: {fraction*100:.1f}% do histórico)")
+        return ranking
+
+    def _lengths(self):
+        lengths = {}
+        for symbol, candles in self.candles_by_symbol.items():
+            lengths[symbol] = len(candles["close"]) if isinstance(candles, dict) else len(candles)
+        return lengths
+
+    # ---------------------------------------------------------------- Resultados
+
+    def _create_table(self):
+        columns = ", ".join(f'"{name}" REAL' for name in self.param_names)
+        metrics = ", ".join(f'"{name}" REAL' for name in METRICS)
+        with sqlite3.connect(self.db_path) as db:
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS optimization_results ("
+                "run_id TEXT, method TEXT, stage INTEGER, symbol TEXT, data_fraction REAL, "
+                f"{columns}, {metrics}, params_json TEXT, created_at REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_optimization_run ON optimization_results (run_id, symbol)")
+
+    def _row(self, run_id, method, stage, symbol, params, metrics, fraction):
+        return (run_id, method, stage, symbol, fraction,
+                *[params[name] for name in self.param_names],
+                *[metrics[name] for name in METRICS],
+                json.dumps(params), time.time())
+
+    def _insert(self, db, rows):
+        placeholders = ", ".join("?" * (5 + len(self.param_names) + len(METRICS) + 2))
+        db.executemany(f"INSERT INTO optimization_results VALUES ({placeholders})", rows)
+
+    def best(self, run_id=None, limit=10):
+        """
+        Consulta as melhores combinações (média entre símbolos) gravadas no banco.
+        Sem `run_id`, considera a última execução.
+        """
+        with sqlite3.connect(self.db_path) as db:
+            if run_id is None:
+                row = db.execute("SELECT run_id FROM optimization_results ORDER BY created_at DESC LIMIT 1").fetchone()
+                if row is None:
+                    return []
+                run_id = row[0]
+            stage = db.execute("SELECT MAX(stage) FROM optimization_results WHERE run_id = ?", (run_id,)).fetchone()[0]
+            averages = ", ".join(f'AVG("{name}") AS "{name}"' for name in METRICS)
+            cursor = db.execute(
+                f"SELECT params_json, {averages}, COUNT(*) AS symbols FROM optimization_results "
+                f'WHERE run_id = ? AND stage = ? GROUP BY params_json ORDER BY "{self.objective}" DESC LIMIT ?',
+                (run_id, stage, limit),
+            )
+            names = [description[0] for description in cursor.description]
+            return [{**dict(zip(names, row)), "params_json": json.loads(row[0])} for row in cursor.fetchall()]
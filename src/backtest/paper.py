@@ -0,0 +1,264 @@
+# backtest/paper.py
+import heapq
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from binance.helpers import interval_to_milliseconds
+
+from modules.Scheduler import next_run_time
+from .clock import VirtualClock, WallClock
+from .exchange import MatchingEngine, _api_error, _fmt
+
+# Endpoints de mercado repassados ao cliente de dados (nenhum endpoint assinado sai do processo)
+PUBLIC_ENDPOINTS = ("ping", "get_exchange_info", "get_order_book", "get_avg_price", "get_recent_trades",
+                    "get_ticker", "get_orderbook_ticker", "get_orderbook_tickers")
+
+
+class MarketFeed:
+    """
+    Dados de mercado compartilhados por todas as contas de paper trading: a mesma consulta
+    (`get_klines`, `get_symbol_info`...) feita por centenas de contas vai uma vez ao cliente de dados.
+
+    O cliente pode ser o `BinanceClient` (mercado ao vivo) ou um `SimulatedExchange` (candles gravados).
+    Os candles ficam em cache até o fechamento do próximo candle do `interval`; os preços, por `ticker_ttl` segundos.
+    """
+
+    def __init__(self, client, interval, clock=None, ticker_ttl=1.0):
+        self.client = client
+        self.interval = interval
+        self.interval_ms = interval_to_milliseconds(interval)
+        self.clock = clock or WallClock()
+        self.ticker_ttl = ticker_ttl
+        self.requests = 0
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def call(self, method, max_age_ms=None, **params):
+        """Resultado em cache de `client.<method>(**params)`; sem `max_age_ms`, vale até o próximo fechamento de candle."""
+        key = (method, tuple(sorted(params.items())))
+        now = self.clock.now_ms
+        interval_ms = interval_to_milliseconds(params["interval"]) if "interval" in params else self.interval_ms
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and (now - cached[0] <= max_age_ms if max_age_ms is not None
+                                       else now // interval_ms == cached[0] // interval_ms):
+                return cached[1]
+        result = getattr(self.client, method)(**params)
+        with self._lock:
+            self._cache[key] = (now, result)
+            self.requests += 1
+        return result
+
+    def symbol_info(self, symbol):
+        return self.call("get_symbol_info", max_age_ms=float("inf"), symbol=symbol)
+
+    def closed_klines(self, symbol, limit=10):
+        """Últimos candles fechados do `interval` (para casar as ordens abertas)."""
+        now = self.clock.now_ms
+        return [kline for kline in self.call("get_klines", symbol=symbol, interval=self.interval, limit=limit)
+                if int(kline[6]) < now]
+
+    def last_price(self, symbol):
+        ticker = self.call("get_symbol_ticker", max_age_ms=self.ticker_ttl * 1000, symbol=symbol)
+        return float(ticker["price"])
+
+
+class PaperExchange:
+    """
+    Cliente de paper trading de uma conta virtual: os dados de mercado vêm do `MarketFeed` (reais ou
+    gravados) e saldos, ordens e execuções ficam num `MatchingEngine` próprio, com as mesmas regras de
+    execução do replay (toque do preço, participação no volume, taxas, deslize e latência).
+
+    Tem a interface do `BinanceClient` usada pelo `BinanceTraderBot`, então o bot gera os mesmos logs
+    e o mesmo diário de trades da operação real.
+    """
+
+    def __init__(self, feed, name="paper", balances=None, fee_rate=0.001, slippage=0.0005,
+                 participation_rate=0.1, latency_ms=50):
+        self.feed = feed
+        self.name = name
+        self.clock = feed.clock
+        self.engine = MatchingEngine(feed.clock, fee_rate=fee_rate, slippage=slippage,
+                                     participation_rate=participation_rate, latency_ms=latency_ms)
+        self.timestamp_offset = 0
+        self.request_count = 0
+        self._matched = {}          # símbolo -> fechamento do último candle já casado
+        self._lock = threading.RLock()
+        for asset, amount in (balances or {}).items():
+            self.engine.set_balance(asset, amount)
+
+    def __getattr__(self, name):
+        if name in PUBLIC_ENDPOINTS:
+            return getattr(self.feed.client, name)
+        raise AttributeError(f"{type(self).__name__} não simula o endpoint '{name}'")
+
+    def add_symbol(self, symbol):
+        """Inclui o símbolo na conta; os candles anteriores à inclusão não são casados."""
+        with self._lock:
+            if symbol in self.engine.symbols:
+                return
+            symbol_info = self.feed.symbol_info(symbol)
+            if symbol_info is None:
+                raise _api_error(-1121, "Invalid symbol.")
+            self.engine.add_symbol(symbol_info)
+            closed = self.feed.closed_klines(symbol)
+            self._matched[symbol] = int(closed[-1][6]) if closed else self.clock.now_ms
+            self.engine.set_last_price(symbol, self.feed.last_price(symbol))
+
+    def _sync(self, symbol=None):
+        # Casa as ordens abertas com os candles fechados desde a última chamada
+        self.request_count += 1
+        for current in ([symbol] if symbol else list(self._matched)):
+            if current not in self._matched:
+                self.add_symbol(current)
+            for kline in self.feed.closed_klines(current):
+                close_time = int(kline[6])
+                if close_time <= self._matched[current]:
+                    continue
+                self.engine.match_candle(current, int(kline[0]), float(kline[1]), float(kline[2]),
+                                         float(kline[3]), float(kline[4]), float(kline[5]), close_time=close_time)
+                self._matched[current] = close_time
+            self.engine.set_last_price(current, self.feed.last_price(current))
+
+    # ---------------------------------------------------------------- Endpoints públicos
+
+    def get_server_time(self):
+        return {"serverTime": self.clock.now_ms}
+
+    def get_symbol_info(self, symbol):
+        self.add_symbol(symbol)  # O bot consulta os filtros na partida: a conta passa a casar o símbolo
+        return self.feed.symbol_info(symbol)
+
+    def get_klines(self, **params):
+        return self.feed.call("get_klines", **params)
+
+    def get_symbol_ticker(self, symbol=None):
+        if symbol:
+            return {"symbol": symbol, "price": _fmt(self.feed.last_price(symbol))}
+        return self.get_all_tickers()
+
+    def get_all_tickers(self):
+        return self.feed.call("get_all_tickers", max_age_ms=self.feed.ticker_ttl * 1000)
+
+    # ---------------------------------------------------------------- Endpoints assinados (simulados)
+
+    def get_account(self):
+        with self._lock:
+            self._sync()
+            return self.engine.get_account()
+
+    def create_order(self, **params):
+        with self._lock:
+            self._sync(params["symbol"])
+            return self.engine.create_order(**params)
+
+    def cancel_order(self, symbol, orderId=None, origClientOrderId=None):
+        with self._lock:
+            self._sync(symbol)
+            return self.engine.cancel_order(symbol, orderId=orderId, origClientOrderId=origClientOrderId)
+
+    def cancel_replace_order(self, **params):
+        with self._lock:
+            self._sync(params["symbol"])
+            return self.engine.cancel_replace_order(**params)
+
+    def get_order(self, symbol, orderId=None, origClientOrderId=None):
+        with self._lock:
+            self._sync(symbol)
+            return self.engine.get_order(symbol, orderId=orderId, origClientOrderId=origClientOrderId)
+
+    def get_open_orders(self, symbol=None):
+        with self._lock:
+            self._sync(symbol)
+            return self.engine.get_open_orders(symbol)
+
+    def get_all_orders(self, symbol, limit=500, orderId=None):
+        with self._lock:
+            self._sync(symbol)
+            return self.engine.get_all_orders(symbol, limit=limit, orderId=orderId)
+
+    def get_my_trades(self, symbol, orderId=None, limit=500):
+        with self._lock:
+            self._sync(symbol)
+            return self.engine.get_my_trades(symbol, orderId=orderId, limit=limit)
+
+
+class PaperTradingSession:
+    """
+    Várias contas virtuais num só processo, todas sobre o mesmo `MarketFeed`: cada configuração
+    testada ganha a sua conta (`account`) e os seus bots (`add_bot`), e o resumo compara o
+    patrimônio lado a lado.
+
+    `run` agenda os bots como o TradeScheduler (logo após o fechamento do candle, cooldown depois de
+    ordens). Com um VirtualClock (dados gravados), o tempo avança sem esperar e os bots rodam em sequência.
+    """
+
+    def __init__(self, data_client, interval, clock=None, ticker_ttl=1.0):
+        self.feed = MarketFeed(data_client, interval, clock=clock, ticker_ttl=ticker_ttl)
+        self.clock = self.feed.clock
+        self.accounts = {}
+        self.bots = []              # [(conta, bot)]
+        self.errors = []
+
+    def account(self, name, balances, **engine_options):
+        if name in self.accounts:
+            raise ValueError(f"Conta de paper trading '{name}' já existe.")
+        account = self.accounts[name] = PaperExchange(self.feed, name, balances, **engine_options)
+        return account
+
+    def add_bot(self, account_name, bot):
+        if bot.client_binance is not self.accounts[account_name]:
+            raise ValueError(f"O bot de {bot.operation_code} não usa a conta '{account_name}'.")
+        self.bots.append((account_name, bot))
+
+    def _execute(self, item):
+        account_name, bot = item
+        try:
+            bot.execute()
+            return next_run_time(bot, self.clock.now_ms, 0, self.grace_period, self.align_to_candle)
+        except Exception as e:
+            # Mesmo comportamento do TradeScheduler: registra e tenta de novo em 1 minuto
+            logging.error(f"[paper:{account_name}] Erro na execução do {bot.operation_code}: {str(e)}")
+            self.errors.append((self.clock.now_ms, account_name, bot.operation_code, repr(e)))
+            return self.clock.now_ms + 60 * 1000
+
+    def run(self, max_workers=4, grace_period=2.0, align_to_candle=True, end_ms=None):
+        """Executa os bots de todas as contas até `end_ms` (ou até Ctrl+C)."""
+        self.grace_period = grace_period
+        self.align_to_candle = align_to_candle
+        virtual = isinstance(self.clock, VirtualClock)
+        heap = [(self.clock.now_ms, index) for index in range(len(self.bots))]
+        heapq.heapify(heap)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                (self.clock.patch_bot() if virtual else nullcontext()):
+            while heap and (end_ms is None or heap[0][0] <= end_ms):
+                due_ms = heap[0][0]
+                if virtual:
+                    self.clock.advance_to(due_ms)
+                else:
+                    self.clock.sleep((due_ms - self.clock.now_ms) / 1000)
+                batch = []
+                while heap and heap[0][0] <= self.clock.now_ms:
+                    batch.append(heapq.heappop(heap)[1])
+                # O relógio virtual é compartilhado (time.sleep avança para todos): em sequência
+                items = [self.bots[index] for index in batch]
+                results = map(self._execute, items) if virtual else executor.map(self._execute, items)
+                for index, next_ms in zip(batch, results):
+                    heapq.heappush(heap, (next_ms, index))
+
+    def equity(self, name, quote_asset):
+        return self.accounts[name].engine.equity(quote_asset)
+
+    def summary(self, quote_asset):
+        """Contas ordenadas pelo patrimônio na moeda de cotação."""
+        rows = []
+        for name, account in self.accounts.items():
+            with account._lock:
+                filled = sum(1 for order in account.engine.orders.values() if order["executedQty"] > 0)
+                rows.append((name, account.engine.equity(quote_asset), filled))
+        rows.sort(key=lambda row: row[1], reverse=True)
+        lines = [f"📄 Paper trading ({len(rows)} contas, {self.feed.requests} consultas de mercado):"]
+        lines += [f" - {name:<24} {equity:14.2f} {quote_asset} | ordens executadas: {filled}" for name, equity, filled in rows]
+        return "\n".join(lines)
@@ -0,0 +1,155 @@
+# backtest/replay.py
+import logging
+import os
+import time
+import warnings
+from contextlib import contextmanager, redirect_stdout
+from dataclasses import dataclass, field
+
+from Models.AssetStartModel import AssetStartModel
+from modules.Scheduler import next_run_time
+from .clock import VirtualClock
+from .exchange import SimulatedExchange, build_symbol_info
+
+
+@dataclass
+class ReplayResult:
+    symbol: str
+    quote_asset: str
+    cycles: int
+    equity_curve: list                      # [(timestamp_ms, patrimônio em moeda de cotação)]
+    orders: list                            # Todas as ordens enviadas, no formato da Binance
+    final_balances: dict
+    errors: list = field(default_factory=list)
+    wall_seconds: float = 0.0
+    simulated_seconds: float = 0.0
+
+    @property
+    def total_return(self):
+        if len(self.equity_curve) < 2 or self.equity_curve[0][1] == 0:
+            return 0.0
+        return self.equity_curve[-1][1] / self.equity_curve[0][1] - 1
+
+    @property
+    def max_drawdown(self):
+        peak, drawdown = 0.0, 0.0
+        for _, equity in self.equity_curve:
+            peak = max(peak, equity)
+            if peak > 0:
+                drawdown = max(drawdown, 1 - equity / peak)
+        return drawdown
+
+    @property
+    def filled_orders(self):
+        return [order for order in self.orders if float(order["executedQty"]) > 0]
+
+    def summary(self):
+        speedup = self.simulated_seconds / self.wall_seconds if self.wall_seconds else 0
+        return (
+            f"📊 Replay {self.symbol}: {self.cycles} execuções | "
+            f"Retorno: {self.total_return*100:.2f}% | Drawdown máx.: {self.max_drawdown*100:.2f}% | "
+            f"Ordens: {len(self.orders)} (executadas: {len(self.filled_orders)}) | "
+            f"Tempo: {self.wall_seconds:.1f}s para {self.simulated_seconds/86400:.1f} dias ({speedup:,.0f}x)"
+        )
+
+
+@contextmanager
+def _quiet_output(enabled):
+    # O bot imprime muito a cada execução; no replay isso domina o tempo de execução
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+class ReplayBacktester:
+    """
+    Replay orientado a eventos: executa o `BinanceTraderBot.execute()` real contra um
+    `SimulatedExchange` alimentado por candles gravados.
+
+    O `time` dos módulos do robô (BOT_TIME_MODULES) é trocado por um `VirtualClock`, então `time.sleep(2)`,
+    o tempo entre execuções e os prazos das ordens limitadas avançam instantaneamente. Ordens limitadas
+    são executadas pelo `MatchingEngine` (arredondamento de tick/step, taxas e execuções parciais por volume).
+    """
+
+    def __init__(self, asset: AssetStartModel, klines, initial_quote=1000.0, initial_base=0.0,
+                 fee_rate=0.001, slippage=0.0005, participation_rate=0.1,
+                 tick_size=0.01, step_size=0.00001, min_notional=10.0,
+                 warmup=500, quiet=True, align_to_candle=True, grace_period=2.0):
+        if len(klines) <= warmup:
+            raise ValueError(f"São necessários mais de {warmup} candles para o replay (recebidos: {len(klines)}).")
+        self.asset = asset
+        self.klines = klines
+        self.quote_asset = asset.operationCode[len(asset.stockCode):]
+        self.initial_quote = initial_quote
+        self.initial_base = initial_base
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.participation_rate = participation_rate
+        self.symbol_info = build_symbol_info(asset.operationCode, asset.stockCode, self.quote_asset,
+                                             tick_size=tick_size, step_size=step_size, min_notional=min_notional)
+        self.warmup = warmup
+        self.quiet = quiet
+        self.align_to_candle = align_to_candle   # Mesmo agendamento do TradeScheduler em produção
+        self.grace_period = grace_period
+
+    def build_exchange(self, clock):
+        exchange = SimulatedExchange(clock, self.asset.candlePeriod, fee_rate=self.fee_rate,
+                                     slippage=self.slippage, participation_rate=self.participation_rate)
+        exchange.set_balance(self.quote_asset, self.initial_quote)
+        exchange.set_balance(self.asset.stockCode, self.initial_base)
+        exchange.add_symbol(self.symbol_info, self.klines)
+        return exchange
+
+    def build_bot(self, robot_module, exchange):
+        return robot_module.BinanceTraderBot.fromAsset(self.asset, client=exchange)
+
+    def run(self, end_time=None, max_cycles=None):
+        """
+        Executa o replay do fim do aquecimento até o último candle (ou até `end_time`, em ms).
+        """
+        from modules import BinanceRobot as robot_module
+
+        start_ms = int(self.klines[self.warmup - 1][6]) + 1
+        end_ms = end_time or int(self.klines[-1][6])
+        clock = VirtualClock(start_ms)
+        exchange = self.build_exchange(clock)
+
+        equity_curve, errors = [], []
+        cycles = 0
+        wall_start = time.perf_counter()
+
+        # Ordens simuladas não devem ir para o log de produção; o nível anterior volta no fim
+        previous_disable = logging.root.manager.disable
+        logging.disable(logging.CRITICAL)
+        try:
+            with clock.patch_bot(), _quiet_output(self.quiet):
+                bot = self.build_bot(robot_module, exchange)
+                equity_curve.append((clock.now_ms, exchange.engine.equity(self.quote_asset)))
+                while clock.now_ms <= end_ms and (max_cycles is None or cycles < max_cycles):
+                    try:
+                        bot.execute()
+                        due_ms = next_run_time(bot, clock.now_ms, 0, self.grace_period, self.align_to_candle)
+                    except Exception as e:
+                        # Mesmo comportamento do TradeScheduler: registra e tenta de novo em 1 minuto
+                        errors.append((clock.now_ms, repr(e)))
+                        due_ms = clock.now_ms + 60 * 1000
+                    cycles += 1
+                    equity_curve.append((clock.now_ms, exchange.engine.equity(self.quote_asset)))
+                    clock.advance_to(due_ms)
+        finally:
+            logging.disable(previous_disable)
+
+        return ReplayResult(
+            symbol=self.asset.operationCode,
+            quote_asset=self.quote_asset,
+            cycles=cycles,
+            equity_curve=equity_curve,
+            orders=exchange.engine.get_all_orders(self.asset.operationCode, limit=len(exchange.engine.orders) or 1),
+            final_balances={asset: dict(balance) for asset, balance in exchange.engine.balances.items()},
+            errors=errors,
+            wall_seconds=time.perf_counter() - wall_start,
+            simulated_seconds=(clock.now_ms - start_ms) / 1000,
+        )
@@ -0,0 +1,228 @@
+# backtest/vectorized.py
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+import numpy as np
+import talib as ta
+
+DEFAULT_LOOKBACK = 500  # Candles que o bot baixa a cada execução (get_klines limit=500)
+
+# Parâmetros do AssetStartModel entendidos pela simulação vetorizada e seus valores padrão
+DEFAULT_PARAMS = {
+    "emaFastWindow": 7,
+    "emaMidWindow": 25,
+    "emaSlowWindow": 99,
+    "macdSignalWindow": 7,
+    "stopLossPercentage": 5,
+    "acceptableLossPercentage": 0,
+    "volatilityFactor": 0.5,
+}
+
+
+class IndicatorCache:
+    """
+    Cache LRU das séries de indicadores por (símbolo, indicador, janelas).
+
+    Combinações de parâmetros que compartilham uma janela reaproveitam a mesma série,
+    então uma varredura só calcula cada EMA/MACD uma vez por símbolo.
+    """
+
+    def __init__(self, max_items=512):
+        self.max_items = max_items
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+
+    def get(self, key, factory):
+        if key in self._items:
+            self.hits += 1
+            self._items.move_to_end(key)
+            return self._items[key]
+        self.misses += 1
+        value = factory()
+        self._items[key] = value
+        if len(self._items) > self.max_items:
+            self._items.popitem(last=False)
+        return value
+
+    def ema(self, symbol, close, window):
+        return self.get((symbol, "ema", window), lambda: ta.EMA(close, timeperiod=window))
+
+    def macd(self, symbol, close, fast, slow, signal):
+        return self.get((symbol, "macd", fast, slow, signal),
+                        lambda: ta.MACD(close, fastperiod=fast, slowperiod=slow, signalperiod=signal)[:2])
+
+    def decision(self, symbol, close, fast, mid, slow, signal, lookback=DEFAULT_LOOKBACK):
+        def factory():
+            macd_line, signal_line = self.macd(symbol, close, fast, mid, signal)
+            buy = buy_signals(self.ema(symbol, close, fast), self.ema(symbol, close, mid),
+                              self.ema(symbol, close, slow), macd_line, signal_line)
+            return rolling_decision(buy, lookback - slow + 1)
+        return self.get((symbol, "decision", fast, mid, slow, signal, lookback), factory)
+
+
+def buy_signals(ema_fast, ema_mid, ema_slow, macd_line, signal_line):
+    """
+    Mesmas regras de `strategies.talib.sinal_compra_venda`, em numpy, para a série inteira.
+    Retorna um array booleano com os candles em que a estratégia gera sinal de compra.
+
+    O bot recalcula as EMAs a cada janela de 500 candles, então a semente da EMA no início
+    da janela pode criar sinais que a série completa não tem (cerca de 1% das decisões).
+    """
+    with np.errstate(invalid="ignore"):
+        valorizacao = (ema_fast > ema_mid) & (ema_mid > ema_slow)
+        desvalorizacao = (ema_fast < ema_mid) & (ema_mid < ema_slow)
+        prev_fast = np.concatenate(([np.nan], ema_fast[:-1]))
+        prev_mid = np.concatenate(([np.nan], ema_mid[:-1]))
+        compra_valorizacao = valorizacao & (prev_fast <= prev_mid)
+        prev_compra = np.concatenate(([False], compra_valorizacao[:-1]))
+        compra_desvalorizacao = desvalorizacao & (macd_line > signal_line) & ~prev_compra
+    # As regras de venda da estratégia nunca disparam (exigem EMAs em ordem contraditória)
+    return compra_valorizacao | compra_desvalorizacao
+
+
+def rolling_decision(buy, span):
+    """
+    Decisão do bot em cada candle.
+
+    A estratégia propaga o último sinal (ffill) e não gera vendas, então o bot decide
+    "Comprar" se houve qualquer sinal de compra nos últimos `span` candles da janela baixada
+    (os primeiros candles da janela ficam sem EMA lenta e não geram sinal).
+    """
+    span = max(1, span)
+    counts = np.concatenate(([0], np.cumsum(buy)))
+    index = np.arange(1, len(buy) + 1)
+    return (counts[index] - counts[np.maximum(0, index - span)]) > 0
+
+
+def _first_index(predicate, start, end, chunk=64):
+    """Primeiro índice em [start, end) em que `predicate(i, j)` é verdadeiro, buscando em blocos crescentes."""
+    i = start
+    while i < end:
+        j = min(end, i + chunk)
+        hits = np.flatnonzero(predicate(i, j))
+        if hits.size:
+            return i + int(hits[0])
+        i = j
+        chunk *= 2
+    return end
+
+
+@dataclass
+class SimulationResult:
+    equity: np.ndarray                      # Patrimônio (capital inicial = 1) em cada candle simulado
+    trades: list = field(default_factory=list)  # [(entrada, saída, preço entrada, preço saída, motivo)]
+    open_position: bool = False
+
+    @property
+    def total_return(self):
+        return float(self.equity[-1] - 1) if len(self.equity) else 0.0
+
+    @property
+    def max_drawdown(self):
+        if not len(self.equity):
+            return 0.0
+        peak = np.maximum.accumulate(self.equity)
+        return float(np.max(1 - self.equity / peak))
+
+    @property
+    def win_rate(self):
+        if not self.trades:
+            return 0.0
+        return sum(1 for trade in self.trades if trade[3] > trade[2]) / len(self.trades)
+
+    def metrics(self):
+        drawdown = self.max_drawdown
+        return {
+            "total_return": self.total_return,
+            "max_drawdown": drawdown,
+            "trades": len(self.trades),
+            "win_rate": self.win_rate,
+            "return_drawdown": self.total_return / drawdown if drawdown > 0 else self.total_return,
+        }
+
+
+def simulate(high, close, decision, stop_loss, acceptable_loss, fee_rate=0.001, slippage=0.002,
+             start=0, end=None):
+    """
+    Simula o ciclo de decisões do `BinanceTraderBot.execute()` candle a candle.
+
+    - Vendido e decisão "Comprar": compra no fechamento (+ deslize).
+    - Comprado: o stop loss é verificado antes da decisão (fechamento atual e anterior abaixo do stop).
+    - Comprado e decisão "Vender": vende no fechamento, ou deixa uma venda limitada no preço mínimo
+      aceitável (`acceptable_loss`) até a máxima alcançá-lo ou o stop disparar.
+
+    O laço percorre apenas as operações; as buscas são feitas em numpy.
+    """
+    end = len(close) if end is None else end
+    equity = np.empty(end - start)
+    trades = []
+    true_idx = np.flatnonzero(decision[start:end]) + start
+    false_idx = np.flatnonzero(~decision[start:end]) + start
+
+    cash = 1.0
+    t = start
+    while True:
+        p = np.searchsorted(true_idx, t)
+        if p == len(true_idx):
+            break
+        entry = int(true_idx[p])
+        equity[t - start:entry - start] = cash
+        entry_price = close[entry] * (1 + slippage)
+        quantity = cash / entry_price * (1 - fee_rate)
+        stop_price = entry_price * (1 - stop_loss)
+        min_price = entry_price * (1 - acceptable_loss)
+
+        def stop_hit(i, j):
+            return (close[i:j] < stop_price) & (close[i - 1:j - 1] < stop_price)
+
+        q = np.searchsorted(false_idx, entry + 1)
+        k_signal = int(false_idx[q]) if q < len(false_idx) else end
+        k_stop = _first_index(stop_hit, entry + 1, min(k_signal + 1, end))
+
+        exit_index, exit_price, reason = None, None, None
+        if k_stop < end and k_stop <= k_signal:
+            exit_index, exit_price, reason = k_stop, close[k_stop] * (1 - slippage), "stop"
+        elif k_signal < end:
+            if close[k_signal] >= min_price:
+                exit_index, exit_price, reason = k_signal, close[k_signal] * (1 - slippage), "sinal"
+            else:
+                k_fill = _first_index(lambda i, j: high[i:j] >= min_price, k_signal + 1, end)
+                k_stop = _first_index(stop_hit, k_signal + 1, min(k_fill + 1, end))
+                if k_stop < end and k_stop <= k_fill:
+                    exit_index, exit_price, reason = k_stop, close[k_stop] * (1 - slippage), "stop"
+                elif k_fill < end:
+                    exit_index, exit_price, reason = k_fill, min_price, "limite"
+
+        if exit_index is None:
+            equity[entry - start:] = quantity * close[entry:end]
+            return SimulationResult(equity=equity, trades=trades, open_position=True)
+
+        equity[entry - start:exit_index - start] = quantity * close[entry:exit_index]
+        cash = quantity * exit_price * (1 - fee_rate)
+        equity[exit_index - start] = cash
+        trades.append((entry, exit_index, entry_price, exit_price, reason))
+        t = exit_index + 1
+
+    equity[t - start:] = cash
+    return SimulationResult(equity=equity, trades=trades)
+
+
+def run_backtest(candles, params, cache=None, symbol="", start=None, end=None,
+                 lookback=DEFAULT_LOOKBACK, fee_rate=0.001, slippage=0.002):
+    """
+    Backtest vetorizado de um conjunto de parâmetros (nomes do AssetStartModel, percentuais em base 100).
+
+    `candles` é um dict com arrays 'high' e 'close'. `volatilityFactor` é aceito, mas não altera o
+    resultado: só a estratégia de antecipação (desativada no strategy_runner) o utiliza.
+    """
+    params = {**DEFAULT_PARAMS, **params}
+    cache = cache if cache is not None else IndicatorCache()
+    close, high = candles["close"], candles["high"]
+    decision = cache.decision(symbol, close, params["emaFastWindow"], params["emaMidWindow"],
+                              params["emaSlowWindow"], params["macdSignalWindow"], lookback)
+    start = lookback - 1 if start is None else max(start, 1)
+    return simulate(high, close, decision,
+                    stop_loss=params["stopLossPercentage"] / 100,
+                    acceptable_loss=params["acceptableLossPercentage"] / 100,
+                    fee_rate=fee_rate, slippage=slippage, start=start, end=end)
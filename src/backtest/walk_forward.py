@@ -0,0 +1,157 @@
+# backtest/walk_forward.py
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from .optimizer import METRICS, SharedCandles, _init_worker, _worker, grid_combinations, random_combinations
+from .vectorized import DEFAULT_LOOKBACK, SimulationResult, run_backtest
+
+
+def _walk_forward_window(symbol, window, combinations, objective):
+    """
+    Otimiza os parâmetros na janela de treino e avalia a melhor combinação na janela de teste.
+
+    Os indicadores são causais e ficam no `IndicatorCache` do processo calculados sobre o histórico
+    inteiro, então janelas vizinhas apenas fatiam as séries já aquecidas em vez de recalculá-las.
+    """
+    train_start, train_end, test_start, test_end = window
+    candles = _worker["candles"][symbol]
+    cache = _worker["cache"]
+    options = _worker["options"]
+
+    best_params, best_score = None, -np.inf
+    for params in combinations:
+        metrics = run_backtest(candles, params, cache=cache, symbol=symbol,
+                               start=train_start, end=train_end, **options).metrics()
+        if metrics[objective] > best_score:
+            best_params, best_score = params, metrics[objective]
+
+    test = run_backtest(candles, best_params, cache=cache, symbol=symbol,
+                        start=test_start, end=test_end, **options)
+    return {
+        "symbol": symbol,
+        "window": window,
+        "params": best_params,
+        "train_score": float(best_score),
+        "test_metrics": test.metrics(),
+        "equity": test.equity,
+    }
+
+
+@dataclass
+class WalkForwardResult:
+    symbol: str
+    equity: np.ndarray                          # Curva fora da amostra costurada (capital inicial = 1)
+    segments: list = field(default_factory=list)  # Janela, parâmetros escolhidos e métricas de cada teste
+    start_index: int = 0                        # Índice do candle correspondente ao primeiro ponto da curva
+
+    def metrics(self):
+        curve = SimulationResult(equity=self.equity)
+        return {
+            "total_return": curve.total_return,
+            "max_drawdown": curve.max_drawdown,
+            "trades": sum(segment["test_metrics"]["trades"] for segment in self.segments),
+            "windows": len(self.segments),
+        }
+
+
+class WalkForwardRunner:
+    """
+    Avaliação walk-forward: divide o histórico de cada símbolo em janelas de treino/teste,
+    otimiza os parâmetros do AssetStartModel no treino e avalia na janela de teste seguinte.
+
+    As janelas são independentes e rodam em paralelo no pool de processos. O resultado é a curva
+    de patrimônio fora da amostra de cada símbolo, costurada janela a janela.
+    """
+
+    def __init__(self, candles_by_symbol, param_grid, train_bars, test_bars, step_bars=None, anchored=False,
+                 n_samples=None, seed=None, objective="return_drawdown", max_workers=None,
+                 lookback=DEFAULT_LOOKBACK, fee_rate=0.001, slippage=0.002, verbose=True):
+        if objective not in METRICS:
+            raise ValueError(f"Objetivo inválido: {objective}. Use um de {METRICS}")
+        self.candles_by_symbol = candles_by_symbol
+        self.train_bars = train_bars
+        self.test_bars = test_bars
+        self.step_bars = step_bars or test_bars
+        self.anchored = anchored                    # True = treino sempre começa no início do histórico
+        self.objective = objective
+        self.max_workers = max_workers or os.cpu_count()
+        self.lookback = lookback
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.verbose = verbose
+        # Sem `n_samples`, usa a grade completa em cada janela de treino
+        if n_samples:
+            self.combinations = random_combinations(param_grid, n_samples, seed)
+        else:
+            self.combinations = list(grid_combinations(param_grid))
+
+    def windows(self, length):
+        """Janelas (início treino, fim treino, início teste, fim teste) em índices de candle."""
+        first = self.lookback - 1  # O bot precisa de `lookback` candles antes da primeira decisão
+        windows = []
+        train_start = first
+        while True:
+            start = first if self.anchored else train_start
+            train_end = train_start + self.train_bars
+            test_end = min(train_end + self.test_bars, length)
+            if test_end - train_end < 2:
+                break
+            windows.append((start, train_end, train_end, test_end))
+            if test_end >= length:
+                break
+            train_start += self.step_bars
+        return windows
+
+    def run(self):
+        started = time.perf_counter()
+        tasks = []
+        for symbol, candles in self.candles_by_symbol.items():
+            length = len(candles["close"]) if isinstance(candles, dict) else len(candles)
+            for window in self.windows(length):
+                tasks.append((symbol, window))
+        if not tasks:
+            raise ValueError("Histórico insuficiente para uma janela de treino e teste.")
+
+        with SharedCandles(self.candles_by_symbol) as shared:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                     initargs=(shared.directory, list(shared.lengths), self.lookback,
+                                               self.fee_rate, self.slippage)) as pool:
+                futures = [pool.submit(_walk_forward_window, symbol, window, self.combinations, self.objective)
+                           for symbol, window in tasks]
+                segments = [future.result() for future in futures]
+
+        results = {}
+        for symbol in self.candles_by_symbol:
+            symbol_segments = sorted((s for s in segments if s["symbol"] == symbol), key=lambda s: s["window"][2])
+            if not symbol_segments:
+                continue
+            results[symbol] = self.stitch(symbol, symbol_segments)
+            if self.verbose:
+                metrics = results[symbol].metrics()
+                print(f"📈 Walk-forward {symbol}: {len(symbol_segments)} janelas | "
+                      f"Retorno fora da amostra: {metrics['total_return']*100:.2f}% | "
+                      f"Drawdown máx.: {metrics['max_drawdown']*100:.2f}%")
+        if self.verbose:
+            print(f"✅ {len(tasks)} janelas x {len(self.combinations)} combinações em {time.perf_counter() - started:.1f}s")
+        return results
+
+    @staticmethod
+    def stitch(symbol, segments):
+        """
+        Costura as curvas de teste: cada janela começa com o patrimônio final da anterior.
+        Janelas de teste sobrepostas (passo menor que o teste) são cortadas no início da próxima.
+        """
+        curves, capital = [], 1.0
+        for position, segment in enumerate(segments):
+            equity = segment["equity"]
+            if position + 1 < len(segments):
+                equity = equity[:segments[position + 1]["window"][2] - segment["window"][2]]
+            curves.append(equity * capital)
+            if len(equity):
+                capital *= equity[-1]
+        return WalkForwardResult(symbol=symbol, equity=np.concatenate(curves), segments=segments,
+                                 start_index=segments[0]["window"][2])
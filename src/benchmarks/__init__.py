@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+from .synthetic import generate_columns, generate_klines, generate_stock_data, generate_universe
@@ -0,0 +1,233 @@
+# benchmarks/run.py
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+import timeit
+import warnings
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from backtest.exchange import build_symbol_info
+from .synthetic import generate_klines, generate_stock_data, generate_universe
+
+GROUPS = ("parse", "indicators", "strategies", "universe", "execute")
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+class OfflineClient:
+    """Cliente mínimo que devolve sempre os mesmos candles (sem rede), para medir só o processamento."""
+
+    def __init__(self, symbol, klines):
+        self.symbol_info = build_symbol_info(symbol, symbol[:-3], symbol[-3:])
+        self.klines = klines
+
+    def get_symbol_info(self, symbol):
+        return self.symbol_info
+
+    def get_klines(self, symbol, interval, limit=500, startTime=None, endTime=None):
+        return self.klines if startTime is None else []
+
+
+@contextmanager
+def _quiet():
+    # Estratégias e bot imprimem a cada chamada; o console não deve entrar na medição
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull), warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        yield
+
+
+def measure(fn, repeat=5):
+    """Tempo por chamada (segundos): cada rodada repete `fn` o suficiente para durar ~0,2 s."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    times = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"number": number, "repeat": repeat, "min": min(times),
+            "median": statistics.median(times), "mean": statistics.fmean(times)}
+
+
+# ---------------------------------------------------------------- Casos
+
+def parse_cases(bars):
+    from modules.BinanceRobot import BinanceTraderBot
+    klines = generate_klines(bars)
+    bot = BinanceTraderBot("SYN", "SYNBRL", 1.0, 100, "1h", client=OfflineClient("SYNBRL", klines))
+
+    def parse():
+        bot.klines_cache = []  # Sempre a carga completa de `bars` candles
+        return bot.getStockData_ClosePrice_OpenTime()
+
+    yield "parse.getStockData_ClosePrice_OpenTime", parse
+
+
+def indicator_cases(bars):
+    from indicators import Indicators
+    from indicators.macd import macd
+    from indicators.rsi import rsi
+    prices = generate_stock_data(bars)["close_price"]
+    yield "indicators.rsi", lambda: rsi(prices, 14)
+    yield "indicators.macd", lambda: macd(prices, 12, 26, 9)
+    yield "indicators.calculate_ema", lambda: Indicators.calculate_ema(prices, 20)
+    yield "indicators.calculate_macd", lambda: Indicators.calculate_macd(prices)
+    yield "indicators.calculate_rsi", lambda: Indicators.calculate_rsi(prices)
+    yield "indicators.calculate_ma", lambda: Indicators.calculate_ma(prices, 20)
+
+
+def strategy_cases(bars):
+    from strategies.ema_macd import getEMAMACDTradeStrategy
+    from strategies.moving_average import getMovingAverageTradeStrategy
+    from strategies.moving_average_antecipation import getMovingAverageAntecipationTradeStrategy
+    from strategies.strategy_runner import runStrategies
+    from strategies.talib import sinal_compra_venda
+    stock_data = generate_stock_data(bars)
+    yield "strategies.sinal_compra_venda", lambda: sinal_compra_venda(stock_data)
+    yield "strategies.getEMAMACDTradeStrategy", lambda: getEMAMACDTradeStrategy(stock_data)
+    yield "strategies.getMovingAverageTradeStrategy", lambda: getMovingAverageTradeStrategy(stock_data)
+    yield "strategies.getMovingAverageAntecipationTradeStrategy", \
+        lambda: getMovingAverageAntecipationTradeStrategy(stock_data, 0.5)
+    yield "strategies.runStrategies", lambda: runStrategies(stock_data)
+
+
+def universe_cases(symbols, bars=500):
+    from strategies.strategy_runner import runStrategies
+    universe = generate_universe(symbols, bars)
+    yield "universe.runStrategies", lambda: [runStrategies(stock_data) for stock_data in universe.values()]
+
+
+def run_execute(cycles, warmup=500):
+    """`execute()` completo contra o SimulatedExchange (replay de `cycles` candles sintéticos)."""
+    from backtest.replay import ReplayBacktester
+    from Models.AssetStartModel import AssetStartModel
+    asset = AssetStartModel("SYN", "SYNBRL", 1.0, "1h")
+    replay = ReplayBacktester(asset, generate_klines(warmup + cycles), initial_quote=10_000.0, warmup=warmup)
+    result = replay.run()
+    per_cycle = result.wall_seconds / max(result.cycles, 1)
+    return {"number": result.cycles, "repeat": 1, "min": per_cycle, "median": per_cycle, "mean": per_cycle,
+            "orders": len(result.orders), "errors": len(result.errors)}
+
+
+# ---------------------------------------------------------------- Execução e comparação
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes=(500, 10_000, 1_000_000), symbols=(1, 50, 500), groups=GROUPS, repeat=5,
+                   execute_cycles=200, verbose=True):
+    results = []
+
+    def record(name, stats, bars, symbol_count=1):
+        results.append({"name": name, "bars": bars, "symbols": symbol_count, **stats})
+        if verbose:
+            print(f"  {name:<55} {bars:>9} barras {symbol_count:>4} símb. | "
+                  f"mediana {stats['median'] * 1000:10.3f} ms  (min {stats['min'] * 1000:.3f} ms)", flush=True)
+
+    logging.disable(logging.CRITICAL)
+    try:
+        for bars in sizes:
+            for group, cases in (("parse", parse_cases), ("indicators", indicator_cases), ("strategies", strategy_cases)):
+                if group not in groups:
+                    continue
+                with _quiet():
+                    named = list(cases(bars))
+                for name, fn in named:
+                    with _quiet():
+                        stats = measure(fn, repeat)
+                    record(name, stats, bars)
+        if "universe" in groups:
+            for count in symbols:
+                with _quiet():
+                    (name, fn), = universe_cases(count)
+                    stats = measure(fn, repeat)
+                record(name, stats, 500, count)
+        if "execute" in groups:
+            record("execute.BinanceTraderBot.execute", run_execute(execute_cycles), 500)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=0.10):
+    """Compara as medianas com uma execução anterior. Retorna as linhas e a lista de regressões."""
+    previous = {(r["name"], r["bars"], r["symbols"]): r for r in baseline["results"]}
+    lines, regressions = [], []
+    for result in current["results"]:
+        key = (result["name"], result["bars"], result["symbols"])
+        if key not in previous or not previous[key]["median"]:
+            continue
+        ratio = result["median"] / previous[key]["median"]
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️ regressão"
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = "  🚀"
+        lines.append(f"  {key[0]:<55} {key[1]:>9} {key[2]:>4} | {previous[key]['median'] * 1000:10.3f} ms -> "
+                     f"{result['median'] * 1000:10.3f} ms ({ratio:5.2f}x){flag}")
+    return lines, regressions
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de parsing, indicadores, estratégias e execute().")
+    parser.add_argument("--sizes", type=_int_list, default=[500, 10_000, 1_000_000], help="Barras por série (ex.: 500,10000)")
+    parser.add_argument("--symbols", type=_int_list, default=[1, 50, 500], help="Quantidade de símbolos no grupo universe")
+    parser.add_argument("--groups", default=",".join(GROUPS), help=f"Grupos a executar ({','.join(GROUPS)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--execute-cycles", type=int, default=200, help="Candles do replay no grupo execute")
+    parser.add_argument("--quick", action="store_true", help="Atalho para --sizes 500,10000 --symbols 1,50")
+    parser.add_argument("--output", default=None, help=f"Arquivo JSON (padrão: benchmarks/results/<data>.json)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Piora relativa considerada regressão")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes, args.symbols = [500, 10_000], [1, 50]
+
+    print("⏱️ Executando benchmarks...")
+    started = time.perf_counter()
+    report = run_benchmarks(args.sizes, args.symbols, args.groups.split(","), args.repeat, args.execute_cycles)
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"💾 Resultados salvos em {output} ({time.perf_counter() - started:.0f}s)")
+
+    if args.compare:
+        with open(args.compare) as file:
+            lines, regressions = compare(report, json.load(file), args.threshold)
+        print(f"\n📊 Comparação com {args.compare}:")
+        print("\n".join(lines))
+        if regressions:
+            print(f"\n⚠️ {len(regressions)} regressões acima de {args.threshold * 100:.0f}%")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,64 @@
+# benchmarks/synthetic.py
+import numpy as np
+import pandas as pd
+from binance.helpers import interval_to_milliseconds
+
+from backtest.data import STORE_COLUMNS, columns_to_klines
+
+START_MS = 1_577_836_800_000  # 2020-01-01 00:00 UTC
+
+
+def generate_columns(bars, interval="1h", start_price=100.0, volatility=0.01, seed=0, start_ms=START_MS):
+    """
+    Candles sintéticos (passeio aleatório geométrico) em arrays por coluna, no mesmo layout
+    do armazenamento colunar do backtest. A mesma `seed` gera sempre a mesma série.
+    """
+    interval_ms = interval_to_milliseconds(interval)
+    rng = np.random.default_rng(seed)
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0, volatility, bars)))
+    open_price = np.concatenate(([start_price], close[:-1]))
+    spread = np.abs(rng.normal(0.0, volatility / 2, bars))
+    volume = rng.lognormal(3.0, 0.5, bars)
+    open_time = start_ms + np.arange(bars, dtype=np.int64) * interval_ms
+    columns = {
+        "open_time": open_time,
+        "open": open_price,
+        "high": np.maximum(open_price, close) * (1 + spread),
+        "low": np.minimum(open_price, close) * (1 - spread),
+        "close": close,
+        "volume": volume,
+        "close_time": open_time + interval_ms - 1,
+        "quote_volume": volume * close,
+        "trades": rng.integers(10, 1000, bars),
+        "taker_base_volume": volume / 2,
+        "taker_quote_volume": volume * close / 2,
+    }
+    return {name: columns[name].astype(dtype) for name, dtype in STORE_COLUMNS.items()}
+
+
+def generate_klines(bars, interval="1h", seed=0, **kwargs):
+    """Candles sintéticos no formato de `client.get_klines` (preços como texto)."""
+    return columns_to_klines(generate_columns(bars, interval, seed=seed, **kwargs))
+
+
+def generate_stock_data(bars, interval="1h", seed=0, volatility_window=40, **kwargs):
+    """
+    DataFrame no formato de `getStockData_ClosePrice_OpenTime` (entrada dos indicadores e estratégias),
+    montado direto dos arrays, sem passar pelo texto da API.
+    """
+    columns = generate_columns(bars, interval, seed=seed, **kwargs)
+    prices = pd.DataFrame({
+        "close_price": columns["close"],
+        "open_time": pd.to_datetime(columns["open_time"], unit="ms", utc=True).tz_convert("America/Sao_Paulo"),
+        "open_price": columns["open"],
+        "high_price": columns["high"],
+        "low_price": columns["low"],
+        "volume": columns["volume"],
+    })
+    prices["volatility"] = prices["close_price"].rolling(window=volatility_window).std()
+    return prices
+
+
+def generate_universe(symbols, bars, interval="1h"):
+    """{símbolo: DataFrame} com uma série independente por símbolo (seed = índice)."""
+    return {f"SYN{index:03d}BRL": generate_stock_data(bars, interval, seed=index) for index in range(symbols)}
@@ -1,18 +1,30 @@
-import threading
 import time
-from modules.BinanceRobot import BinanceTraderBot
-from binance.client import Client
+_startup_began = time.perf_counter()
+
+# Apenas módulos leves aqui: pandas, talib e python-binance são importados depois de validar a configuração
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from modules.Scheduler import TradeScheduler
+from modules.PriceWatcher import PriceWatcher
+from modules.OrderBook import OrderBookFeed
+from modules.PortfolioAllocator import PortfolioAllocator
+from modules.ExecutionPool import ExecutionPool
+from modules.ExchangeInfoCache import ExchangeInfoCache
+from modules.ShardCoordinator import ShardCoordinator
+from modules.StateStore import StateStore
+from modules.TradeJournal import TradeJournal
+from modules.Metrics import MetricsServer, phase_metrics
+from modules.Logger import configureLogging
+from modules.Tracing import tracer
+from modules.AssetConfig import AssetConfigWatcher, load_assets, read_config, validate_symbols
+from modules.UniverseDiscovery import UniverseDiscovery
 from Models.AssetStartModel import AssetStartModel
 import logging
 import os
-from datetime import datetime
+import signal
 
-# Define o logger
-logging.basicConfig(
-    filename='src/logs/trading_bot.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+load_dotenv()
 
 def validate_environment():
     """Valida as variáveis de ambiente necessárias"""
@@ -32,16 +44,48 @@ VOLATILITY_FACTOR           = 0.5       # Interfere na antecipação e nos lance
 ACCEPTABLE_LOSS_PERCENTAGE  = 1        # (Usar em base 100%) O quando o bot aceita perder de % (se for negativo, o bot só aceita lucro)
 STOP_LOSS_PERCENTAGE        = 0.025        # (Usar em base 100%) % Máxima de loss que ele aceita para vender à mercado independente
 FALLBACK_ACTIVATED          = True      # Define se a estratégia de Fallback será usada (ela pode entrar comprada em mercados subindo)
+ORDENS_DE_PROTECAO          = None      # Stop na própria Binance após cada compra: "stop_limit" | "oco" (com alvo) | None = só o stop do bot
+TAKE_PROFIT_PERCENTAGE      = None      # (Usar em base 100%) Alvo de lucro acima do preço de compra (OCO e venda pelo PRICE_STREAM)
+REPRECIFICAR_A_CADA         = 15        # Segundos entre reprecificações da ordem limitada aberta (cancel-replace) | None = cancela e reenvia no próximo ciclo
+PRAZO_ORDEM_LIMITADA        = 5 * 60    # Segundos até desistir da ordem limitada e enviar o restante a mercado
 
 
 # Ajustes de Tempo
-CANDLE_PERIOD = Client.KLINE_INTERVAL_1HOUR # Périodo do candle análisado
-TEMPO_ENTRE_TRADES          = 5 * 60    # Tempo que o bot espera para verificar o mercado (em segundos)
+CANDLE_PERIOD = "1h"                    # Périodo do candle análisado (1m, 5m, 15m, 1h, 4h, 1d...)
+ALINHAR_AO_CANDLE           = True      # True = Executa logo após o fechamento de cada candle do CANDLE_PERIOD | False = Usa o TEMPO_ENTRE_TRADES
+MARGEM_FECHAMENTO_CANDLE    = 2         # Segundos após o fechamento do candle para executar
+TEMPO_ENTRE_TRADES          = 5 * 60    # Tempo que o bot espera para verificar o mercado (em segundos, com ALINHAR_AO_CANDLE = False)
 DELAY_ENTRE_ORDENS          = 10 * 60   # Tempo que o bot espera depois de realizar uma ordem de compra ou venda (ajuda a diminuir trades de borda)
 
 
 # Ajustes de Execução
-THREAD_LOCK = True # True = Executa 1 moeda por vez | False = Executa todas simultânemaente
+MAX_WORKERS = 2                     # Quantidade de moedas executadas simultaneamente (1 = uma moeda por vez)
+STOP_LOSS_CHECK_INTERVAL = 60       # Segundos entre verificações de stop loss entre os candles (None = desativado)
+PRICE_STREAM = None                 # Stop loss pelo preço ao vivo via websocket: "bookTicker" | "aggTrade" | "trade" (None = desativado)
+ORDER_BOOK = True                   # Livro de ofertas local (snapshot + stream de diferenças) para precificar as ordens limitadas
+ALOCAR_POR_PERCENTUAL = False       # True = tamanho das compras pelo tradedPercentage de cada moeda (uma consulta da conta para todos os bots; só com SHARDS = 0)
+MAX_PERCENTUAL_POR_MOEDA = 50       # (Usar em base 100%) Teto do patrimônio em uma única moeda, com ALOCAR_POR_PERCENTUAL
+RESERVA_PERCENTUAL = 0              # (Usar em base 100%) Parte do saldo livre que nunca é usada nas compras
+PAPER_TRADING = False               # True = ordens, saldos e execuções simulados localmente sobre o mercado real (nenhuma ordem vai à Binance)
+PAPER_SALDO = {"BRL": 1000.0}       # Saldo inicial de cada conta virtual
+PAPER_LATENCIA_MS = 50              # Latência simulada até a ordem chegar ao livro
+PAPER_CONTAS = {"padrao": {}}       # Conta virtual -> campos do AssetStartModel alterados (ex.: {"stop_2": {"stopLossPercentage": 2}})
+SHARDS = 0                          # Processos worker para dividir as moedas (0 = tudo neste processo)
+SHARD_ADDRESS = "127.0.0.1:50505"   # HOST:PORTA dos serviços do coordenador (workers remotos conectam aqui)
+SHARD_AUTHKEY = None                # Chave dos workers (None = variável SHARD_AUTHKEY ou uma chave aleatória por execução)
+STATE_DIR = 'src/state'             # Snapshots do estado dos bots para reinício rápido (None = desativado)
+JOURNAL_PATH = 'src/state/journal.db'   # Diário SQLite de ordens, execuções e decisões (None = desativado)
+STARTUP_WORKERS = 16                # Bots inicializados em paralelo na partida
+METRICS_PORT = 9108                 # Endpoint local de métricas/profiling em http://127.0.0.1:PORTA/metrics (None = desativado)
+LOG_FILE = 'src/logs/trading_bot.log'   # Log em linhas JSON, rotacionado diariamente ou a cada 10 MB
+LOG_CONSOLE_LEVEL = None            # Nível do logging também exibido no console (ex.: "WARNING"; None = só os prints do bot)
+TRACE_FILE = 'src/logs/traces.jsonl'    # Latência candle -> ordem por execução (None = desativado; resumo: python -m modules.Tracing)
+RECORD_FILE = None                  # Grava requisições e respostas da Binance para o replay (ex.: 'src/logs/requests.jsonl.gz'; resumo: python -m modules.RequestRecorder)
+
+# Define o logger (gravação em JSON por uma thread em segundo plano, com rotação)
+configureLogging(LOG_FILE, console_level=LOG_CONSOLE_LEVEL)
+if TRACE_FILE:
+    tracer.configure(TRACE_FILE)
 
 
 # Configurações da API Binance
@@ -51,7 +95,20 @@ API_SECRET = os.getenv("BINANCE_SECRET_KEY")
 if not API_KEY or not API_SECRET:
     raise ValueError("As chaves da API da Binance não foram configuradas. Configure as variáveis de ambiente BINANCE_API_KEY e BINANCE_SECRET_KEY.")
 
-# Moedas negociadas
+# Moedas negociadas: arquivo TOML/YAML (validado na partida e recarregado sem reiniciar os outros bots)
+ASSETS_FILE = 'src/config/assets.toml'  # None = usa o assetsTraders abaixo
+RECARREGAR_MOEDAS_A_CADA = 10           # Segundos entre verificações do arquivo de moedas (None = sem recarga; só com SHARDS = 0)
+
+# Descoberta automática: escolhe as moedas pelo volume e spread de 24h no lugar da lista fixa (só com SHARDS = 0)
+DESCOBRIR_MOEDAS = False
+MOEDA_DE_COTACAO = "BRL"
+VOLUME_MINIMO_24H = 100_000             # Volume mínimo de 24h, na moeda de cotação
+SPREAD_MAXIMO = 0.3                     # Spread máximo entre compra e venda (%)
+MAX_MOEDAS = 10
+VALOR_POR_ORDEM = 100                   # Valor de cada ordem na moeda de cotação (define o tradedQuantity)
+REDESCOBRIR_A_CADA = 6 * 60 * 60        # Segundos entre novas seleções (None = só na partida)
+
+# Moedas definidas no código (usadas com ASSETS_FILE = None)
 COIN_01 = AssetStartModel(  stockCode = "BTC",
                             operationCode = "BTCBRL",
                             tradedQuantity = 0.01000,
@@ -63,7 +120,7 @@ COIN_02 = AssetStartModel(  stockCode = "ETH",
                             candlePeriod = CANDLE_PERIOD, volatilityFactor = VOLATILITY_FACTOR, stopLossPercentage = STOP_LOSS_PERCENTAGE, tempoEntreTrades = TEMPO_ENTRE_TRADES, delayEntreOrdens = DELAY_ENTRE_ORDENS, acceptableLossPercentage = ACCEPTABLE_LOSS_PERCENTAGE, fallBackActivated= FALLBACK_ACTIVATED)
 
 COIN_03 = AssetStartModel(  stockCode = "BNB",
-                            operationCode = "BNRBRL",
+                            operationCode = "BNBBRL",
                             tradedQuantity = 0.036,
                             candlePeriod = CANDLE_PERIOD, volatilityFactor = VOLATILITY_FACTOR, stopLossPercentage = STOP_LOSS_PERCENTAGE, tempoEntreTrades = TEMPO_ENTRE_TRADES, delayEntreOrdens = DELAY_ENTRE_ORDENS, acceptableLossPercentage = ACCEPTABLE_LOSS_PERCENTAGE, fallBackActivated= FALLBACK_ACTIVATED)
 
@@ -79,82 +136,265 @@ assetsTraders = [COIN_01, COIN_02,COIN_03]
 # ---------------------------------------------------------------------------------------------
 # LOOP PRINCIPAL
 
-thread_lock = threading.Lock()
+startup_phases = []
 
-def trader_loop(assetStart: AssetStartModel):
+@contextmanager
+def startup_phase(name):
+    """Mede uma fase da partida para o relatório de inicialização."""
+    began = time.perf_counter()
     try:
-        MaTrader = BinanceTraderBot(
-            stock_code=assetStart.stockCode,
-            operation_code=assetStart.operationCode,
-            traded_quantity=assetStart.tradedQuantity,
-            traded_percentage=assetStart.tradedPercentage,
-            candle_period=assetStart.candlePeriod,
-            volatility_factor=assetStart.volatilityFactor,
-            time_to_trade=assetStart.tempoEntreTrades,
-            delay_after_order=assetStart.delayEntreOrdens,
-            acceptable_loss_percentage=assetStart.acceptableLossPercentage,
-            stop_loss_percentage=assetStart.stopLossPercentage,
-            fallback_activated=assetStart.fallBackActivated
-        )
-        
-        totalExecucao = 1
-        
-        while True:
-            try:
-                current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                if THREAD_LOCK:
-                    with thread_lock:
-                        print(f"\n[{current_time}][{MaTrader.operation_code}][{totalExecucao}] Iniciando execução")
-                        MaTrader.execute()
-                        print(f"✅ [{MaTrader.operation_code}][{totalExecucao}] Próxima execução em {MaTrader.time_to_sleep/60:.2f} minutos")
-                        print("-" * 50)
-                else:
-                    print(f"\n[{current_time}][{MaTrader.operation_code}][{totalExecucao}] Iniciando execução")
-                    MaTrader.execute()
-                    print(f"✅ [{MaTrader.operation_code}][{totalExecucao}] Próxima execução em {MaTrader.time_to_sleep/60:.2f} minutos")
-                    print("-" * 50)
-                
-                totalExecucao += 1
-                time.sleep(MaTrader.time_to_sleep)
-                
-            except Exception as e:
-                logging.error(f"Erro na execução {totalExecucao} do {MaTrader.operation_code}: {str(e)}")
-                print(f"⚠️ Erro na execução: {str(e)}")
-                time.sleep(60)  # Espera 1 minuto antes de tentar novamente
-                
+        yield
+    finally:
+        startup_phases.append((name, time.perf_counter() - began))
+
+def print_startup_report():
+    print("\n⏱️ Tempo de inicialização:")
+    for name, seconds in startup_phases:
+        print(f" - {name:<28} {seconds:7.2f}s")
+    print(f" - {'Total':<28} {time.perf_counter() - _startup_began:7.2f}s")
+
+def load_shared_metadata(api_key, api_secret, recorder=None):
+    """
+    Uma única sincronização de horário e um único exchangeInfo para todos os bots,
+    em vez de um get_server_time, um ping e um exchangeInfo (peso 20) por bot.
+    """
+    from modules.BinanceClient import BinanceClient
+    exchange_info = ExchangeInfoCache()
+    client = BinanceClient(api_key, api_secret, sync=True, ping=False, verbose=True, recorder=recorder,
+                           exchange_info_cache=exchange_info)
+    exchange_info.put_exchange_info(client.get_exchange_info())
+    return client, exchange_info
+
+def create_bot(assetStart: AssetStartModel, state_store=None, timestamp_offset=None, exchange_info=None, journal=None,
+               order_books=None, allocator=None, recorder=None):
+    from modules.BinanceClient import BinanceClient
+    from modules.BinanceRobot import BinanceTraderBot
+    try:
+        client = BinanceClient(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_SECRET_KEY"), sync=True, ping=False,
+                               sync_interval=30000, verbose=True, timestamp_offset=timestamp_offset,
+                               exchange_info_cache=exchange_info, recorder=recorder)
+        state = state_store.load(assetStart.operationCode) if state_store else None
+        return BinanceTraderBot.fromAsset(assetStart, client=client, state=state, journal=journal,
+                                          protective_mode=ORDENS_DE_PROTECAO, take_profit_percentage=TAKE_PROFIT_PERCENTAGE,
+                                          reprice_interval=REPRECIFICAR_A_CADA, reprice_deadline=PRAZO_ORDEM_LIMITADA,
+                                          order_book=order_books.book(assetStart.operationCode) if order_books else None,
+                                          allocator=allocator)
     except Exception as e:
-        logging.error(f"Erro fatal no trader_loop para {assetStart.operationCode}: {str(e)}")
-        print(f"❌ Erro fatal no trader_loop: {str(e)}")
+        logging.error(f"Erro fatal ao iniciar o bot para {assetStart.operationCode}: {str(e)}")
+        print(f"❌ Erro fatal ao iniciar o bot de {assetStart.operationCode}: {str(e)}")
+        return None
+
+def run_paper_trading(api_key, api_secret, assets):
+    """
+    Paper trading: cada conta de PAPER_CONTAS roda todas as moedas com a sua configuração sobre os
+    mesmos dados de mercado, com logs e diário (um arquivo por conta) como na operação real.
+    """
+    import copy
+    from backtest.paper import PaperTradingSession
+    from modules.BinanceRobot import BinanceTraderBot
+    data_client, _ = load_shared_metadata(api_key, api_secret)
+    if ASSETS_FILE:
+        validate_symbols(assets, data_client.get_symbol_info, ASSETS_FILE)
+    session = PaperTradingSession(data_client, CANDLE_PERIOD)
+    journals = []
+    for name, overrides in PAPER_CONTAS.items():
+        account = session.account(name, PAPER_SALDO, latency_ms=PAPER_LATENCIA_MS)
+        journal = TradeJournal(JOURNAL_PATH.replace(".db", f".paper_{name}.db")) if JOURNAL_PATH else None
+        journals.append(journal)
+        for asset in assets:
+            variant = copy.copy(asset)
+            for field, value in overrides.items():
+                setattr(variant, field, value)
+            # OCO não é simulada: a proteção vira STOP_LOSS_LIMIT
+            bot = BinanceTraderBot.fromAsset(variant, client=account, journal=journal,
+                                             protective_mode=ORDENS_DE_PROTECAO and "stop_limit",
+                                             reprice_interval=REPRECIFICAR_A_CADA, reprice_deadline=PRAZO_ORDEM_LIMITADA)
+            session.add_bot(name, bot)
+    print(f"📄 Paper trading: {len(session.accounts)} contas x {len(assets)} moedas")
+    quote_asset = assets[0].operationCode[len(assets[0].stockCode):]
+    try:
+        session.run(max_workers=MAX_WORKERS, grace_period=MARGEM_FECHAMENTO_CANDLE, align_to_candle=ALINHAR_AO_CANDLE)
+    finally:
+        print(session.summary(quote_asset))
+        for journal in journals:
+            if journal is not None:
+                journal.close()
+
+def discovery_enabled():
+    # A descoberta roda no processo único; o modo distribuído e o paper trading usam a lista configurada
+    return DESCOBRIR_MOEDAS and SHARDS == 0 and not PAPER_TRADING
+
+def discovery_defaults():
+    """Parâmetros das moedas descobertas: o `[defaults]` do arquivo de moedas ou as constantes deste arquivo."""
+    if ASSETS_FILE:
+        return read_config(ASSETS_FILE).get("defaults", {})
+    return {"candlePeriod": CANDLE_PERIOD, "volatilityFactor": VOLATILITY_FACTOR,
+            "stopLossPercentage": STOP_LOSS_PERCENTAGE, "tempoEntreTrades": TEMPO_ENTRE_TRADES,
+            "delayEntreOrdens": DELAY_ENTRE_ORDENS, "acceptableLossPercentage": ACCEPTABLE_LOSS_PERCENTAGE,
+            "fallBackActivated": FALLBACK_ACTIVATED}
+
+def handle_sigterm(signum, frame):
+    raise KeyboardInterrupt
 
 def main():
+    pool = None
+    scheduler = None
+    journal = None
+    price_watcher = None
+    order_books = None
+    recorder = None
+    config_watcher = None
+    discovery = None
     try:
-        # Valida ambiente
-        api_key, api_secret = validate_environment()
-        
-        # Verifica se há ativos configurados
-        if not assetsTraders:
-            raise ValueError("❌ Nenhum ativo configurado para negociação")
+        with startup_phase("Configuração e credenciais"):
+            # Valida ambiente
+            api_key, api_secret = validate_environment()
+
+            # Moedas do arquivo (campos e tipos validados contra o AssetStartModel) ou do código
+            assets = load_assets(ASSETS_FILE) if ASSETS_FILE else list(assetsTraders)
+
+            # Verifica se há ativos configurados (com a descoberta, as moedas vêm da Binance mais adiante)
+            if not assets and not discovery_enabled():
+                raise ValueError("❌ Nenhum ativo configurado para negociação")
             
         print("\n🤖 Iniciando RoboTrader Binance")
-        print(f"📈 Ativos configurados: {', '.join(asset.operationCode for asset in assetsTraders)}")
+        if discovery_enabled():
+            print(f"🔭 Moedas escolhidas pela descoberta: até {MAX_MOEDAS} pares {MOEDA_DE_COTACAO}")
+        else:
+            print(f"📈 Ativos configurados: {', '.join(asset.operationCode for asset in assets)}")
         
-        # Criando e iniciando uma thread para cada objeto
-        threads = []
-        for asset in assetsTraders:
-            thread = threading.Thread(target=trader_loop, args=(asset,))
-            thread.daemon = True
-            thread.start()
-            threads.append(thread)
-            print(f"✅ Thread iniciada para {asset.operationCode}")
+        if PAPER_TRADING:
+            signal.signal(signal.SIGTERM, handle_sigterm)
+            run_paper_trading(api_key, api_secret, assets)
+            return
+
+        if SHARDS > 0:
+            # Modo distribuído: o coordenador reparte as moedas entre processos e compartilha o limite de peso
+            settings = {"max_workers": MAX_WORKERS, "grace_period": MARGEM_FECHAMENTO_CANDLE,
+                        "align_to_candle": ALINHAR_AO_CANDLE, "stop_loss_interval": STOP_LOSS_CHECK_INTERVAL,
+                        "state_dir": STATE_DIR, "log_file": LOG_FILE,
+                        "journal_path": JOURNAL_PATH, "trace_file": TRACE_FILE, "price_stream": PRICE_STREAM,
+                        "protective_mode": ORDENS_DE_PROTECAO, "take_profit_percentage": TAKE_PROFIT_PERCENTAGE,
+                        "reprice_interval": REPRECIFICAR_A_CADA, "reprice_deadline": PRAZO_ORDEM_LIMITADA,
+                        "order_book": ORDER_BOOK}
+            if ASSETS_FILE:
+                shared_client, _ = load_shared_metadata(api_key, api_secret)
+                validate_symbols(assets, shared_client.get_symbol_info, ASSETS_FILE)
+            ShardCoordinator(assets, workers=SHARDS, address=SHARD_ADDRESS, authkey=SHARD_AUTHKEY, settings=settings).run()
+            return
+
+        # Agendador central: cada bot executa logo após o fechamento do seu candle
+        pool = ExecutionPool(max_workers=MAX_WORKERS)
+        state_store = StateStore(STATE_DIR) if STATE_DIR else None
+        journal = TradeJournal(JOURNAL_PATH) if JOURNAL_PATH else None
+        price_watcher = PriceWatcher(PRICE_STREAM) if PRICE_STREAM else None
+        scheduler = TradeScheduler(grace_period=MARGEM_FECHAMENTO_CANDLE, pool=pool, align_to_candle=ALINHAR_AO_CANDLE,
+                                   stop_loss_interval=STOP_LOSS_CHECK_INTERVAL, state_store=state_store,
+                                   price_watcher=price_watcher)
+        if METRICS_PORT:
+            phase_metrics.add_gauges("pool", pool.metrics)
+            MetricsServer(METRICS_PORT).start()
+            print(f"📊 Métricas em http://127.0.0.1:{METRICS_PORT}/metrics")
+        # SIGTERM (deploy/systemd/docker): encerra como um Ctrl+C, salvando o estado dos bots
+        signal.signal(signal.SIGTERM, handle_sigterm)
+        with startup_phase("Importações (pandas, talib)"):
+            import modules.BinanceRobot  # noqa: F401
+        if RECORD_FILE:
+            from modules.RequestRecorder import RequestRecorder
+            recorder = RequestRecorder(RECORD_FILE)
+        with startup_phase("Horário e exchangeInfo"):
+            shared_client, exchange_info = load_shared_metadata(api_key, api_secret, recorder)
+            timestamp_offset = shared_client.timestamp_offset
+            if discovery_enabled():
+                discovery = UniverseDiscovery(shared_client, exchange_info, quote_asset=MOEDA_DE_COTACAO,
+                                              min_quote_volume=VOLUME_MINIMO_24H, max_spread_percentage=SPREAD_MAXIMO,
+                                              max_symbols=MAX_MOEDAS, order_value=VALOR_POR_ORDEM,
+                                              defaults=discovery_defaults())
+                assets, _, _ = discovery.refresh()
+                if not assets:
+                    raise ValueError(f"❌ Nenhuma moeda {MOEDA_DE_COTACAO} atende aos filtros de volume e spread")
+                print(f"🔭 Moedas selecionadas: {', '.join(f'{code} ({volume:,.0f} {MOEDA_DE_COTACAO}, spread {spread:.2f}%)' for code, volume, spread in discovery.ranking)}")
+            elif ASSETS_FILE:
+                # Símbolos conferidos no exchangeInfo em cache: um erro de digitação para aqui, não na primeira ordem
+                validate_symbols(assets, shared_client.get_symbol_info, ASSETS_FILE)
+        # Snapshots do livro pelo cliente compartilhado; os livros são criados junto com os bots
+        order_books = OrderBookFeed(shared_client) if ORDER_BOOK else None
+        allocator = PortfolioAllocator(shared_client, MAX_PERCENTUAL_POR_MOEDA, RESERVA_PERCENTUAL) if ALOCAR_POR_PERCENTUAL else None
+        with startup_phase(f"Bots ({len(assets)} em paralelo)"):
+            with ThreadPoolExecutor(max_workers=max(1, min(STARTUP_WORKERS, len(assets)))) as executor:
+                bots = list(executor.map(
+                    lambda asset: create_bot(asset, state_store, timestamp_offset, exchange_info, journal, order_books,
+                                             allocator, recorder),
+                    assets))
+        for asset, bot in zip(assets, bots):
+            if bot is not None:
+                if allocator is not None:
+                    allocator.add(bot)
+                scheduler.add(bot)
+                print(f"✅ Bot agendado para {asset.operationCode}")
+        if price_watcher is not None:
+            price_watcher.start()  # Uma conexão para todos os símbolos agendados
+        if order_books is not None:
+            order_books.start()
+
+        def apply_asset_changes(added, removed, changed):
+            # Só os bots das moedas alteradas são tocados; os demais seguem com os seus caches
+            for asset in removed:
+                scheduler.remove(asset.operationCode)
+                if allocator is not None:
+                    allocator.remove(asset.operationCode)
+                if order_books is not None:
+                    order_books.remove(asset.operationCode)
+                print(f"➖ Moeda removida: {asset.operationCode}")
+            for asset in changed:
+                bot = scheduler.bots.get(asset.operationCode)
+                if bot is not None:
+                    bot.applyAsset(asset)
+                    print(f"🔧 Parâmetros atualizados: {asset.operationCode}")
+            for asset in added:
+                bot = create_bot(asset, state_store, timestamp_offset, exchange_info, journal, order_books, allocator, recorder)
+                if bot is not None:
+                    if allocator is not None:
+                        allocator.add(bot)
+                    scheduler.add(bot)
+                    print(f"➕ Moeda incluída: {asset.operationCode}")
+
+        if discovery is not None:
+            if REDESCOBRIR_A_CADA:
+                # Moedas com posição aberta ficam até a venda, mesmo fora da nova seleção
+                discovery.start(apply_asset_changes, REDESCOBRIR_A_CADA,
+                                keep=lambda code: (bot := scheduler.bots.get(code)) is not None and bot.actual_trade_position)
+        elif ASSETS_FILE and RECARREGAR_MOEDAS_A_CADA:
+            config_watcher = AssetConfigWatcher(ASSETS_FILE, assets, apply_asset_changes,
+                                                lookup=shared_client.get_symbol_info, interval=RECARREGAR_MOEDAS_A_CADA)
+            config_watcher.start()
+        print_startup_report()
         
         print("\n🟢 Bot em execução. Pressione Ctrl+C para encerrar.")
         
         # Mantém o programa rodando
-        while True:
-            time.sleep(1)
+        scheduler.run()
             
     except KeyboardInterrupt:
         print("\n\n🔴 Programa encerrado pelo usuário.")
+        if config_watcher is not None:
+            config_watcher.stop()
+        if discovery is not None:
+            discovery.stop()
+        if price_watcher is not None:
+            price_watcher.stop()
+        if order_books is not None:
+            order_books.stop()
+        if scheduler is not None and scheduler.state_store is not None:
+            scheduler.save_all()
+            print("💾 Estado dos bots salvo.")
+        if pool is not None:
+            print(pool.summary())
+        if journal is not None:
+            journal.close()
+        if recorder is not None:
+            recorder.close()
+            print(f"🎞️ {recorder.count} requisições gravadas em {recorder.path}")
     except Exception as e:
         logging.error(f"Erro fatal na execução principal: {str(e)}")
         print(f"\n❌ Erro fatal: {str(e)}")
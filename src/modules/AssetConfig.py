@@ -0,0 +1,180 @@
+import dataclasses
+import logging
+import os
+import threading
+import tomllib
+
+from Models.AssetStartModel import AssetStartModel
+
+ASSETS_FILE = 'src/config/assets.toml'
+
+ASSET_FIELDS = {field.name: field for field in dataclasses.fields(AssetStartModel)}
+REQUIRED_FIELDS = [name for name, field in ASSET_FIELDS.items()
+                   if field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING]
+# Campos que precisam ser maiores que zero
+POSITIVE_FIELDS = ("tradedQuantity", "volatilityFactor", "stopLossPercentage", "emaFastWindow", "emaMidWindow",
+                   "emaSlowWindow", "macdSignalWindow", "maFastWindow", "maSlowWindow", "tempoEntreTrades")
+
+
+class ConfigError(ValueError):
+    """Arquivo de moedas inválido; `problems` lista todos os erros encontrados (não só o primeiro)."""
+
+    def __init__(self, path, problems):
+        self.path = path
+        self.problems = problems
+        super().__init__(f"{path}: " + "; ".join(problems))
+
+
+def read_config(path):
+    """Lê o arquivo TOML (ou YAML, se o PyYAML estiver instalado) como dicionário."""
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError:
+            raise ConfigError(path, ["arquivos YAML precisam do pacote PyYAML (pip install pyyaml); use TOML"])
+        with open(path, encoding="utf-8") as file:
+            return yaml.safe_load(file) or {}
+    with open(path, "rb") as file:
+        return tomllib.load(file)
+
+
+def _check_value(name, value):
+    expected = ASSET_FIELDS[name].type
+    # bool é subclasse de int: não vale como número; int vale como float
+    if expected is bool:
+        valid = isinstance(value, bool)
+    elif expected is float:
+        valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+    else:
+        valid = isinstance(value, expected) and not (expected is int and isinstance(value, bool))
+    if not valid:
+        return f"'{name}' deve ser {expected.__name__} (recebido {value!r})"
+    if name in POSITIVE_FIELDS and value <= 0:
+        return f"'{name}' deve ser maior que zero (recebido {value!r})"
+    if name == "candlePeriod":
+        from binance.helpers import interval_to_milliseconds  # Importado aqui: o pacote binance é pesado
+        if interval_to_milliseconds(value) is None:
+            return f"'candlePeriod' inválido: {value!r}"
+    return None
+
+
+def parse_assets(data, path="<config>"):
+    """
+    Monta os AssetStartModel do conteúdo do arquivo: `[defaults]` vale para todas as moedas e cada
+    `[[assets]]` sobrescreve o que precisar. Levanta ConfigError com todos os problemas encontrados.
+    """
+    problems = []
+    defaults = data.get("defaults", {})
+    entries = data.get("assets", [])
+    if not isinstance(defaults, dict) or not isinstance(entries, list):
+        raise ConfigError(path, ["esperado '[defaults]' e uma lista '[[assets]]'"])
+    assets, seen = [], set()
+    for position, entry in enumerate(entries, start=1):
+        fields = {**defaults, **entry}
+        label = fields.get("operationCode") or f"moeda #{position}"
+        entry_problems = [f"{label}: campo desconhecido '{name}'" for name in fields if name not in ASSET_FIELDS]
+        entry_problems += [f"{label}: campo obrigatório '{name}' ausente" for name in REQUIRED_FIELDS if name not in fields]
+        entry_problems += [f"{label}: {problem}" for name, value in fields.items() if name in ASSET_FIELDS
+                           for problem in [_check_value(name, value)] if problem]
+        stock, operation = fields.get("stockCode"), fields.get("operationCode")
+        if isinstance(stock, str) and isinstance(operation, str):
+            if not operation.startswith(stock):
+                entry_problems.append(f"{label}: operationCode deve começar pelo stockCode '{stock}'")
+            if operation in seen:
+                entry_problems.append(f"{label}: moeda repetida")
+        if entry_problems:
+            problems += entry_problems
+            continue
+        seen.add(fields["operationCode"])
+        assets.append(AssetStartModel(**fields))
+    if problems:
+        raise ConfigError(path, problems)
+    return assets
+
+
+def load_assets(path):
+    return parse_assets(read_config(path), path)
+
+
+def validate_symbols(assets, lookup, path="<config>"):
+    """
+    Confere cada operationCode nos metadados da corretora (`lookup(símbolo)` -> symbol_info ou None,
+    ex.: `BinanceClient.get_symbol_info` com o ExchangeInfoCache): o par precisa existir, estar em
+    negociação e ter o stockCode como ativo base.
+    """
+    problems = []
+    for asset in assets:
+        info = lookup(asset.operationCode)
+        if info is None:
+            problems.append(f"{asset.operationCode}: símbolo inexistente na Binance")
+        elif info.get("status", "TRADING") != "TRADING":
+            problems.append(f"{asset.operationCode}: símbolo fora de negociação ({info['status']})")
+        elif info.get("baseAsset", asset.stockCode) != asset.stockCode:
+            problems.append(f"{asset.operationCode}: ativo base é {info['baseAsset']}, não {asset.stockCode}")
+    if problems:
+        raise ConfigError(path, problems)
+    return assets
+
+
+class AssetConfigWatcher:
+    """
+    Acompanha o arquivo de moedas e, a cada alteração válida, chama `on_change(added, removed, changed)`
+    com as listas de AssetStartModel incluídos, removidos e alterados. Um arquivo inválido é registrado
+    no log e ignorado: a configuração em uso continua valendo.
+    """
+
+    def __init__(self, path, assets, on_change, lookup=None, interval=10):
+        self.path = path
+        self.assets = {asset.operationCode: asset for asset in assets}
+        self.on_change = on_change
+        self.lookup = lookup
+        self.interval = interval
+        self.reloads = 0
+        self._signature = self._stat()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="asset-config", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logging.error(f"Erro ao aplicar o arquivo de moedas: {str(e)}")
+
+    def check(self):
+        """Recarrega o arquivo se ele mudou. Retorna (added, removed, changed) ou None."""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return None
+        self._signature = signature
+        try:
+            assets = load_assets(self.path)
+            if self.lookup is not None:
+                validate_symbols(assets, self.lookup, self.path)
+        except Exception as e:  # ConfigError, erro de sintaxe TOML/YAML, arquivo sumiu no meio da escrita
+            logging.error(f"Arquivo de moedas ignorado: {str(e)}")
+            print(f"⚠️ {self.path} inválido, configuração anterior mantida: {str(e)}")
+            return None
+        current = {asset.operationCode: asset for asset in assets}
+        added = [asset for code, asset in current.items() if code not in self.assets]
+        removed = [asset for code, asset in self.assets.items() if code not in current]
+        changed = [asset for code, asset in current.items() if code in self.assets and self.assets[code] != asset]
+        self.assets = current
+        self.reloads += 1
+        if added or removed or changed:
+            self.on_change(added, removed, changed)
+        return added, removed, changed
@@ -2,6 +2,8 @@ from binance.client import Client
 from binance.exceptions import BinanceAPIException
 import time
 
+from modules.RateLimiter import request_weight
+
 
 class BinanceClient(Client):
     def __init__(
@@ -18,10 +20,18 @@ class BinanceClient(Client):
         ping=True,
         verbose=False,
         sync_interval=60000,  # Intervalo de ressincronização em ms
+        rate_limiter=None,  # RateLimiter compartilhado (peso por minuto da conta/IP)
+        exchange_info_cache=None,  # ExchangeInfoCache compartilhado entre bots
+        timestamp_offset=None,  # Desvio já medido por outro cliente (evita uma sincronização por bot)
+        recorder=None,  # RequestRecorder: grava requisições e respostas para o replay (modules.RequestRecorder)
     ):
         """
         Inicializa o cliente Binance customizado, integrando a sincronização do timestamp com o atributo `timestamp_offset`.
         """
+        # Definidos antes do super().__init__, que já pode fazer requisições
+        self.rate_limiter = rate_limiter
+        self.exchange_info_cache = exchange_info_cache
+        self.recorder = recorder
         super().__init__(
             api_key=api_key,
             api_secret=api_secret,
@@ -31,6 +41,7 @@ class BinanceClient(Client):
             testnet=testnet,
             private_key=private_key,
             private_key_pass=private_key_pass,
+            ping=False,  # O ping (opcional) é feito abaixo, uma única vez
         )
 
         # Configurações de sincronização
@@ -39,7 +50,10 @@ class BinanceClient(Client):
         self.sync_interval = sync_interval
         self.last_sync_time = 0  # Armazena o tempo da última sincronização
 
-        if self.sync:
+        if timestamp_offset is not None:
+            self.timestamp_offset = timestamp_offset
+            self.last_sync_time = int(time.time() * 1000)
+        elif self.sync:
             self.sync_time_offset()
 
         # Executa o ping inicial se solicitado
@@ -81,18 +95,63 @@ class BinanceClient(Client):
             kwargs.setdefault("data", {})
             kwargs["data"]["timestamp"] = int(time.time() * 1000 + self.timestamp_offset)
 
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(request_weight(method, uri, kwargs.get("data")))
+
         try:
-            return super()._request(method, uri, signed, force_params, **kwargs)
+            result = self._send(method, uri, signed, force_params, **kwargs)
+            self._update_used_weight()
+            return result
         except BinanceAPIException as e:
+            if e.status_code in (418, 429) and self.rate_limiter is not None:
+                # Limite estourado: pausa todas as requisições que usam o mesmo limitador
+                retry_after = float(getattr(e.response, "headers", {}).get("Retry-After", 60))
+                self.rate_limiter.block_for(retry_after)
+                print(f"⚠️ Limite de requisições atingido. Pausando por {retry_after:.0f}s...")
+                raise e
             if e.code == -1021:  # Erro de timestamp
                 print(f"⚠️ Erro de timestamp detectado: {e}. Re-sincronizando...")
                 self.sync_time_offset(force=True)
                 if signed:
                     kwargs["data"]["timestamp"] = int(time.time() * 1000 + self.timestamp_offset)
-                return super()._request(method, uri, signed, force_params, **kwargs)
+                return self._send(method, uri, signed, force_params, **kwargs)
             else:
                 raise e
 
+    def _send(self, method, uri, signed, force_params=False, **kwargs):
+        """Requisição à Binance, gravada (resposta ou erro, com a duração) quando há um `recorder`."""
+        if self.recorder is None:
+            return super()._request(method, uri, signed, force_params, **kwargs)
+        started = time.time()
+        params = dict(kwargs.get("data") or {})  # Cópia: a requisição acrescenta a assinatura
+        try:
+            result = super()._request(method, uri, signed, force_params, **kwargs)
+        except Exception as e:
+            self.recorder.record(method, uri, params, started, error=e)
+            raise
+        self.recorder.record(method, uri, params, started, response=result)
+        return result
+
+    def _update_used_weight(self):
+        """Sincroniza o limitador com o peso usado informado pela Binance (x-mbx-used-weight-1m)."""
+        if self.rate_limiter is None:
+            return
+        response = getattr(self, "response", None)
+        used = response.headers.get("x-mbx-used-weight-1m") if response is not None else None
+        if used is not None:
+            self.rate_limiter.update_used_weight(int(used))
+
+    def get_symbol_info(self, symbol):
+        """Consulta o cache compartilhado antes de baixar o exchangeInfo (peso 20)."""
+        if self.exchange_info_cache is None:
+            return super().get_symbol_info(symbol)
+        info = self.exchange_info_cache.get(symbol)
+        if info is None:
+            info = super().get_symbol_info(symbol)
+            if info is not None:
+                self.exchange_info_cache.put(symbol, info)
+        return info
+
 
 
 
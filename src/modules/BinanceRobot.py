@@ -2,7 +2,6 @@ import os
 import time
 from datetime import datetime
 import logging
-import math
 import pandas as pd
 
 from dotenv import load_dotenv
@@ -15,6 +14,12 @@ from binance.exceptions import BinanceAPIException
 from modules.BinanceClient import BinanceClient
 from modules.TraderOrder import TraderOrder
 from modules.Logger import createLogOrder  # Função de log das ordens
+from modules.Metrics import phase_metrics
+from modules.Tracing import tracer
+from modules.OrderManager import OrderManager
+from modules.OrderRules import OrderRules, decimal_places, quantize_down
+from modules.OrderTracker import OPEN_STATES, PENDING, OrderTracker, isAmbiguousError
+from modules.ProtectiveOrders import ProtectiveOrderManager
 from indicators import Indicators
 from strategies.talib import sinal_compra_venda  # Nova importação da estratégia EMA MACD
 
@@ -56,7 +61,10 @@ class BinanceTraderBot:
 
     def __init__(self, stock_code, operation_code, traded_quantity, traded_percentage, candle_period,
                  volatility_factor=0.5, time_to_trade=30*60, delay_after_order=60*60,
-                 acceptable_loss_percentage=0.5, stop_loss_percentage=5, fallback_activated=True):
+                 acceptable_loss_percentage=0.5, stop_loss_percentage=5, fallback_activated=True,
+                 ema_windows=(7, 25, 99), macd_signal_window=7, ma_windows=(7, 40),
+                 client=None, state=None, journal=None, protective_mode=None, take_profit_percentage=None,
+                 reprice_interval=None, reprice_deadline=5*60, order_book=None, allocator=None):
 
         print('------------------------------------------------')
         print('🤖 Robo Trader iniciando...')
@@ -70,42 +78,145 @@ class BinanceTraderBot:
         self.fallback_activated = fallback_activated      # Ativa estratégia de fallback
         self.acceptable_loss_percentage = acceptable_loss_percentage / 100
         self.stop_loss_percentage = stop_loss_percentage / 100
+        # Alvo de lucro acima da compra (OCO na corretora e venda pelo PriceWatcher); None = sem alvo
+        self.take_profit_percentage = take_profit_percentage / 100 if take_profit_percentage else None
+        self.ema_windows = tuple(ema_windows)           # Janelas das EMAs rápida/intermediária/lenta
+        self.macd_signal_window = macd_signal_window    # Janela da linha de sinal do MACD
+        self.ma_windows = tuple(ma_windows)             # Janelas das médias móveis do fallback
 
         # Tempos de espera
         self.time_to_trade = time_to_trade
         self.delay_after_order = delay_after_order
         self.time_to_sleep = time_to_trade
-
-        self.client_binance = BinanceClient(api_key, secret_key, sync=True, sync_interval=30000, verbose=True)
+        self.order_placed = False                       # True se a última execução enviou uma ordem (cooldown)
+        self.journal = journal                          # TradeJournal (SQLite) opcional com ordens e decisões
+        self.last_strategy = None                       # Estratégia que gerou a última decisão
+        self.trace = None                               # Trace da execução em andamento (modules.Tracing)
+        # Stop na corretora (STOP_LOSS_LIMIT ou OCO) mantido a cada execução; None = só o stop do bot
+        self.protective_orders = ProtectiveOrderManager(self, protective_mode, take_profit_percentage=take_profit_percentage) \
+            if protective_mode else None
+        # Ordens limitadas reprecificadas com cancel-replace até executar; None = cancela e reenvia no próximo ciclo
+        self.order_manager = OrderManager(self, reprice_interval, deadline=reprice_deadline) if reprice_interval else None
+        self.order_book = order_book                    # OrderBook local (modules.OrderBook) para precificar as ordens limitadas
+        self.allocator = allocator                      # PortfolioAllocator: conta compartilhada e tamanho das compras (tradedPercentage)
+
+        # Permite injetar outro cliente (ex.: SimulatedExchange do backtest) com a mesma interface
+        if client is None:
+            client = BinanceClient(api_key, secret_key, sync=True, sync_interval=30000, verbose=True)
+        self.client_binance = client
         self.actual_trade_position = False  # Inicialmente considerado vendido (False)
 
         # Inicializa stock_data para evitar AttributeError, mesmo que vazio
         self.stock_data = None
-
-        self.setStepSizeAndTickSize()
+        self.klines_cache = []          # Últimos candles brutos (atualizados de forma incremental)
+        self.orders_cache = {}          # orderId -> ordem (histórico recente do par)
+        self.order_cursor = None        # Menor orderId que ainda pode mudar (consulta incremental)
         self.last_stock_account_balance = 0.0
+        self.order_rules = None         # OrderRules: quantizadores e filtros do símbolo (validação antes do envio)
+        self.order_tracker = OrderTracker(operation_code)  # Estados locais das ordens por clientOrderId
+
+        # Com um snapshot, os filtros e caches vêm do disco e a primeira execução só busca as diferenças
+        if state is not None and self.restoreState(state):
+            print(f'♻️ Estado restaurado de {datetime.fromtimestamp(state["saved_at"]).strftime("%d-%m-%Y %H:%M:%S")}')
+        else:
+            self.setStepSizeAndTickSize()
+
+    @classmethod
+    def fromAsset(cls, asset, **kwargs):
+        """
+        Cria o bot a partir de um AssetStartModel (kwargs extras, como `client`, são repassados).
+        """
+        return cls(
+            stock_code=asset.stockCode,
+            operation_code=asset.operationCode,
+            traded_quantity=asset.tradedQuantity,
+            traded_percentage=asset.tradedPercentage,
+            candle_period=asset.candlePeriod,
+            volatility_factor=asset.volatilityFactor,
+            time_to_trade=asset.tempoEntreTrades,
+            delay_after_order=asset.delayEntreOrdens,
+            acceptable_loss_percentage=asset.acceptableLossPercentage,
+            stop_loss_percentage=asset.stopLossPercentage,
+            fallback_activated=asset.fallBackActivated,
+            ema_windows=(asset.emaFastWindow, asset.emaMidWindow, asset.emaSlowWindow),
+            macd_signal_window=asset.macdSignalWindow,
+            ma_windows=(asset.maFastWindow, asset.maSlowWindow),
+            **kwargs
+        )
+
+    def applyAsset(self, asset):
+        """
+        Aplica os parâmetros de um AssetStartModel alterado (recarga do arquivo de moedas) sem recriar o bot:
+        caches, posição e ordens acompanhadas continuam. Trocar o candlePeriod descarta só os candles em cache.
+        """
+        if asset.operationCode != self.operation_code or asset.stockCode != self.stock_code:
+            raise ValueError(f"{asset.operationCode} não é o par deste bot ({self.operation_code})")
+        if asset.candlePeriod != self.candle_period:
+            self.candle_period = asset.candlePeriod
+            self.klines_cache = []
+        self.traded_quantity = asset.tradedQuantity
+        self.traded_percentage = asset.tradedPercentage
+        self.volatility_factor = asset.volatilityFactor
+        self.fallback_activated = asset.fallBackActivated
+        self.acceptable_loss_percentage = asset.acceptableLossPercentage / 100
+        self.stop_loss_percentage = asset.stopLossPercentage / 100
+        self.ema_windows = (asset.emaFastWindow, asset.emaMidWindow, asset.emaSlowWindow)
+        self.macd_signal_window = asset.macdSignalWindow
+        self.ma_windows = (asset.maFastWindow, asset.maSlowWindow)
+        self.time_to_trade = asset.tempoEntreTrades
+        self.delay_after_order = asset.delayEntreOrdens
+
+    def timer(self, phase):
+        """Mede a duração de uma fase da execução (ver modules.Metrics)."""
+        return phase_metrics.timer(self.operation_code, phase)
+
+    def serverTime(self):
+        """Horário atual no relógio do servidor da Binance (ms)."""
+        return int(time.time() * 1000) + (getattr(self.client_binance, "timestamp_offset", 0) or 0)
+
+    def markTrace(self, stage, timestamp_ms=None):
+        if self.trace is not None:
+            self.trace.mark(stage, self.serverTime() if timestamp_ms is None else timestamp_ms)
+
+    def lastCandleCloseTime(self, now_ms):
+        """Fechamento (ms) do último candle já fechado no cache."""
+        for kline in reversed(self.klines_cache):
+            if int(kline[6]) < now_ms:
+                return int(kline[6]) + 1
+        return None
 
     def updateAllData(self, verbose=False):
         try:
-            self.account_data = self.getUpdatedAccountData()                        # Dados da conta
+            with self.timer("updateAllData.get_account"):
+                self.account_data = self.getUpdatedAccountData()                    # Dados da conta
             self.last_stock_account_balance = self.getLastStockAccountBalance()       # Balanço do ativo
             self.actual_trade_position = self.getActualTradePosition()              # Posição atual (comprado/vendido)
             
             # Obtém os dados de mercado (candles)
-            data = self.getStockData_ClosePrice_OpenTime()
+            with self.timer("updateAllData.get_klines"):
+                data = self.getStockData_ClosePrice_OpenTime()
+            if self.trace is not None:
+                now_ms = self.serverTime()
+                self.trace.mark("data", now_ms)
+                self.trace.mark("candle_close", self.lastCandleCloseTime(now_ms))
             if data is not None and not data.empty:
                 self.stock_data = data
             else:
                 print("Erro: stock_data retornado vazio. Inicializando com DataFrame vazio.")
                 self.stock_data = pd.DataFrame()
                 
-            self.open_orders = self.getOpenOrders()                                 # Ordens abertas
+            with self.timer("updateAllData.get_open_orders"):
+                self.open_orders = self.getOpenOrders()                             # Ordens abertas
+            with self.timer("updateAllData.get_all_orders"):
+                self.refreshOrders()                                                # Histórico (incremental)
             self.last_buy_price = self.getLastBuyPrice(verbose)
             self.last_sell_price = self.getLastSellPrice(verbose)
         except BinanceAPIException as e:
             print(f"Erro na atualização de dados: {e}")
 
     def getUpdatedAccountData(self):
+        if self.allocator is not None:
+            return self.allocator.accountSnapshot()
         return self.client_binance.get_account()
 
     def getLastStockAccountBalance(self):
@@ -128,8 +239,25 @@ class BinanceTraderBot:
             print(f"Erro ao determinar a posição atual para {self.operation_code}: {e}")
             return False
 
+    def getKlines(self, limit=500):
+        """
+        Candles com cache: depois da primeira carga, busca apenas a partir do último candle em cache
+        (que pode estar em formação) e mantém os `limit` mais recentes.
+        """
+        if self.klines_cache:
+            last_open_time = int(self.klines_cache[-1][0])
+            new_klines = self.client_binance.get_klines(symbol=self.operation_code, interval=self.candle_period,
+                                                        startTime=last_open_time, limit=limit)
+            # Com `limit` candles novos o cache ficou para trás demais: recarrega tudo
+            if len(new_klines) < limit:
+                kept = [k for k in self.klines_cache if int(k[0]) < last_open_time]
+                self.klines_cache = (kept + new_klines)[-limit:]
+                return self.klines_cache
+        self.klines_cache = self.client_binance.get_klines(symbol=self.operation_code, interval=self.candle_period, limit=limit)
+        return self.klines_cache
+
     def getStockData_ClosePrice_OpenTime(self, volatility_window=40):
-        candles = self.client_binance.get_klines(symbol=self.operation_code, interval=self.candle_period, limit=500)
+        candles = self.getKlines()
         prices = pd.DataFrame(candles)
         prices.columns = ["open_time", "open_price", "high_price", "low_price", "close_price",
                           "volume", "close_time", "quote_asset_volume", "number_of_trades",
@@ -145,9 +273,46 @@ class BinanceTraderBot:
         prices["volatility"] = prices["close_price"].rolling(window=volatility_window).std()
         return prices
 
+    def refreshOrders(self, limit=100):
+        """
+        Atualiza o histórico de ordens do par. Na primeira vez busca as últimas `limit` ordens;
+        depois, só as ordens a partir do cursor (a ordem aberta mais antiga, ou a última conhecida).
+        """
+        first_load = self.order_cursor is None
+        if first_load:
+            orders = self.client_binance.get_all_orders(symbol=self.operation_code, limit=limit)
+        else:
+            orders = self.client_binance.get_all_orders(symbol=self.operation_code, orderId=self.order_cursor, limit=1000)
+        previous = {order['orderId']: float(self.orders_cache[order['orderId']]['executedQty'])
+                    for order in orders if order['orderId'] in self.orders_cache}
+        for order in orders:
+            self.orders_cache[order['orderId']] = order
+        self.order_tracker.updateMany(orders)
+        if self.journal is not None:
+            self.journal.record_orders(orders)
+            # Na primeira carga o histórico já vem executado: buscar as execuções de todo ele custaria uma consulta por ordem
+            if not first_load:
+                self.recordFills(orders, previous)
+        # Mantém apenas as `limit` ordens mais recentes
+        for order_id in sorted(self.orders_cache)[:-limit]:
+            del self.orders_cache[order_id]
+        if self.orders_cache:
+            open_ids = [order_id for order_id, order in self.orders_cache.items()
+                        if order['status'] in ('NEW', 'PARTIALLY_FILLED')]
+            self.order_cursor = min(open_ids) if open_ids else max(self.orders_cache)
+        return list(self.orders_cache.values())
+
     def getLastBuyPrice(self, verbose=False):
         try:
-            all_orders = self.client_binance.get_all_orders(symbol=self.operation_code, limit=100)
+            # O diário guarda todo o histórico, mesmo as compras que já saíram do cache de ordens
+            if self.journal is not None:
+                last_buy_price = self.journal.last_entry_price(self.operation_code)
+                if last_buy_price is not None:
+                    if verbose:
+                        print(f"\nÚltima ordem de COMPRA executada para {self.operation_code}:")
+                        print(f" - Preço: {self.adjust_to_step(last_buy_price, self.tick_size, as_string=True)} (diário de trades)")
+                    return last_buy_price
+            all_orders = list(self.orders_cache.values()) or self.refreshOrders()
             executed_buy_orders = [
                 order for order in all_orders 
                 if order['side'] == 'BUY' and order['status'] == 'FILLED'
@@ -171,7 +336,7 @@ class BinanceTraderBot:
 
     def getLastSellPrice(self, verbose=False):
         try:
-            all_orders = self.client_binance.get_all_orders(symbol=self.operation_code, limit=100)
+            all_orders = list(self.orders_cache.values()) or self.refreshOrders()
             executed_sell_orders = [
                 order for order in all_orders 
                 if order['side'] == 'SELL' and order['status'] == 'FILLED'
@@ -193,6 +358,50 @@ class BinanceTraderBot:
                 print(f"Erro ao verificar a última ordem de VENDA executada para {self.operation_code}: {e}")
             return 0.0
 
+    def getState(self):
+        """Estado de negociação e caches do bot, serializável em JSON (ver StateStore)."""
+        return {
+            "operation_code": self.operation_code,
+            "saved_at": time.time(),
+            "step_size": self.step_size,
+            "tick_size": self.tick_size,
+            "filters": self.order_rules.filters if self.order_rules is not None else None,
+            "actual_trade_position": self.actual_trade_position,
+            "last_stock_account_balance": self.last_stock_account_balance,
+            "last_buy_price": self.last_buy_price,
+            "last_sell_price": self.last_sell_price,
+            "last_trade_decision": self.last_trade_decision,
+            "partial_quantity_discount": self.partial_quantity_discount,
+            "candle_period": self.candle_period,
+            "klines": self.klines_cache,
+            "orders": list(self.orders_cache.values()),
+            "order_cursor": self.order_cursor,
+            "tracked_orders": self.order_tracker.getState(),
+        }
+
+    def restoreState(self, state):
+        """Restaura um snapshot de `getState`. Retorna False se ele não for deste par."""
+        if state.get("operation_code") != self.operation_code:
+            return False
+        self.step_size = state["step_size"]
+        self.tick_size = state["tick_size"]
+        if state.get("filters"):
+            self.order_rules = OrderRules(self.operation_code, state["filters"])
+        else:
+            self.order_rules = OrderRules.from_sizes(self.operation_code, self.step_size, self.tick_size)
+        self.actual_trade_position = state["actual_trade_position"]
+        self.last_stock_account_balance = state["last_stock_account_balance"]
+        self.last_buy_price = state["last_buy_price"]
+        self.last_sell_price = state["last_sell_price"]
+        self.last_trade_decision = state["last_trade_decision"]
+        self.partial_quantity_discount = state["partial_quantity_discount"]
+        # Candles de outro período (ou de um snapshot sem o período) não servem: recarrega do zero
+        self.klines_cache = state["klines"] if state.get("candle_period") == self.candle_period else []
+        self.orders_cache = {order['orderId']: order for order in state["orders"]}
+        self.order_cursor = state["order_cursor"]
+        self.order_tracker.restoreState(state.get("tracked_orders"))
+        return True
+
     def getTimestamp(self):
         try:
             if not hasattr(self, 'time_offset') or self.time_offset is None:
@@ -210,12 +419,10 @@ class BinanceTraderBot:
             symbol_info = self.client_binance.get_symbol_info(self.operation_code)
             if symbol_info is None:
                 raise ValueError(f"Symbol info não encontrado para {self.operation_code}")
-            # Recupera o step_size (quantidade)
-            lot_size_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'LOT_SIZE')
-            self.step_size = float(lot_size_filter['stepSize'])
-            # Recupera o tick_size (preço)
-            price_filter = next(f for f in symbol_info['filters'] if f['filterType'] == 'PRICE_FILTER')
-            self.tick_size = float(price_filter['tickSize'])
+            # Filtros do símbolo (step_size da quantidade, tick_size do preço, notional...) montados uma vez
+            self.order_rules = OrderRules.from_symbol_info(symbol_info)
+            self.step_size = float(self.order_rules.step_size)
+            self.tick_size = float(self.order_rules.tick_size)
             logging.info(f"Step size: {self.step_size}, Tick size: {self.tick_size}")
         except Exception as e:
             logging.error(f"Erro ao configurar step_size e tick_size: {str(e)}")
@@ -223,15 +430,12 @@ class BinanceTraderBot:
             self.tick_size = 0.00001
 
     def adjust_to_step(self, value, step, as_string=False):
-        if step <= 0:
-            raise ValueError("O valor de 'step' deve ser maior que zero.")
-        decimal_places = max(0, abs(int(math.floor(math.log10(step))))) if step < 1 else 0
-        adjusted_value = math.floor(value / step) * step
-        adjusted_value = round(adjusted_value, decimal_places)
+        # Em Decimal: no float, floor(0.00099 / 0.00001) dá 98 e o valor perde um step
+        adjusted_value = quantize_down(value, step)
         if as_string:
-            return f"{adjusted_value:.{decimal_places}f}"
+            return f"{adjusted_value:.{decimal_places(step)}f}"
         else:
-            return adjusted_value
+            return float(adjusted_value)
 
     def printWallet(self):
         for stock in self.account_data["balances"]:
@@ -271,18 +475,29 @@ class BinanceTraderBot:
             if stock['asset'] == self.stock_code:
                 return stock
 
+    def buyQuantity(self):
+        """
+        Quantidade da próxima compra. Com o PortfolioAllocator, o tamanho calculado para todos os bots no
+        mesmo snapshot da conta (já descontado o que o saldo tem da moeda, inclusive execuções parciais);
+        sem ele, o tradedQuantity configurado menos o que as ordens abertas já executaram.
+        """
+        if self.allocator is not None:
+            return self.allocator.size(self.operation_code, self.traded_quantity - self.partial_quantity_discount)
+        return self.traded_quantity - self.partial_quantity_discount
+
     def buyMarketOrder(self):
         try:
             if not self.actual_trade_position:  # Se a posição estiver vendida
-                quantity = self.adjust_to_step((self.traded_quantity - self.partial_quantity_discount), self.step_size, as_string=True)
-                order_buy = self.client_binance.create_order(
+                quantity = self.adjust_to_step(self.buyQuantity(), self.step_size, as_string=True)
+                order_buy, already_tracked = self.submitOrder(
                     symbol=self.operation_code,
                     side=SIDE_BUY,
                     type=ORDER_TYPE_MARKET,
                     quantity=quantity
                 )
                 self.actual_trade_position = True
-                createLogOrder(order_buy)
+                if not already_tracked:
+                    self.logOrder(order_buy)
                 print(f"\nOrdem de COMPRA a mercado enviada com sucesso:")
                 print(order_buy)
                 return order_buy
@@ -307,17 +522,18 @@ class BinanceTraderBot:
                 limit_price = close_price + (0.002 * close_price)
             else:
                 limit_price = close_price + (0.005 * close_price)
+            limit_price = self.bookLimitPrice(SIDE_BUY, limit_price, self.buyQuantity())
         else:
             limit_price = price
         limit_price = self.adjust_to_step(limit_price, self.tick_size, as_string=True)
-        quantity = self.adjust_to_step(self.traded_quantity - self.partial_quantity_discount, self.step_size, as_string=True)
+        quantity = self.adjust_to_step(self.buyQuantity(), self.step_size, as_string=True)
         print(f"Enviando ordem limitada de COMPRA para {self.operation_code}:")
         print(f" - RSI: {rsi}")
         print(f" - Quantidade: {quantity}")
         print(f" - Close Price: {close_price}")
         print(f" - Preço Limite: {limit_price}")
         try:
-            order_buy = self.client_binance.create_order(
+            order_buy, already_tracked = self.submitOrder(
                 symbol=self.operation_code,
                 side=SIDE_BUY,
                 type=ORDER_TYPE_LIMIT,
@@ -327,8 +543,10 @@ class BinanceTraderBot:
             )
             self.actual_trade_position = True
             print(f"\nOrdem COMPRA limitada enviada com sucesso:")
-            if order_buy is not None:
-                createLogOrder(order_buy)
+            if order_buy is not None and not already_tracked:
+                self.logOrder(order_buy)
+                if self.order_manager is not None:
+                    self.order_manager.track(order_buy, SIDE_BUY, quantity)
             return order_buy
         except Exception as e:
             logging.error(f"Erro ao enviar ordem limitada de COMPRA: {e}")
@@ -339,14 +557,15 @@ class BinanceTraderBot:
         try:
             if self.actual_trade_position:  # Se a posição estiver comprada
                 quantity = self.adjust_to_step(self.last_stock_account_balance, self.step_size, as_string=True)
-                order_sell = self.client_binance.create_order(
+                order_sell, already_tracked = self.submitOrder(
                     symbol=self.operation_code,
                     side=SIDE_SELL,
                     type=ORDER_TYPE_MARKET,
                     quantity=quantity
                 )
                 self.actual_trade_position = False
-                createLogOrder(order_sell)
+                if not already_tracked:
+                    self.logOrder(order_sell)
                 print(f"\nOrdem de VENDA a mercado enviada com sucesso:")
                 return order_sell
             else:
@@ -370,6 +589,7 @@ class BinanceTraderBot:
                 limit_price = close_price - (0.002 * close_price)
             else:
                 limit_price = close_price - (0.005 * close_price)
+            limit_price = self.bookLimitPrice(SIDE_SELL, limit_price, self.last_stock_account_balance)
             if limit_price < (self.last_buy_price * (1 - self.acceptable_loss_percentage)):
                 print(f'\nAjuste de venda aceitável ({self.acceptable_loss_percentage*100}%):')
                 print(f' - De: {limit_price:.4f}')
@@ -385,7 +605,7 @@ class BinanceTraderBot:
         print(f" - Close Price: {close_price}")
         print(f" - Preço Limite: {limit_price}")
         try:
-            order_sell = self.client_binance.create_order(
+            order_sell, already_tracked = self.submitOrder(
                 symbol=self.operation_code,
                 side=SIDE_SELL,
                 type=ORDER_TYPE_LIMIT,
@@ -395,13 +615,107 @@ class BinanceTraderBot:
             )
             self.actual_trade_position = False
             print(f"\nOrdem VENDA limitada enviada com sucesso:")
-            createLogOrder(order_sell)
+            if not already_tracked:
+                self.logOrder(order_sell)
+                if self.order_manager is not None:
+                    self.order_manager.track(order_sell, SIDE_SELL, quantity)
             return order_sell
         except Exception as e:
             logging.error(f"Erro ao enviar ordem limitada de VENDA: {e}")
             print(f"\nErro ao enviar ordem limitada de VENDA: {e}")
             return False
 
+    def bookLimitPrice(self, side, limit_price, quantity):
+        """
+        Ajusta o limite pelo livro de ofertas: a compra não paga mais (e a venda não aceita menos) do que
+        o necessário para executar `quantity` agora. Sem livro sincronizado, mantém o limite.
+        """
+        if self.order_book is None:
+            return limit_price
+        fill_price = self.order_book.price_to_fill(side, quantity)
+        if fill_price is None:
+            return limit_price
+        print(f" - Livro de ofertas: {fill_price} executa {quantity:.8f} (spread {self.order_book.spread()})")
+        return min(limit_price, fill_price) if side == SIDE_BUY else max(limit_price, fill_price)
+
+    def submitOrder(self, **params):
+        """
+        Envia a ordem marcando no trace o envio, o `transactTime` da corretora e a resposta.
+        Retorna (ordem, já_acompanhada): já_acompanhada = True quando a mesma intenção já tinha uma ordem
+        aberta, devolvida sem novo envio; quem chama não a registra no log/diário nem no OrderManager de novo.
+        """
+        if self.order_rules is not None:
+            # Recusa local, sem gastar uma requisição assinada (o notional da ordem a mercado usa o último fechamento)
+            last_close = self.stock_data["close_price"].iloc[-1] if self.stock_data is not None and not self.stock_data.empty else None
+            self.order_rules.check(params, reference_price=last_close)
+        # clientOrderId determinístico: a mesma intenção (lado, tipo, candle) nunca vira duas ordens
+        tracked, _ = self.order_tracker.prepare(self.orderIntent(params)) if "newClientOrderId" not in params \
+            else (self.order_tracker.track(params["newClientOrderId"]), False)
+        params["newClientOrderId"] = tracked.client_id
+        if tracked.state == PENDING and tracked.attempts:
+            # Envio anterior sem resposta: uma consulta pelo clientOrderId decide antes de reenviar
+            order = self.order_tracker.resolve(self.client_binance, tracked)
+            if order is not None:
+                print(f"🔎 [{self.operation_code}] Ordem {tracked.client_id} já estava na corretora ({order['status']})")
+                return order, False  # O envio anterior falhou sem resposta: ainda não foi registrada
+        elif tracked.state in OPEN_STATES:
+            print(f"🔎 [{self.operation_code}] Ordem {tracked.client_id} já aberta: não reenviada")
+            return tracked.order, True
+        if params["side"] == SIDE_SELL and self.protective_orders is not None and self.protective_orders.release():
+            print(f"🛡️ [{self.operation_code}] Proteção cancelada para liberar o saldo da venda")
+        self.markTrace("order_sent")
+        tracked.attempts += 1
+        try:
+            order = self.client_binance.create_order(**params)
+        except Exception as e:
+            if not isAmbiguousError(e):
+                self.order_tracker.reject(tracked)
+                raise
+            # Timeout/5xx: a ordem pode ter chegado. Só o clientOrderId é consultado, sem atualizar a conta toda
+            logging.warning(f"[{self.operation_code}] Envio da ordem {tracked.client_id} sem resposta: {str(e)}")
+            order = self.order_tracker.resolve(self.client_binance, tracked)
+            if order is None:
+                raise
+            print(f"🔎 [{self.operation_code}] Ordem {tracked.client_id} confirmada pela consulta ({order['status']})")
+        self.order_tracker.update(order)
+        if self.allocator is not None:
+            self.allocator.invalidate()  # Saldos mudaram: o próximo bot busca a conta de novo
+        if order and self.trace is not None:
+            self.markTrace("order_ack")
+            self.trace.mark("transact", order.get("transactTime"))
+            self.trace.order_ids.append(order.get("orderId"))
+        return order, False
+
+    def recordFills(self, orders, previous):
+        """
+        Registra no diário as execuções (myTrades) das ordens que executaram algo desde a consulta anterior.
+        As ordens a mercado já trazem os `fills` na resposta do envio e não geram nova consulta.
+        """
+        for order in orders:
+            executed = float(order['executedQty'])
+            if order['status'] not in ('FILLED', 'PARTIALLY_FILLED', 'CANCELED', 'EXPIRED') or \
+                    executed <= previous.get(order['orderId'], 0.0) or \
+                    executed - self.journal.filled_qty(self.operation_code, order['orderId']) < self.step_size / 2:
+                continue
+            try:
+                trades = self.client_binance.get_my_trades(symbol=self.operation_code, orderId=order['orderId'])
+            except Exception as e:
+                logging.warning(f"[{self.operation_code}] Execuções da ordem {order['orderId']} não registradas: {str(e)}")
+                continue
+            self.journal.record_fills(self.operation_code, trades)
+
+    def orderIntent(self, params):
+        """(lado, tipo, candle da decisão): a chave do clientOrderId determinístico."""
+        now_ms = self.serverTime()
+        candle_ms = self.lastCandleCloseTime(now_ms) or now_ms // 60000 * 60000
+        return (params["side"], params["type"], candle_ms)
+
+    def logOrder(self, order):
+        """Exibe/loga a ordem enviada e a registra no diário com a estratégia que a gerou."""
+        createLogOrder(order)
+        if self.journal is not None:
+            self.journal.record_order(order, strategy=self.last_strategy)
+
     def getOpenOrders(self):
         open_orders = self.client_binance.get_open_orders(symbol=self.operation_code)
         return open_orders
@@ -411,12 +725,16 @@ class BinanceTraderBot:
 
     def cancelAllOrders(self):
         if self.open_orders:
+            remaining = []
             for order in self.open_orders:
                 try:
-                    self.client_binance.cancel_order(symbol=self.operation_code, orderId=order['orderId'])
+                    canceled = self.client_binance.cancel_order(symbol=self.operation_code, orderId=order['orderId'])
+                    self.order_tracker.update(canceled)
                     print(f"❌ Ordem {order['orderId']} cancelada.")
                 except Exception as e:
                     print(f"Erro ao cancelar ordem {order['orderId']}: {e}")
+                    remaining.append(order)
+            self.open_orders = remaining
 
     def hasOpenBuyOrder(self):
         self.partial_quantity_discount = 0.0
@@ -447,7 +765,9 @@ class BinanceTraderBot:
         self.partial_quantity_discount = 0.0
         try:
             open_orders = self.client_binance.get_open_orders(symbol=self.operation_code)
-            sell_orders = [order for order in open_orders if order['side'] == 'SELL']
+            # A proteção na corretora (prot-) não é uma venda da estratégia: não bloqueia o ciclo nem desconta quantidade
+            sell_orders = [order for order in open_orders
+                           if order['side'] == 'SELL' and not ProtectiveOrderManager.isProtective(order)]
             if sell_orders:
                 print(f"\nOrdens de venda abertas para {self.operation_code}:")
                 for order in sell_orders:
@@ -467,13 +787,14 @@ class BinanceTraderBot:
         """
         Obtém a decisão final de todas as estratégias configuradas
         """
-        from strategies.strategy_runner import run_all_strategies
+        from strategies.strategy_runner import run_all_strategies_named
         
         if self.stock_data is None or self.stock_data.empty:
             print("Erro: stock_data não está definido ou está vazio.")
             return None
             
-        return run_all_strategies(self)
+        self.last_strategy, decision = run_all_strategies_named(self)
+        return decision
 
     def getMinimumPriceToSell(self):
         return (self.last_buy_price * (1 - self.acceptable_loss_percentage))
@@ -490,12 +811,74 @@ class BinanceTraderBot:
         print(f' - Stop Loss em: {stop_loss_price:.4f} (-{self.stop_loss_percentage*100}%)\n')
         if close_price < stop_loss_price and weighted_price < stop_loss_price and self.actual_trade_position:
             print("🔴 Ativando STOP LOSS...")
+            self.last_strategy = "stop_loss"
             self.cancelAllOrders()
             time.sleep(2)
             self.sellMarketOrder()
             return True
         return False
 
+    def checkStopLoss(self):
+        """
+        Verificação leve de stop loss entre execuções: consulta só o último preço (ticker) e,
+        se estiver abaixo do stop, atualiza os dados e confirma com o `stopLossTrigger`.
+        """
+        if not self.actual_trade_position or not self.last_buy_price:
+            return False
+        price = float(self.client_binance.get_symbol_ticker(symbol=self.operation_code)["price"])
+        if price >= self.last_buy_price * (1 - self.stop_loss_percentage):
+            return False
+        self.updateAllData()
+        if self.stopLossTrigger():
+            print(f"📉 [{self.operation_code}] STOP LOSS executado na verificação entre candles...")
+            self.order_placed = True
+            return True
+        return False
+
+    def liveStopLoss(self, price):
+        """
+        Stop loss acionado pelo PriceWatcher com o preço do stream: vende a mercado sem esperar
+        o fechamento do candle (o `stopLossTrigger` confirma com dois fechamentos).
+        """
+        if not self.actual_trade_position or not self.last_buy_price:
+            return False
+        if price >= self.last_buy_price * (1 - self.stop_loss_percentage):
+            return False
+        print(f"🔴 [{self.operation_code}] STOP LOSS ao vivo: {price} abaixo de "
+              f"{self.last_buy_price * (1 - self.stop_loss_percentage):.4f}")
+        self.last_strategy = "stop_loss"
+        return self.liveSell()
+
+    def liveTakeProfit(self, price):
+        """
+        Take profit acionado pelo PriceWatcher: com o preço do stream no alvo (`take_profit_percentage`
+        acima da compra), vende a mercado sem esperar a próxima execução.
+        """
+        if not self.take_profit_percentage or not self.actual_trade_position or not self.last_buy_price:
+            return False
+        if price < self.last_buy_price * (1 + self.take_profit_percentage):
+            return False
+        print(f"🟢 [{self.operation_code}] TAKE PROFIT ao vivo: {price} acima de "
+              f"{self.last_buy_price * (1 + self.take_profit_percentage):.4f}")
+        self.last_strategy = "take_profit"
+        return self.liveSell()
+
+    def liveExit(self, price):
+        """Saída pelo preço ao vivo: stop loss abaixo do stop, take profit no alvo."""
+        return self.liveStopLoss(price) or self.liveTakeProfit(price)
+
+    def liveSell(self):
+        self.cancelAllOrders()
+        # Saldo atualizado: a proteção na corretora pode ter executado parte (ou toda) a posição
+        self.account_data = self.getUpdatedAccountData()
+        self.last_stock_account_balance = self.getLastStockAccountBalance()
+        self.actual_trade_position = self.getActualTradePosition()
+        if not self.actual_trade_position:
+            return False
+        order = self.sellMarketOrder()
+        self.order_placed = bool(order)
+        return bool(order)
+
     def create_order(self, _symbol, _side, _type, _quantity, _timeInForce=None, _limit_price=None, _stop_price=None):
         order_buy = TraderOrder.create_order(
             self.client_binance,
@@ -510,12 +893,25 @@ class BinanceTraderBot:
         return order_buy
 
     def execute(self):
+        self.trace = tracer.start(self.operation_code)
+        try:
+            with self.timer("execute"):
+                self.executeCycle()
+        finally:
+            tracer.finish(self.trace)
+            self.trace = None
+
+    def executeCycle(self):
         print('------------------------------------------------')
         print(f'🟢 Executado {datetime.now().strftime("(%H:%M:%S) %d-%m-%Y")}\n')
-        self.updateAllData(verbose=True)
+        self.order_placed = False
+        with self.timer("updateAllData"):
+            self.updateAllData(verbose=True)
         # Nova parte: Aplicação da estratégia EMA MACD e impressão do resultado
         if self.stock_data is not None and not self.stock_data.empty:
-            point_signal = sinal_compra_venda(self.stock_data)
+            with self.timer("sinal_compra_venda"):
+                point_signal = sinal_compra_venda(self.stock_data, *self.ema_windows, signal_window=self.macd_signal_window)
+            self.markTrace("features")
             print("\nResultados da estratégia EMA MACD:")
             print(point_signal)
         else:
@@ -525,48 +921,85 @@ class BinanceTraderBot:
         print(f' - Posição atual: {"Comprado" if self.actual_trade_position else "Vendido"}')
         print(f' - Balanço atual: {self.last_stock_account_balance:.4f} ({self.stock_code})')
         # Estratégia de stop loss
-        if self.stopLossTrigger():
+        with self.timer("stopLossTrigger"):
+            stop_loss_executed = self.stopLossTrigger()
+        if stop_loss_executed:
             print("📉 STOP LOSS executado...")
+            self.order_placed = True
             return
         # Obtém a decisão final (comprar, vender ou manter)
-        self.last_trade_decision = self.getFinalDecisionStrategy()
+        with self.timer("getFinalDecisionStrategy"):
+            self.last_trade_decision = self.getFinalDecisionStrategy()
+        self.markTrace("decision")
+        if self.journal is not None and self.stock_data is not None and not self.stock_data.empty:
+            self.journal.record_decision(self.operation_code, self.last_trade_decision, self.last_strategy,
+                                         float(self.stock_data["close_price"].iloc[-1]), self.actual_trade_position,
+                                         timestamp=int(time.time() * 1000))
+        # Ordem limitada acompanhada pelo OrderManager: reprecifica no lugar em vez de cancelar e reenviar
+        managed = False
+        if self.order_manager is not None and self.order_manager.hasWorkingOrder():
+            with self.timer("reprice"):
+                managed = self.order_manager.manageOnDecision(self.last_trade_decision)
         # Se houver ordens abertas da mesma direção, cancele-as
-        if self.last_trade_decision == True:
+        elif self.last_trade_decision == True:
             if self.hasOpenBuyOrder():
                 self.cancelAllOrders()
                 time.sleep(2)
-        if self.last_trade_decision == False:
+        elif self.last_trade_decision == False:
             if self.hasOpenSellOrder():
                 self.cancelAllOrders()
                 time.sleep(2)
         print('\n--------------')
         print(f'🔎 Decisão Final: {"Comprar" if self.last_trade_decision == True else "Vender" if self.last_trade_decision == False else "Inconclusiva"}')
-        if self.actual_trade_position == False and self.last_trade_decision == True:
+        if managed and self.order_manager.hasWorkingOrder():
+            print('🏁 Ação final: Manter a ordem limitada em andamento')
+            print('--------------')
+            self.time_to_sleep = self.time_to_trade
+        elif managed:
+            # A ordem acompanhada executou (ou foi a mercado) nesta reprecificação: só atualiza a posição
+            print('🏁 Ação final: Ordem limitada concluída')
+            print('--------------')
+            with self.timer("refresh_pos_ordem"):
+                self.updateAllData(verbose=True)
+            self.time_to_sleep = self.delay_after_order
+            self.order_placed = True
+        elif self.actual_trade_position == False and self.last_trade_decision == True:
             print('🏁 Ação final: Comprar')
             print('--------------')
             print(f'\nCarteira em {self.stock_code} [ANTES]:')
             self.printStock()
-            self.buyLimitedOrder()
-            time.sleep(2)
-            self.updateAllData(verbose=True)
+            with self.timer("order"):
+                self.buyLimitedOrder()
+            if self.order_manager is None:
+                time.sleep(2)
+            with self.timer("refresh_pos_ordem"):
+                self.updateAllData(verbose=True)
             print(f'Carteira em {self.stock_code} [DEPOIS]:')
             self.printStock()
             self.time_to_sleep = self.delay_after_order
+            self.order_placed = True
         elif self.actual_trade_position == True and self.last_trade_decision == False:
             print('🏁 Ação final: Vender')
             print('--------------')
             print(f'\nCarteira em {self.stock_code} [ANTES]:')
             self.printStock()
-            self.sellLimitedOrder()
-            time.sleep(2)
-            self.updateAllData(verbose=True)
+            with self.timer("order"):
+                self.sellLimitedOrder()
+            if self.order_manager is None:
+                time.sleep(2)
+            with self.timer("refresh_pos_ordem"):
+                self.updateAllData(verbose=True)
             print(f'\nCarteira em {self.stock_code} [DEPOIS]:')
             self.printStock()
             self.time_to_sleep = self.delay_after_order
+            self.order_placed = True
         else:
             print(f'🏁 Ação final: Manter posição ({"Comprado" if self.actual_trade_position else "Vendido"})')
             print('--------------')
             self.time_to_sleep = self.time_to_trade
+        if self.protective_orders is not None:
+            with self.timer("protective_orders"):
+                self.protective_orders.reconcile()
         print('------------------------------------------------')
 
 # Fim da classe BinanceTraderBot
@@ -0,0 +1,44 @@
+import threading
+import time
+
+
+class ExchangeInfoCache:
+    """
+    Cache dos metadados de símbolos (`exchangeInfo`: filtros de tick/step, notional, status).
+
+    O `get_symbol_info` da python-binance baixa o exchangeInfo inteiro (peso 20) a cada chamada.
+    Com o cache, cada símbolo é consultado uma vez por `ttl` segundos, e a mesma instância pode ser
+    compartilhada entre bots, threads ou processos (via ShardCoordinator).
+    """
+
+    def __init__(self, ttl=60 * 60):
+        self.ttl = ttl
+        self._symbols = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, symbol):
+        """Retorna o symbol_info em cache, ou None se ausente/expirado."""
+        with self._lock:
+            entry = self._symbols.get(symbol.upper())
+            if entry is None or time.time() - entry[0] > self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def put(self, symbol, info):
+        with self._lock:
+            self._symbols[symbol.upper()] = (time.time(), info)
+
+    def put_exchange_info(self, exchange_info):
+        """Guarda todos os símbolos de uma resposta completa de `get_exchange_info`."""
+        now = time.time()
+        with self._lock:
+            for info in exchange_info.get("symbols", []):
+                self._symbols[info["symbol"]] = (now, info)
+
+    def stats(self):
+        with self._lock:
+            return {"symbols": len(self._symbols), "hits": self.hits, "misses": self.misses}
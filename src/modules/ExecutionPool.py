@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+# Prioridades (menor = executa antes)
+PRIORITY_STOP_LOSS = 0
+PRIORITY_REPRICE = 5
+PRIORITY_EXECUTE = 10
+
+
+class ExecutionPool:
+    """
+    Pool de execução com número fixo de threads, fila de prioridade e exclusão mútua por símbolo.
+
+    Tarefas do mesmo símbolo nunca rodam ao mesmo tempo: se o símbolo já está em execução, a tarefa
+    aguarda ao lado sem ocupar uma thread e volta para a fila quando a anterior termina.
+    Verificações de stop loss (`PRIORITY_STOP_LOSS`) passam na frente das execuções de rotina.
+    """
+
+    def __init__(self, max_workers=2, metrics_window=500):
+        self.max_workers = max_workers
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running_keys = set()
+        self._deferred = {}
+        self._shutdown = False
+        self._wait_times = deque(maxlen=metrics_window)
+        self._run_times = deque(maxlen=metrics_window)
+        self.completed = 0
+        self.failed = 0
+        self._threads = [threading.Thread(target=self._worker, name=f"execution-pool-{i}", daemon=True)
+                         for i in range(max_workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key, fn, *args, priority=PRIORITY_EXECUTE, **kwargs):
+        """Enfileira `fn(*args, **kwargs)` para o símbolo `key`. Retorna um Future."""
+        future = Future()
+        task = (priority, next(self._counter), key, fn, args, kwargs, future, time.monotonic())
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("ExecutionPool encerrado")
+            heapq.heappush(self._queue, task)
+            self._condition.notify()
+        return future
+
+    def _next_task(self):
+        with self._condition:
+            while True:
+                while not self._queue and not self._shutdown:
+                    self._condition.wait()
+                if not self._queue:
+                    return None
+                task = heapq.heappop(self._queue)
+                key = task[2]
+                if key in self._running_keys:
+                    # Símbolo ocupado: guarda a tarefa até a execução atual terminar
+                    self._deferred.setdefault(key, []).append(task)
+                    continue
+                self._running_keys.add(key)
+                return task
+
+    def _worker(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            priority, _, key, fn, args, kwargs, future, enqueued_at = task
+            started = time.monotonic()
+            try:
+                if future.set_running_or_notify_cancel():
+                    future.set_result(fn(*args, **kwargs))
+                    self.completed += 1
+            except Exception as e:
+                logging.error(f"Erro na tarefa de {key}: {str(e)}")
+                future.set_exception(e)
+                self.failed += 1
+            finally:
+                with self._condition:
+                    self._wait_times.append(started - enqueued_at)
+                    self._run_times.append(time.monotonic() - started)
+                    self._running_keys.discard(key)
+                    for deferred in self._deferred.pop(key, []):
+                        heapq.heappush(self._queue, deferred)
+                    self._condition.notify_all()
+
+    def drain(self, key, timeout=None):
+        """
+        Cancela as tarefas do símbolo ainda na fila e espera a que estiver em execução terminar
+        (ex.: antes de entregar o símbolo a outro processo). Retorna False se ela não terminou no `timeout`.
+        """
+        with self._condition:
+            for task in self._queue + [task for task in self._deferred.get(key, [])]:
+                if task[2] == key:
+                    task[6].cancel()
+            return self._condition.wait_for(lambda: key not in self._running_keys, timeout)
+
+    def queue_depth(self):
+        with self._condition:
+            return len(self._queue) + sum(len(tasks) for tasks in self._deferred.values())
+
+    def metrics(self):
+        """Profundidade da fila e tempos de espera/execução (em segundos) das últimas tarefas."""
+        with self._condition:
+            waits = sorted(self._wait_times)
+            runs = sorted(self._run_times)
+            depth = len(self._queue) + sum(len(tasks) for tasks in self._deferred.values())
+            running = len(self._running_keys)
+
+        def percentile(values, p):
+            return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+        return {
+            "queue_depth": depth,
+            "running": running,
+            "completed": self.completed,
+            "failed": self.failed,
+            "wait_avg": sum(waits) / len(waits) if waits else 0.0,
+            "wait_p95": percentile(waits, 0.95),
+            "wait_max": waits[-1] if waits else 0.0,
+            "run_avg": sum(runs) / len(runs) if runs else 0.0,
+            "run_p95": percentile(runs, 0.95),
+        }
+
+    def summary(self):
+        m = self.metrics()
+        return (f"🧵 Pool: {m['running']}/{self.max_workers} em execução | Fila: {m['queue_depth']} | "
+                f"Espera média: {m['wait_avg']:.2f}s (p95 {m['wait_p95']:.2f}s) | "
+                f"Execução média: {m['run_avg']:.2f}s | Concluídas: {m['completed']} | Falhas: {m['failed']}")
+
+    def shutdown(self, wait=True):
+        with self._condition:
+            self._shutdown = True
+            self._condition.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
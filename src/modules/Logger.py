@@ -1,18 +1,125 @@
+import atexit
+import json
 import logging
-from datetime import datetime
 import os
+import queue
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+
+LOG_FILE = 'src/logs/trading_bot.log'
+
+order_logger = logging.getLogger("orders")
+_listener = None
+_listener_pid = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Uma linha JSON por registro. Campos passados em `extra={"data": {...}}` vão junto."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        data = getattr(record, "data", None)
+        if data is not None:
+            entry["data"] = data
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RotatingJsonFileHandler(TimedRotatingFileHandler):
+    """Rotaciona por tempo (`when`) e também quando o arquivo passa de `max_bytes`."""
+
+    def __init__(self, filename, max_bytes=10 * 1024 * 1024, when="midnight", backup_count=14):
+        super().__init__(filename, when=when, backupCount=backup_count, encoding="utf-8", delay=True)
+        self.max_bytes = max_bytes
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if self.max_bytes <= 0:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.max_bytes
+
+    def rotation_filename(self, default_name):
+        # Mais de uma rotação por tamanho no mesmo período: trading_bot.log.2024-01-01.1, .2, ...
+        name, index = default_name, 0
+        while os.path.exists(name):
+            index += 1
+            name = f"{default_name}.{index}"
+        return name
+
+
+class _QueueHandler(QueueHandler):
+    """Como o QueueHandler, mas mantém a mensagem e o traceback em campos separados."""
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(record.__dict__)
+        record.message = record.getMessage()
+        record.msg, record.args = record.message, None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def configureLogging(log_file=LOG_FILE, level=logging.INFO, console_level=None,
+                     max_bytes=10 * 1024 * 1024, when="midnight", backup_count=14):
+    """
+    Configura o logging do processo de forma assíncrona: os bots só colocam o registro em uma fila
+    (sem I/O de disco na thread que chamou) e uma thread em segundo plano grava as linhas JSON no
+    arquivo rotacionado. `console_level` (ex.: "WARNING") também envia os registros ao console;
+    None deixa o console só com os prints do bot.
+    """
+    global _listener, _listener_pid
+    stopLogging()
+
+    os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+    file_handler = RotatingJsonFileHandler(log_file, max_bytes=max_bytes, when=when, backup_count=backup_count)
+    file_handler.setFormatter(JsonFormatter())
+    handlers = [file_handler]
+    if console_level is not None:
+        console_handler = logging.StreamHandler()
+        console_handler.setLevel(console_level)
+        console_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(console_handler)
 
-# Cria o diretório de logs se não existir
-log_dir = 'src/logs'
-if not os.path.exists(log_dir):
-    os.makedirs(log_dir)
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_QueueHandler(log_queue))
+    root.setLevel(level)
 
-# Configurar o logger
-logging.basicConfig(
-    filename='src/logs/trading_bot.log',
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
+    _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+    return _listener
+
+
+def stopLogging():
+    """Grava o que ainda estiver na fila e fecha os arquivos."""
+    global _listener
+    if _listener is None:
+        return
+    # Em um processo filho (fork) a thread do listener não existe: apenas descarta a referência
+    if _listener_pid == os.getpid():
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+    _listener = None
+
+
+atexit.register(stopLogging)
 
 # Printa e cria um log de ordem de compra ou venda.
 # a partir do objeto retornado pela API da Binance
@@ -34,26 +141,6 @@ def createLogOrder(order):
     # Convertendo timestamp para data/hora legível
     datetime_transact = datetime.utcfromtimestamp(timestamp / 1000).strftime('(%H:%M:%S) %Y-%m-%d')
 
-    # Criando as mensagens para log
-    log_message = (
-        "\n--------------------\n"
-        "ORDEM ENVIADA: \n"
-        f"Status: {getOrderStatus(status)}\n"
-        f"Side: {side}\n"
-        f"Ativo: {asset}\n"
-        f"Quantidade: {quantity}\n"
-        f"Preço enviado: {price}\n"
-        f"Valor na {'compra' if side == 'BUY' else 'venda'}: {price_per_unit}\n"
-        f"Moeda: {currency}\n"
-        f"Total em {currency}: {total_value}\n"
-        f"Type: {type}\n"
-        f"Data/Hora: {datetime_transact}\n"
-        "\n"
-        "Complete_order:\n"
-        f"{order}"
-        "\n-----------------------------------------\n"
-    )
-
     # Criando as mensagens para print
     print_message = (
         "\n--------------------\n"
@@ -77,8 +164,8 @@ def createLogOrder(order):
     # Exibindo no console
     print(print_message)
 
-    # Registrando no log
-    logging.info(log_message)
+    # Registrando no log: a ordem completa vai como campo JSON, serializada pela thread de log
+    order_logger.info("Ordem enviada: %s %s %s (%s)", side, asset, type, status, extra={"data": order})
 
 # # Exemplo de uso
 # if __name__ == "__main__":
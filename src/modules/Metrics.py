@@ -0,0 +1,229 @@
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class PhaseMetrics:
+    """
+    Duração das fases do `execute()` por símbolo (janela móvel das últimas `window` medições),
+    com percentis p50/p95/p99. Thread-safe: os bots rodam em paralelo no ExecutionPool.
+    """
+
+    def __init__(self, window=500):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._counts = Counter()
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def timer(self, symbol, phase):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(symbol, phase, time.perf_counter() - began)
+
+    def record(self, symbol, phase, seconds):
+        with self._lock:
+            self._samples[(symbol, phase)].append(seconds)
+            self._counts[(symbol, phase)] += 1
+
+    def add_gauges(self, name, source):
+        """Registra uma função que devolve um dict de valores (ex.: `ExecutionPool.metrics`)."""
+        self._gauges[name] = source
+
+    def summary(self):
+        """{(símbolo, fase): {count, last, p50, p95, p99, max}} em segundos."""
+        with self._lock:
+            items = [(key, list(values), self._counts[key]) for key, values in self._samples.items()]
+        result = {}
+        for key, values, count in items:
+            ordered = sorted(values)
+            result[key] = {
+                "count": count,
+                "last": values[-1],
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+            }
+        return result
+
+    def render(self):
+        """Texto no formato de exposição do Prometheus."""
+        lines = ["# TYPE bot_phase_seconds summary"]
+        for (symbol, phase), stats in sorted(self.summary().items()):
+            labels = f'symbol="{symbol}",phase="{phase}"'
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'bot_phase_seconds{{{labels},quantile="0.{quantile[1:]}"}} {stats[quantile]:.6f}')
+            lines.append(f"bot_phase_seconds_max{{{labels}}} {stats['max']:.6f}")
+            lines.append(f"bot_phase_seconds_count{{{labels}}} {stats['count']}")
+        for name, source in self._gauges.items():
+            try:
+                values = source()
+            except Exception as e:
+                lines.append(f"# erro em {name}: {e}")
+                continue
+            for key, value in values.items():
+                lines.append(f"bot_{name}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+class Profiler:
+    """
+    Profiler ligado/desligado em tempo de execução.
+
+    - "cprofile": perfil determinístico de cada `execute()` (via `profile_call`), acumulado em um pstats;
+    - "sampling": uma thread amostra a pilha de todas as threads a cada `interval` segundos
+      (custo baixo, bom para uso contínuo em produção).
+    """
+
+    def __init__(self, interval=0.005):
+        self.mode = None
+        self.interval = interval
+        self._stats = None
+        self._samples = Counter()
+        self._sample_count = 0
+        self._lock = threading.Lock()
+        self._sampler = None
+
+    def start(self, mode="cprofile"):
+        if mode not in ("cprofile", "sampling"):
+            raise ValueError(f"Modo de profiling inválido: {mode}")
+        self.stop()
+        with self._lock:
+            self.mode = mode
+            self._stats = None
+            self._samples = Counter()
+            self._sample_count = 0
+        if mode == "sampling":
+            self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        with self._lock:
+            self.mode = None
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def profile_call(self, fn, *args, **kwargs):
+        """Executa `fn` sob o cProfile quando o modo "cprofile" estiver ativo."""
+        if self.mode != "cprofile":
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            return profile.runcall(fn, *args, **kwargs)
+        finally:
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profile)
+                else:
+                    self._stats.add(profile)
+
+    def _sample_loop(self):
+        own = threading.get_ident()
+        while self.mode == "sampling":
+            frames = sys._current_frames()
+            with self._lock:
+                self._sample_count += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own:
+                        continue
+                    # Conta cada função presente na pilha uma vez por amostra (tempo inclusivo)
+                    seen = set()
+                    while frame is not None:
+                        code = frame.f_code
+                        seen.add(f"{code.co_filename}:{code.co_firstlineno} {code.co_name}")
+                        frame = frame.f_back
+                    self._samples.update(seen)
+            time.sleep(self.interval)
+
+    def report(self, limit=30):
+        with self._lock:
+            if self._stats is not None:
+                output = io.StringIO()
+                stats = pstats.Stats(stream=output)
+                stats.add(self._stats)
+                stats.sort_stats("cumulative").print_stats(limit)
+                return output.getvalue()
+            if self._sample_count:
+                lines = [f"{self._sample_count} amostras (inclusivo: função ou chamadores na pilha)"]
+                for location, count in self._samples.most_common(limit):
+                    lines.append(f"{count / self._sample_count * 100:6.1f}%  {location}")
+                return "\n".join(lines) + "\n"
+        return "Sem dados de profiling. Use /profile/start?mode=cprofile ou mode=sampling.\n"
+
+
+# Instâncias compartilhadas pelo processo (bots, agendador e endpoint)
+phase_metrics = PhaseMetrics()
+profiler = Profiler()
+
+
+class MetricsServer:
+    """
+    Endpoint HTTP local de métricas:
+      GET /metrics                       -> percentis por fase e métricas do pool
+      GET /profile/start?mode=cprofile   -> liga o profiler (cprofile | sampling)
+      GET /profile/stop                  -> desliga
+      GET /profile                       -> relatório do profiler
+    """
+
+    def __init__(self, port=9108, host="127.0.0.1", metrics=None, profiler_instance=None):
+        self.metrics = metrics or phase_metrics
+        self.profiler = profiler_instance or profiler
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                try:
+                    if url.path == "/metrics":
+                        body = server.metrics.render()
+                    elif url.path == "/profile/start":
+                        mode = parse_qs(url.query).get("mode", ["cprofile"])[0]
+                        server.profiler.start(mode)
+                        body = f"Profiler ligado ({mode})\n"
+                    elif url.path == "/profile/stop":
+                        server.profiler.stop()
+                        body = "Profiler desligado\n"
+                    elif url.path == "/profile":
+                        body = server.profiler.report()
+                    else:
+                        self.send_error(404)
+                        return
+                except ValueError as e:
+                    self.send_error(400, str(e))
+                    return
+                data = body.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; charset=utf-8")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Não polui o console do bot
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.httpd.server_address[1]
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
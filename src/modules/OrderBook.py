@@ -0,0 +1,272 @@
+import logging
+import threading
+from bisect import bisect_left
+
+from modules.PriceWatcher import BinanceStreamTransport
+
+DEPTH_SPEED = "100ms"       # Diferenças do livro a cada 100 ms (ou "1000ms")
+
+
+class BookSide:
+    """
+    Um lado do livro em arrays ordenados (preço -> quantidade). Os preços são guardados já na
+    ordem de prioridade (compras negativas), então o índice 0 é sempre o melhor nível.
+    """
+
+    __slots__ = ("sign", "keys", "quantities")
+
+    def __init__(self, descending):
+        self.sign = -1.0 if descending else 1.0
+        self.keys = []
+        self.quantities = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def set(self, price, quantity):
+        key = self.sign * price
+        index = bisect_left(self.keys, key)
+        exists = index < len(self.keys) and self.keys[index] == key
+        if quantity <= 0:
+            if exists:
+                del self.keys[index]
+                del self.quantities[index]
+        elif exists:
+            self.quantities[index] = quantity
+        else:
+            self.keys.insert(index, key)
+            self.quantities.insert(index, quantity)
+
+    def load(self, levels):
+        pairs = sorted((self.sign * float(price), float(quantity)) for price, quantity, *_ in levels if float(quantity) > 0)
+        self.keys = [key for key, _ in pairs]
+        self.quantities = [quantity for _, quantity in pairs]
+
+    def best(self):
+        return self.sign * self.keys[0] if self.keys else None
+
+    def top(self, n):
+        return [(self.sign * key, quantity) for key, quantity in zip(self.keys[:n], self.quantities[:n])]
+
+    def price_to_fill(self, quantity):
+        """Pior preço que uma ordem de `quantity` atinge consumindo este lado (None se o livro não tem volume)."""
+        remaining = quantity
+        for key, available in zip(self.keys, self.quantities):
+            remaining -= available
+            if remaining <= 1e-12:
+                return self.sign * key
+        return None
+
+
+class OrderBook:
+    """
+    Livro de ofertas local de um símbolo: snapshot REST (`/depth`) mais o stream de diferenças
+    (`<símbolo>@depth@100ms`), seguindo o procedimento da Binance:
+
+    - eventos chegam desde antes do snapshot e ficam em buffer até ele carregar;
+    - descarta os eventos com `u` <= `lastUpdateId` do snapshot;
+    - o primeiro evento aplicado cobre `lastUpdateId + 1` (`U` <= `lastUpdateId` + 1 <= `u`), esteja no
+      buffer ou chegue depois do snapshot; a partir dele, cada `U` é o `u` anterior + 1;
+    - qualquer buraco na sequência descarta o livro e recomeça do snapshot (`synced` fica False).
+    """
+
+    def __init__(self, symbol, client, depth_limit=1000):
+        self.symbol = symbol
+        self.client = client
+        self.depth_limit = depth_limit
+        self.bids = BookSide(descending=True)
+        self.asks = BookSide(descending=False)
+        self.last_update_id = None
+        self.synced = False
+        self.resyncs = 0
+        self._bridging = False      # Snapshot carregado e nenhum evento aplicado ainda
+        self._buffer = []
+        self._loading = False
+        self._lock = threading.RLock()
+
+    # ---------------------------------------------------------------- Sincronização
+
+    def reset(self):
+        """Descarta o livro (ex.: reconexão do stream); o próximo evento recomeça do snapshot."""
+        with self._lock:
+            self.synced = False
+            self._buffer = []
+
+    def on_event(self, event):
+        """Evento `depthUpdate` do stream (chamado na thread do websocket)."""
+        with self._lock:
+            if not self.synced:
+                self._buffer.append(event)
+                self._start_resync()
+                return
+            if event["u"] <= self.last_update_id:
+                return
+            if not self._continues(event):
+                logging.warning(f"[{self.symbol}] Buraco no livro de ofertas ({self.last_update_id} -> {event['U']}): ressincronizando")
+                self.synced = False
+                self._buffer = [event]
+                self._start_resync()
+                return
+            self._apply(event)
+
+    def _continues(self, event):
+        # O snapshot vem do REST enquanto o stream segue: o primeiro evento depois dele costuma atravessar o lastUpdateId
+        if self._bridging:
+            return event["U"] <= self.last_update_id + 1 <= event["u"]
+        return event["U"] == self.last_update_id + 1
+
+    def _start_resync(self):
+        # O snapshot é buscado fora da thread do websocket; os eventos seguem no buffer
+        if self._loading:
+            return
+        self._loading = True
+        threading.Thread(target=self.resync, name=f"order-book-{self.symbol}", daemon=True).start()
+
+    def resync(self):
+        try:
+            snapshot = self.client.get_order_book(symbol=self.symbol, limit=self.depth_limit)
+            with self._lock:
+                self.load_snapshot(snapshot)
+        except Exception as e:
+            logging.error(f"[{self.symbol}] Erro ao carregar o snapshot do livro de ofertas: {str(e)}")
+        finally:
+            with self._lock:
+                self._loading = False
+
+    def load_snapshot(self, snapshot):
+        """Carrega o snapshot e aplica o buffer. Se o snapshot é antigo demais para o buffer, espera o próximo evento."""
+        last_update_id = snapshot["lastUpdateId"]
+        buffered = [event for event in self._buffer if event["u"] > last_update_id]
+        if buffered and buffered[0]["U"] > last_update_id + 1:
+            return False  # Snapshot anterior ao primeiro evento: o próximo evento pede outro
+        self.bids.load(snapshot["bids"])
+        self.asks.load(snapshot["asks"])
+        self.last_update_id = last_update_id
+        self.synced = True
+        self._bridging = True
+        self.resyncs += 1
+        self._buffer = []
+        for event in buffered:
+            if not self._continues(event):
+                self.synced = False
+                self._buffer = [event]
+                return False
+            self._apply(event)
+        return True
+
+    def _apply(self, event):
+        for price, quantity in event["b"]:
+            self.bids.set(float(price), float(quantity))
+        for price, quantity in event["a"]:
+            self.asks.set(float(price), float(quantity))
+        self.last_update_id = event["u"]
+        self._bridging = False
+
+    # ---------------------------------------------------------------- Consultas
+
+    def best_bid(self):
+        with self._lock:
+            return self.bids.best() if self.synced else None
+
+    def best_ask(self):
+        with self._lock:
+            return self.asks.best() if self.synced else None
+
+    def spread(self):
+        with self._lock:
+            if not self.synced or not self.bids or not self.asks:
+                return None
+            return self.asks.best() - self.bids.best()
+
+    def top(self, n=10):
+        """([(preço, quantidade)] das compras, [(preço, quantidade)] das vendas), melhores primeiro."""
+        with self._lock:
+            return self.bids.top(n), self.asks.top(n)
+
+    def price_to_fill(self, side, quantity):
+        """
+        Preço limite que executa `quantity` agora: uma COMPRA consome as vendas (asks) e uma VENDA,
+        as compras (bids). None se o livro não está sincronizado ou não tem volume suficiente.
+        """
+        with self._lock:
+            if not self.synced:
+                return None
+            return (self.asks if side == "BUY" else self.bids).price_to_fill(quantity)
+
+
+class OrderBookFeed:
+    """
+    Livros de vários símbolos numa única conexão de streams combinados (`<símbolo>@depth@100ms`).
+    Os símbolos incluídos depois do início entram numa reconexão agrupada.
+    """
+
+    def __init__(self, client, transport=None, depth_limit=1000, speed=DEPTH_SPEED, resubscribe_delay=1.0):
+        self.client = client
+        self.transport = transport or BinanceStreamTransport()
+        self.depth_limit = depth_limit
+        self.speed = speed
+        self.resubscribe_delay = resubscribe_delay
+        self.books = {}
+        self._lock = threading.Lock()
+        self._timer = None
+        self._running = False
+
+    def stream_name(self, symbol):
+        return f"{symbol.lower()}@depth@{self.speed}"
+
+    def book(self, symbol):
+        """Livro do símbolo (criado e incluído no stream na primeira chamada)."""
+        with self._lock:
+            book = self.books.get(symbol)
+            if book is not None:
+                return book
+            book = self.books[symbol] = OrderBook(symbol, self.client, self.depth_limit)
+        self._schedule_resubscribe()
+        return book
+
+    def remove(self, symbol):
+        with self._lock:
+            self.books.pop(symbol, None)
+        self._schedule_resubscribe()
+
+    def start(self):
+        self._running = True
+        self._subscribe()
+
+    def stop(self):
+        self._running = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.transport.stop()
+
+    def _schedule_resubscribe(self):
+        if not self._running:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.resubscribe_delay, self._subscribe)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _subscribe(self):
+        with self._lock:
+            books = list(self.books.values())
+            self._timer = None
+        # Reconectar perde eventos: todos os livros recomeçam do snapshot
+        for book in books:
+            book.reset()
+        try:
+            self.transport.start([self.stream_name(book.symbol) for book in books], self.on_message)
+            print(f"📚 Livro de ofertas: {len(books)} símbolos em depth@{self.speed}")
+        except Exception as e:
+            logging.error(f"Erro ao conectar o stream do livro de ofertas: {str(e)}")
+
+    def on_message(self, message):
+        data = message.get("data")
+        if not data or data.get("e") != "depthUpdate":
+            return
+        book = self.books.get(data["s"])
+        if book is not None:
+            book.on_event(data)
@@ -0,0 +1,233 @@
+import logging
+import time
+
+from binance.enums import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET, SIDE_BUY, TIME_IN_FORCE_GTC
+
+FINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+
+class WorkingOrder:
+    """Ordem limitada acompanhada: a perna atual e o que já foi executado nas pernas substituídas."""
+
+    __slots__ = ("order", "side", "quantity", "filled", "started", "reprices", "client_id")
+
+    def __init__(self, order, side, quantity):
+        self.order = order
+        self.client_id = order.get("clientOrderId")     # Base dos clientOrderId das pernas seguintes
+        self.side = side
+        self.quantity = float(quantity)     # Quantidade total desejada (todas as pernas)
+        self.filled = 0.0                   # Executado nas pernas já substituídas
+        self.started = time.time()
+        self.reprices = 0
+
+    @property
+    def executed(self):
+        return self.filled + float(self.order["executedQty"])
+
+    @property
+    def price(self):
+        return float(self.order["price"])
+
+
+class OrderManager:
+    """
+    Acompanha a ordem limitada de compra/venda do bot e a reprecifica em direção ao mercado com o
+    endpoint atômico `order/cancelReplace`, em vez de cancelar tudo, esperar 2 s e reenviar:
+
+    - a cada `reprice_interval` segundos (TradeScheduler) ou quando o PriceWatcher vê o preço se afastar;
+    - compra: limite sobe até o último preço (+ `chase_offset`), ou até o preço do livro de ofertas que
+      executa o restante; venda: desce até ele, sem passar do preço mínimo de venda (`acceptable_loss_percentage`);
+    - o executado das pernas substituídas fica em `partial_quantity_discount`;
+    - passado o `deadline`, cancela e envia o restante a mercado.
+    """
+
+    def __init__(self, bot, reprice_interval=15, deadline=5 * 60, chase_offset=0.0):
+        self.bot = bot
+        self.reprice_interval = reprice_interval    # Segundos entre reprecificações agendadas
+        self.deadline = deadline                    # Segundos até desistir e ir a mercado (None = nunca)
+        self.chase_offset = chase_offset            # Fração além do último preço (ex.: 0.0005 cruza o spread)
+        self.working = None
+
+    def hasWorkingOrder(self):
+        return self.working is not None
+
+    def track(self, order, side, quantity):
+        if not order or order.get("status") in FINAL_STATUSES:
+            self.working = None
+            return None
+        self.working = WorkingOrder(order, side, quantity)
+        self._account()
+        return self.working
+
+    def targetPrice(self, market_price):
+        bot = self.bot
+        # Com o livro de ofertas, o preço que executa o restante agora; sem ele, o último preço
+        book = getattr(bot, "order_book", None)
+        fill_price = book.price_to_fill(self.working.side, float(self._remaining())) if book is not None else None
+        if self.working.side == SIDE_BUY:
+            price = fill_price or market_price * (1 + self.chase_offset)
+        else:
+            price = fill_price or market_price * (1 - self.chase_offset)
+            if bot.last_buy_price:
+                price = max(price, bot.getMinimumPriceToSell())
+        return float(bot.adjust_to_step(price, bot.tick_size, as_string=True))
+
+    def needsReprice(self, market_price):
+        """Verificação barata (thread do websocket): o mercado se afastou do limite?"""
+        working = self.working
+        if working is None:
+            return False
+        tick = self.bot.tick_size
+        if working.side == SIDE_BUY:
+            return market_price >= working.price + tick
+        return market_price <= working.price - tick
+
+    def manageOnDecision(self, decision):
+        """
+        Chamado no executeCycle. Retorna True se o ciclo já foi resolvido aqui e o bot não deve enviar outra
+        ordem: a ordem em andamento continua (mesma direção da decisão, ou decisão inconclusiva), executou
+        ou teve o restante enviado a mercado. Com a decisão oposta, cancela e retorna False.
+        """
+        if self.working is None:
+            return False
+        status = self.reprice()
+        if status in ("filled", "market"):
+            return True  # A posição mudou nesta reprecificação: a decisão de entrada/saída fica para o próximo ciclo
+        if status is None or self.working is None:
+            return False  # Cancelada fora do bot
+        if decision is None or (decision == True) == (self.working.side == SIDE_BUY):
+            return True
+        self.cancel()
+        return False
+
+    def reprice(self, market_price=None):
+        """
+        Atualiza a ordem em andamento. Retorna "filled", "canceled", "market", "repriced", "kept" ou None
+        (nada acompanhado).
+        """
+        working = self.working
+        if working is None:
+            return None
+        bot = self.bot
+        try:
+            working.order = bot.client_binance.get_order(symbol=bot.operation_code, orderId=working.order["orderId"])
+        except Exception as e:
+            logging.error(f"[{bot.operation_code}] Erro ao consultar a ordem {working.order['orderId']}: {str(e)}")
+            return "kept"
+        self._account()
+        status = working.order["status"]
+        if status in FINAL_STATUSES:
+            self.working = None
+            return "filled" if status == "FILLED" else "canceled"
+
+        if self.deadline is not None and time.time() - working.started >= self.deadline:
+            return self._goToMarket()
+
+        if market_price is None:
+            market_price = float(bot.client_binance.get_symbol_ticker(symbol=bot.operation_code)["price"])
+        if not self.needsReprice(market_price):
+            return "kept"
+        new_price = self.targetPrice(market_price)
+        if abs(new_price - working.price) < bot.tick_size / 2:
+            return "kept"
+        return self._replace(new_price)
+
+    def _remaining(self):
+        return self.bot.adjust_to_step(self.working.quantity - self.working.executed, self.bot.step_size, as_string=True)
+
+    def _replace(self, new_price):
+        bot, working = self.bot, self.working
+        quantity = self._remaining()
+        if float(quantity) < bot.step_size:
+            return "kept"
+        price = bot.adjust_to_step(new_price, bot.tick_size, as_string=True)
+        params = {"symbol": bot.operation_code, "side": working.side, "type": ORDER_TYPE_LIMIT,
+                  "timeInForce": TIME_IN_FORCE_GTC, "quantity": quantity, "price": price}
+        tracker = getattr(bot, "order_tracker", None)
+        if tracker is not None and working.client_id:
+            params["newClientOrderId"] = tracker.track(tracker.replacementId(working.client_id, working.reprices + 1)).client_id
+        try:
+            rules = getattr(bot, "order_rules", None)
+            if rules is not None:
+                rules.check(params)  # Ex.: o restante de um parcial abaixo do notional mínimo
+            # STOP_ON_FAILURE: se a ordem executou antes do cancelamento, nada é recriado
+            response = bot.client_binance.cancel_replace_order(
+                **params, cancelReplaceMode="STOP_ON_FAILURE", cancelOrderId=working.order["orderId"])
+        except Exception as e:
+            logging.warning(f"[{bot.operation_code}] Reprecificação da ordem {working.order['orderId']} falhou: {str(e)}")
+            return "kept"
+        canceled = response["cancelResponse"]
+        if tracker is not None:
+            tracker.update(canceled)
+            tracker.update(response["newOrderResponse"])
+        working.filled += float(canceled["executedQty"])
+        if bot.journal is not None:
+            bot.journal.record_order(canceled, strategy=bot.last_strategy)
+        working.order = response["newOrderResponse"]
+        working.reprices += 1
+        bot.logOrder(working.order)
+        self._account()
+        print(f"🔁 [{bot.operation_code}] Ordem reprecificada para {price} ({quantity}, {working.reprices}ª vez)")
+        if working.order["status"] in FINAL_STATUSES:
+            self.working = None
+        return "repriced"
+
+    def cancel(self):
+        """
+        Cancela a ordem em andamento e retorna True se a corretora confirmou o cancelamento. Se ele falha
+        (-2011: a ordem já executou ou não está mais aberta), o estado real vem de um get_order; nos dois
+        casos, `working.order` fica com o `executedQty` informado pela corretora.
+        """
+        bot, working = self.bot, self.working
+        if working is None:
+            return False
+        canceled = False
+        try:
+            working.order = bot.client_binance.cancel_order(symbol=bot.operation_code, orderId=working.order["orderId"])
+            canceled = True
+        except Exception as e:
+            logging.warning(f"[{bot.operation_code}] Ordem {working.order['orderId']} não cancelada: {str(e)}")
+            try:
+                working.order = bot.client_binance.get_order(symbol=bot.operation_code, orderId=working.order["orderId"])
+            except Exception as lookup_error:
+                logging.error(f"[{bot.operation_code}] Erro ao consultar a ordem {working.order['orderId']}: {str(lookup_error)}")
+        if getattr(bot, "order_tracker", None) is not None:
+            bot.order_tracker.update(working.order)
+        bot.open_orders = [order for order in bot.open_orders or [] if order["orderId"] != working.order["orderId"]]
+        self._account()
+        self.working = None
+        return canceled
+
+    def _goToMarket(self):
+        bot, working = self.bot, self.working
+        print(f"⏰ [{bot.operation_code}] Prazo da ordem limitada esgotado: restante a mercado")
+        if not self.cancel():
+            status = working.order["status"]
+            if status == "FILLED":
+                # Executou entre a última consulta e o cancelamento: nada a enviar
+                return "filled"
+            if status not in FINAL_STATUSES:
+                # Continua aberta (ou sem confirmação): enviar a mercado poderia dobrar a posição
+                self.working = working
+                self._account()
+                return "kept"
+        # Restante pelo executedQty que a corretora acabou de informar
+        quantity = bot.adjust_to_step(working.quantity - working.executed, bot.step_size, as_string=True)
+        if float(quantity) < bot.step_size:
+            return "filled"
+        try:
+            order, already_tracked = bot.submitOrder(symbol=bot.operation_code, side=working.side, type=ORDER_TYPE_MARKET,
+                                                     quantity=quantity)
+        except Exception as e:
+            logging.error(f"[{bot.operation_code}] Erro ao enviar o restante a mercado: {str(e)}")
+            print(f"⚠️ [{bot.operation_code}] Erro ao enviar o restante a mercado: {str(e)}")
+            return "canceled"
+        if not already_tracked:
+            bot.logOrder(order)
+        bot.partial_quantity_discount = working.quantity  # Executado (limitada + mercado): nada a repor neste ciclo
+        return "market"
+
+    def _account(self):
+        # Mesmo papel do hasOpenBuyOrder/hasOpenSellOrder: o que já executou não é comprado/vendido de novo
+        if self.working is not None:
+            self.bot.partial_quantity_discount = self.working.executed
@@ -0,0 +1,147 @@
+from decimal import Decimal, ROUND_FLOOR
+
+PRICE_TYPES = ("LIMIT", "LIMIT_MAKER", "STOP_LOSS_LIMIT", "TAKE_PROFIT_LIMIT")
+STOP_TYPES = ("STOP_LOSS", "STOP_LOSS_LIMIT", "TAKE_PROFIT", "TAKE_PROFIT_LIMIT")
+
+
+class OrderFilterError(ValueError):
+    """Ordem que a Binance recusaria pelos filtros do símbolo (detectada antes do envio)."""
+
+    def __init__(self, symbol, failures):
+        self.symbol = symbol
+        self.failures = failures
+        super().__init__(f"[{symbol}] Filtros violados: {'; '.join(failures)}")
+
+
+def to_decimal(value):
+    # str() evita herdar o erro binário do float (0.1 -> 0.1000000000000000055...)
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def decimal_places(step):
+    return max(0, -to_decimal(step).normalize().as_tuple().exponent)
+
+
+def quantize_down(value, step):
+    """Maior múltiplo de `step` que não passa de `value`, exato em Decimal."""
+    step = to_decimal(step)
+    if step <= 0:
+        raise ValueError("O valor de 'step' deve ser maior que zero.")
+    return (to_decimal(value) / step).to_integral_value(rounding=ROUND_FLOOR) * step
+
+
+class OrderRules:
+    """
+    Regras de um símbolo montadas uma vez a partir dos filtros do exchangeInfo: quantizadores exatos
+    (Decimal) de preço e quantidade e a validação local dos filtros PRICE_FILTER, LOT_SIZE,
+    MARKET_LOT_SIZE e NOTIONAL/MIN_NOTIONAL antes do envio da ordem.
+    """
+
+    def __init__(self, symbol, filters):
+        self.symbol = symbol
+        self.filters = list(filters)
+        by_type = {f["filterType"]: f for f in self.filters}
+        price = by_type.get("PRICE_FILTER", {})
+        lot = by_type.get("LOT_SIZE", {})
+        market_lot = by_type.get("MARKET_LOT_SIZE", {})
+        notional = by_type.get("NOTIONAL")
+        min_notional = by_type.get("MIN_NOTIONAL")
+
+        self.tick_size = Decimal(price.get("tickSize", "0"))
+        self.min_price = Decimal(price.get("minPrice", "0"))
+        self.max_price = Decimal(price.get("maxPrice", "0"))
+        self.step_size = Decimal(lot.get("stepSize", "0"))
+        self.min_qty = Decimal(lot.get("minQty", "0"))
+        self.max_qty = Decimal(lot.get("maxQty", "0"))
+        # MARKET_LOT_SIZE com stepSize 0 significa "use o LOT_SIZE"
+        self.market_step_size = Decimal(market_lot.get("stepSize", "0")) or self.step_size
+        self.market_min_qty = Decimal(market_lot.get("minQty", "0")) or self.min_qty
+        self.market_max_qty = Decimal(market_lot.get("maxQty", "0")) or self.max_qty
+        if notional is not None:
+            self.min_notional = Decimal(notional.get("minNotional", "0"))
+            self.max_notional = Decimal(notional.get("maxNotional", "0"))
+            self.apply_min_to_market = notional.get("applyMinToMarket", True)
+            self.apply_max_to_market = notional.get("applyMaxToMarket", False)
+        else:
+            self.min_notional = Decimal((min_notional or {}).get("minNotional", "0"))
+            self.max_notional = Decimal("0")
+            self.apply_min_to_market = (min_notional or {}).get("applyToMarket", True)
+            self.apply_max_to_market = False
+        self.price_places = decimal_places(self.tick_size) if self.tick_size else 8
+        self.quantity_places = decimal_places(self.step_size) if self.step_size else 8
+
+    @classmethod
+    def from_symbol_info(cls, symbol_info):
+        return cls(symbol_info["symbol"], symbol_info["filters"])
+
+    @classmethod
+    def from_sizes(cls, symbol, step_size, tick_size):
+        """Regras mínimas (só step/tick), para snapshots de estado antigos sem os filtros."""
+        return cls(symbol, [{"filterType": "PRICE_FILTER", "tickSize": str(tick_size)},
+                            {"filterType": "LOT_SIZE", "stepSize": str(step_size)}])
+
+    # ---------------------------------------------------------------- Quantizadores
+
+    def quantize_price(self, price):
+        return quantize_down(price, self.tick_size) if self.tick_size else to_decimal(price)
+
+    def quantize_quantity(self, quantity, market=False):
+        step = self.market_step_size if market else self.step_size
+        return quantize_down(quantity, step) if step else to_decimal(quantity)
+
+    def format_price(self, price):
+        return f"{self.quantize_price(price):.{self.price_places}f}"
+
+    def format_quantity(self, quantity, market=False):
+        return f"{self.quantize_quantity(quantity, market):.{self.quantity_places}f}"
+
+    # ---------------------------------------------------------------- Validação
+
+    def validate(self, order, reference_price=None):
+        """
+        Lista das violações de filtro da ordem (parâmetros de `create_order`); vazia se a Binance aceitaria.
+        `reference_price` (último preço) estima o notional das ordens a mercado.
+        """
+        failures = []
+        order_type = order.get("type", "LIMIT")
+        market = order_type == "MARKET"
+
+        price_fields = (["price"] if order_type in PRICE_TYPES else []) + (["stopPrice"] if order_type in STOP_TYPES else [])
+        for field in price_fields:
+            if order.get(field) is None:
+                failures.append(f"{field} ausente")
+                continue
+            value = to_decimal(order[field])
+            if value <= 0 or (self.min_price and value < self.min_price) or (self.max_price and value > self.max_price):
+                failures.append(f"PRICE_FILTER: {field} {value} fora de [{self.min_price}, {self.max_price}]")
+            elif self.tick_size and value % self.tick_size:
+                failures.append(f"PRICE_FILTER: {field} {value} não é múltiplo de {self.tick_size}")
+
+        if order.get("quantity") is None:
+            if order.get("quoteOrderQty") is None:
+                failures.append("quantity ausente")
+            quantity = None
+        else:
+            quantity = to_decimal(order["quantity"])
+            step, min_qty, max_qty = (self.market_step_size, self.market_min_qty, self.market_max_qty) if market \
+                else (self.step_size, self.min_qty, self.max_qty)
+            name = "MARKET_LOT_SIZE" if market else "LOT_SIZE"
+            if quantity <= 0 or (min_qty and quantity < min_qty) or (max_qty and quantity > max_qty):
+                failures.append(f"{name}: quantidade {quantity} fora de [{min_qty}, {max_qty}]")
+            elif step and quantity % step:
+                failures.append(f"{name}: quantidade {quantity} não é múltiplo de {step}")
+
+        price = order.get("price") if order_type in PRICE_TYPES else reference_price
+        if quantity is not None and price is not None:
+            notional = quantity * to_decimal(price)
+            if self.min_notional and (not market or self.apply_min_to_market) and notional < self.min_notional:
+                failures.append(f"NOTIONAL: {notional} abaixo do mínimo {self.min_notional}")
+            if self.max_notional and (not market or self.apply_max_to_market) and notional > self.max_notional:
+                failures.append(f"NOTIONAL: {notional} acima do máximo {self.max_notional}")
+        return failures
+
+    def check(self, order, reference_price=None):
+        """Como `validate`, mas levanta OrderFilterError."""
+        failures = self.validate(order, reference_price)
+        if failures:
+            raise OrderFilterError(self.symbol, failures)
@@ -0,0 +1,195 @@
+import logging
+import time
+from collections import OrderedDict
+
+import requests
+from binance.exceptions import BinanceAPIException
+
+CLIENT_ID_PREFIX = "bot-"       # clientOrderId das ordens da estratégia (as de proteção usam "prot-")
+
+PENDING = "PENDING"             # Enviada, sem resposta da corretora
+NEW = "NEW"
+PARTIALLY_FILLED = "PARTIALLY_FILLED"
+FILLED = "FILLED"
+CANCELED = "CANCELED"
+REJECTED = "REJECTED"
+EXPIRED = "EXPIRED"
+
+OPEN_STATES = (NEW, PARTIALLY_FILLED)
+FINAL_STATES = (FILLED, CANCELED, REJECTED, EXPIRED)
+TRANSITIONS = {
+    PENDING: {NEW, PARTIALLY_FILLED, FILLED, CANCELED, REJECTED, EXPIRED},
+    NEW: {PARTIALLY_FILLED, FILLED, CANCELED, EXPIRED},
+    PARTIALLY_FILLED: {PARTIALLY_FILLED, FILLED, CANCELED, EXPIRED},
+}
+# Status da API que não estão na máquina de estados
+STATUS_ALIASES = {"PENDING_NEW": NEW, "EXPIRED_IN_MATCH": EXPIRED, "PENDING_CANCEL": None}
+TYPE_CODES = {"MARKET": "M", "LIMIT": "L", "LIMIT_MAKER": "K", "STOP_LOSS_LIMIT": "S", "TAKE_PROFIT_LIMIT": "T"}
+# Erros em que a ordem pode ter chegado à corretora (timeout, 5xx, -1006/-1007: "status desconhecido")
+AMBIGUOUS_CODES = (-1006, -1007)
+
+
+def isAmbiguousError(error):
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    if isinstance(error, BinanceAPIException):
+        return error.code in AMBIGUOUS_CODES or error.status_code >= 500
+    return False
+
+
+def _base36(value):
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    text = ""
+    while True:
+        value, remainder = divmod(value, 36)
+        text = digits[remainder] + text
+        if not value:
+            return text
+
+
+class TrackedOrder:
+    __slots__ = ("client_id", "intent", "state", "order", "attempts")
+
+    def __init__(self, client_id, intent, state=PENDING, order=None):
+        self.client_id = client_id
+        self.intent = intent
+        self.state = state
+        self.order = order
+        self.attempts = 0       # Envios feitos com este clientOrderId
+
+    def to_dict(self):
+        return {"client_id": self.client_id, "intent": list(self.intent) if self.intent else None,
+                "state": self.state, "order": self.order, "attempts": self.attempts}
+
+
+class OrderTracker:
+    """
+    Máquina de estados local das ordens de um símbolo (PENDING -> NEW -> PARTIALLY_FILLED -> FILLED/CANCELED).
+
+    Cada ordem sai com um `newClientOrderId` determinístico, derivado da intenção (lado, tipo e candle
+    da decisão). Se o envio falha sem resposta (timeout, 5xx), a ordem fica PENDING e é resolvida com um
+    único `get_order(origClientOrderId=...)`; repetir a mesma intenção depois não duplica a exposição:
+    uma ordem PENDING é consultada antes, e uma aberta é devolvida sem novo envio.
+    """
+
+    def __init__(self, symbol, prefix=CLIENT_ID_PREFIX, max_orders=500):
+        self.symbol = symbol
+        self.prefix = prefix
+        self.max_orders = max_orders
+        self.orders = OrderedDict()     # client_id -> TrackedOrder (mais antigas primeiro)
+        self._latest = {}               # intenção -> client_id da última tentativa
+
+    def clientOrderId(self, intent, attempt=1):
+        side, order_type, candle_ms = intent
+        client_id = f"{self.prefix}{self.symbol}-{side[0]}{TYPE_CODES.get(order_type, order_type[0])}-{_base36(candle_ms // 1000)}"
+        if attempt > 1:
+            client_id += f"-{attempt}"
+        return client_id[:36]  # Limite da Binance
+
+    def get(self, client_id):
+        return self.orders.get(client_id)
+
+    def replacementId(self, client_id, reprices):
+        """clientOrderId da nova perna de um cancel-replace (deriva da ordem original)."""
+        suffix = f"-r{reprices}"
+        return client_id[:36 - len(suffix)] + suffix
+
+    def prepare(self, intent):
+        """
+        (TrackedOrder, existente) para a intenção: a tentativa anterior se ainda estiver PENDING ou aberta
+        (existente = True; quem chama resolve/devolve em vez de reenviar), ou uma nova tentativa PENDING.
+        """
+        latest = self.orders.get(self._latest.get(intent))
+        if latest is not None and (latest.state == PENDING or latest.state in OPEN_STATES):
+            return latest, True
+        attempt = 1
+        client_id = self.clientOrderId(intent)
+        while client_id in self.orders:
+            attempt += 1
+            client_id = self.clientOrderId(intent, attempt)
+        return self.track(client_id, intent), False
+
+    def track(self, client_id, intent=None):
+        tracked = self.orders.get(client_id)
+        if tracked is None:
+            tracked = self.orders[client_id] = TrackedOrder(client_id, intent)
+            self._prune()
+        if intent is not None:
+            self._latest[intent] = client_id
+        return tracked
+
+    def update(self, order):
+        """Aplica uma resposta da API (criação, consulta, cancelamento) à ordem de mesmo clientOrderId."""
+        if not order:
+            return None
+        tracked = self.orders.get(order.get("clientOrderId"))
+        if tracked is None:
+            return None
+        status = order.get("status")
+        state = STATUS_ALIASES.get(status, status)
+        if state is None:
+            return tracked
+        if state == tracked.state or state in TRANSITIONS.get(tracked.state, ()):
+            tracked.state = state
+            tracked.order = order
+        else:
+            # Resposta antiga (ex.: histórico consultado antes do cancelamento): o estado local é mais novo
+            logging.debug(f"[{self.symbol}] Transição ignorada {tracked.client_id}: {tracked.state} -> {status}")
+        return tracked
+
+    def updateMany(self, orders):
+        for order in orders or []:
+            self.update(order)
+
+    def reject(self, tracked):
+        if tracked.state == PENDING:
+            tracked.state = REJECTED
+
+    def resolve(self, client, tracked, retry_delay=1.0):
+        """
+        Uma consulta pelo clientOrderId decide uma ordem PENDING: devolve a ordem se ela chegou à corretora,
+        ou None (REJECTED) se não existe. Logo depois de um envio sem resposta, a ordem pode ainda não aparecer
+        na consulta: um -2013 é confirmado por uma segunda consulta `retry_delay` segundos depois.
+        Se a consulta falhar, a ordem continua PENDING e o erro sobe.
+        """
+        for attempt in range(2):
+            try:
+                order = client.get_order(symbol=self.symbol, origClientOrderId=tracked.client_id)
+                break
+            except BinanceAPIException as e:
+                if e.code != -2013:  # Order does not exist
+                    raise
+                if attempt == 0 and retry_delay:
+                    time.sleep(retry_delay)
+                    continue
+                tracked.state = REJECTED
+                return None
+        self.update(order)
+        return order
+
+    def pending(self):
+        return [tracked for tracked in self.orders.values() if tracked.state == PENDING]
+
+    def getState(self):
+        """Ordens PENDING ou abertas, para o snapshot do bot (não reenviar depois de um reinício)."""
+        return [tracked.to_dict() for tracked in self.orders.values()
+                if tracked.state == PENDING or tracked.state in OPEN_STATES]
+
+    def restoreState(self, items):
+        for item in items or []:
+            tracked = self.track(item["client_id"], tuple(item["intent"]) if item.get("intent") else None)
+            tracked.state = item["state"]
+            tracked.order = item.get("order")
+            tracked.attempts = item.get("attempts", 1)
+
+    def _prune(self):
+        # Descarta as mais antigas já finalizadas
+        while len(self.orders) > self.max_orders:
+            for client_id, tracked in self.orders.items():
+                if tracked.state in FINAL_STATES:
+                    del self.orders[client_id]
+                    if self._latest.get(tracked.intent) == client_id:
+                        del self._latest[tracked.intent]
+                    break
+            else:
+                return
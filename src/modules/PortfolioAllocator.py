@@ -0,0 +1,99 @@
+import math
+import threading
+import time
+
+
+class PortfolioAllocator:
+    """
+    Dimensiona as compras de todos os bots a partir de um único snapshot da conta (`get_account`)
+    e de um único lote de preços (`get_all_tickers`), em vez de cada bot consultar a conta sozinho
+    e comprar sempre o `tradedQuantity` fixo.
+
+    Para cada moeda de cotação (BRL, USDT...), o patrimônio é o saldo da cotação mais o valor das
+    moedas dos bots. A posição de cada bot sai do mesmo snapshot (saldo da moeda de pelo menos um
+    step), não do `actual_trade_position` do bot, que pode estar desatualizado. Cada bot sem posição
+    recebe `tradedPercentage` desse patrimônio, limitado a `max_asset_percentage`; se a soma passa
+    do saldo livre (menos a `reserve_percentage`), todas as compras são reduzidas na mesma proporção. O snapshot vale por `max_age` segundos e é
+    descartado a cada ordem enviada (`invalidate`).
+    """
+
+    def __init__(self, client, max_asset_percentage=100, reserve_percentage=0, max_age=5):
+        self.client = client
+        self.max_asset_percentage = max_asset_percentage  # (Base 100%) Teto do patrimônio em uma só moeda
+        self.reserve_percentage = reserve_percentage      # (Base 100%) Parte do saldo livre que nunca é usada
+        self.max_age = max_age
+        self.bots = {}
+        self.account = None
+        self.prices = {}
+        self.sizes = {}                                   # operation_code -> quantidade da próxima compra
+        self.refreshes = 0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, bot):
+        with self._lock:
+            self.bots[bot.operation_code] = bot
+            self._fetched_at = 0.0
+
+    def remove(self, operation_code):
+        with self._lock:
+            self.bots.pop(operation_code, None)
+            self.sizes.pop(operation_code, None)
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def accountSnapshot(self):
+        """Snapshot compartilhado da conta (refeito se mais velho que `max_age` ou após uma ordem)."""
+        with self._lock:
+            if self.account is None or time.time() - self._fetched_at > self.max_age:
+                self._refresh()
+            return self.account
+
+    def size(self, operation_code, default=None):
+        with self._lock:
+            return self.sizes.get(operation_code, default)
+
+    def _refresh(self):
+        # Uma chamada de conta e uma de preços para todos os bots; o dimensionamento sai do mesmo snapshot
+        self.account = self.client.get_account()
+        self.prices = {ticker["symbol"]: float(ticker["price"]) for ticker in self.client.get_all_tickers()}
+        self._fetched_at = time.time()
+        self.refreshes += 1
+        self.sizes = self.allocate(list(self.bots.values()), self.account, self.prices)
+
+    def allocate(self, bots, account, prices):
+        """{operation_code: quantidade} de compra para cada bot, calculado de uma vez para todos."""
+        bots = [bot for bot in bots if prices.get(bot.operation_code)]
+        if not bots:
+            return {}
+        balances = {balance["asset"]: float(balance["free"]) + float(balance["locked"]) for balance in account["balances"]}
+        free = {balance["asset"]: float(balance["free"]) for balance in account["balances"]}
+        quotes = {self.quoteAsset(bot) for bot in bots}
+        # Patrimônio por cotação: saldo da cotação + valor das moedas dos bots
+        equity = {quote: balances.get(quote, 0.0) for quote in quotes}
+        for bot in bots:
+            equity[self.quoteAsset(bot)] += balances.get(bot.stock_code, 0.0) * prices[bot.operation_code]
+        available = {quote: free.get(quote, 0.0) * (1 - self.reserve_percentage / 100) for quote in quotes}
+
+        need, demand = {}, dict.fromkeys(quotes, 0.0)
+        for bot in bots:
+            quote = self.quoteAsset(bot)
+            target = equity[quote] * min(bot.traded_percentage / 100, self.max_asset_percentage / 100)
+            held = balances.get(bot.stock_code, 0.0)
+            # Mesmo critério do getActualTradePosition do bot, mas sobre o snapshot
+            need[bot.operation_code] = 0.0 if held >= bot.step_size else max(target - held * prices[bot.operation_code], 0.0)
+            demand[quote] += need[bot.operation_code]
+        # Sem saldo para todos: cada bot da cotação recebe a mesma fração do que pediu
+        scale = {quote: min(1.0, available[quote] / demand[quote]) if demand[quote] > 0 else 1.0 for quote in quotes}
+        sizes = {}
+        for bot in bots:
+            value = need[bot.operation_code] * scale[self.quoteAsset(bot)]
+            sizes[bot.operation_code] = math.floor(value / prices[bot.operation_code] / bot.step_size + 1e-9) * bot.step_size
+        return sizes
+
+    @staticmethod
+    def quoteAsset(bot):
+        code = bot.operation_code
+        return code[len(bot.stock_code):] if code.startswith(bot.stock_code) else code[-3:]
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+
+from modules.Metrics import phase_metrics
+
+STREAMS = ("bookTicker", "aggTrade", "trade")
+MAX_STREAMS_PER_CONNECTION = 1024   # Limite da Binance por conexão de streams combinados
+
+
+class BinanceStreamTransport:
+    """
+    Streams de mercado da Binance numa conexão multiplexada (`/stream?streams=a/b/...`) do
+    ThreadedWebsocketManager. Streams públicos: não precisa de chave de API.
+    """
+
+    def __init__(self, testnet=False):
+        self.testnet = testnet
+        self._manager = None
+
+    def start(self, streams, callback):
+        from binance import ThreadedWebsocketManager
+        self.stop()
+        if not streams:
+            return
+        self._manager = ThreadedWebsocketManager(testnet=self.testnet)
+        self._manager.start()
+        for i in range(0, len(streams), MAX_STREAMS_PER_CONNECTION):
+            self._manager.start_multiplex_socket(callback=callback, streams=streams[i:i + MAX_STREAMS_PER_CONNECTION])
+
+    def stop(self):
+        if self._manager is not None:
+            self._manager.stop()
+            self._manager = None
+
+
+class LocalStreamTransport:
+    """
+    Substituto local do stream (testes e simulações): `publish` entrega a mensagem no mesmo
+    formato do stream combinado da Binance, na thread de quem publica.
+    """
+
+    def __init__(self):
+        self.streams = []
+        self._callback = None
+
+    def start(self, streams, callback):
+        self.streams = list(streams)
+        self._callback = callback
+
+    def stop(self):
+        self._callback = None
+
+    def publish(self, stream, data):
+        if self._callback is not None and stream in self.streams:
+            self._callback({"stream": stream, "data": data})
+
+
+class PriceWatcher:
+    """
+    Vigia de preço em tempo real para as posições compradas. Uma única conexão de streams
+    combinados (bookTicker, aggTrade ou trade) cobre todos os símbolos agendados; a cada
+    mensagem o preço é comparado com os níveis pré-calculados do bot e, abaixo do stop
+    (`stop_loss_percentage`) ou no alvo (`take_profit_percentage`, se houver), chama
+    `on_trigger(bot, preço)` uma vez até o próximo `update`.
+
+    A thread do websocket só faz a comparação; a venda roda fora dela (`on_trigger`, por padrão
+    `bot.liveExit` numa thread própria, ou no ExecutionPool pelo TradeScheduler).
+    Para bots com uma ordem limitada em andamento (OrderManager), o preço que se afasta do limite
+    chama `on_reprice(bot, preço)`. Os níveis são atualizados por `update(bot)` após cada execução.
+    """
+
+    def __init__(self, stream="bookTicker", transport=None, on_trigger=None, on_reprice=None, resubscribe_delay=1.0):
+        if stream not in STREAMS:
+            raise ValueError(f"Stream inválido: {stream} (use {', '.join(STREAMS)})")
+        self.stream = stream
+        self.transport = transport or BinanceStreamTransport()
+        self.on_trigger = on_trigger or self._run_in_thread
+        self.on_reprice = on_reprice
+        self.resubscribe_delay = resubscribe_delay  # Agrupa inclusões/remoções de símbolos numa só reconexão
+        self.bots = {}                              # operation_code -> bot vigiado
+        self._levels = {}                           # operation_code -> (preço de stop, preço alvo ou None)
+        self._pending = set()                       # Stops disparados aguardando o próximo update
+        self._repricing = set()                     # Bots com ordem limitada em andamento
+        self._lock = threading.Lock()
+        self._timer = None
+        self._running = False
+        self.last_prices = {}
+        self.messages = 0
+
+    def streamName(self, operation_code):
+        return f"{operation_code.lower()}@{self.stream}"
+
+    def watch(self, bot):
+        with self._lock:
+            self.bots[bot.operation_code] = bot
+        self.update(bot)
+        self._scheduleResubscribe()
+
+    def unwatch(self, operation_code):
+        with self._lock:
+            self.bots.pop(operation_code, None)
+            self._levels.pop(operation_code, None)
+            self._pending.discard(operation_code)
+            self._repricing.discard(operation_code)
+        self._scheduleResubscribe()
+
+    def update(self, bot):
+        """Recalcula os níveis do bot (chamado após cada execução ou venda)."""
+        code = bot.operation_code
+        with self._lock:
+            self._pending.discard(code)
+            manager = getattr(bot, "order_manager", None)
+            if code in self.bots and manager is not None and manager.hasWorkingOrder():
+                self._repricing.add(code)
+            else:
+                self._repricing.discard(code)
+            if code not in self.bots or not bot.actual_trade_position or not bot.last_buy_price:
+                self._levels.pop(code, None)
+                return
+            take_profit = getattr(bot, "take_profit_percentage", None)
+            self._levels[code] = (bot.last_buy_price * (1 - bot.stop_loss_percentage),
+                                  bot.last_buy_price * (1 + take_profit) if take_profit else None)
+
+    def start(self):
+        self._running = True
+        self._subscribe()
+
+    def stop(self):
+        self._running = False
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self.transport.stop()
+
+    def _scheduleResubscribe(self):
+        if not self._running:
+            return
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.resubscribe_delay, self._subscribe)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _subscribe(self):
+        with self._lock:
+            streams = [self.streamName(code) for code in sorted(self.bots)]
+            self._timer = None
+        try:
+            self.transport.start(streams, self.onMessage)
+            print(f"👀 Vigia de preço: {len(streams)} símbolos em {self.stream}")
+        except Exception as e:
+            logging.error(f"Erro ao conectar o stream de preços: {str(e)}")
+
+    def onMessage(self, message):
+        received = time.perf_counter()
+        if message.get("e") == "error" or "data" not in message:
+            logging.warning(f"Mensagem inesperada do stream de preços: {message}")
+            return
+        data = message["data"]
+        code = data.get("s")
+        # bookTicker: melhor oferta de compra (o preço de uma venda a mercado); aggTrade/trade: último negócio
+        price = data.get("b") if self.stream == "bookTicker" else data.get("p")
+        if code is None or price is None:
+            return
+        price = float(price)
+        self.messages += 1
+        self.last_prices[code] = price
+        if code in self._repricing:
+            self._checkReprice(code, price)
+        levels = self._levels.get(code)
+        if levels is None or (price >= levels[0] and (levels[1] is None or price < levels[1])):
+            return
+        with self._lock:
+            bot = self.bots.get(code)
+            if bot is None or code in self._pending:
+                return
+            self._pending.add(code)
+        if price < levels[0]:
+            print(f"⚡ [{code}] Preço {price} abaixo do stop ({levels[0]:.4f}): acionando venda")
+        else:
+            print(f"⚡ [{code}] Preço {price} no alvo ({levels[1]:.4f}): acionando venda")
+        phase_metrics.record(code, "price_watcher.detect", time.perf_counter() - received)
+        self.on_trigger(bot, price)
+
+    def _checkReprice(self, code, price):
+        bot = self.bots.get(code)
+        if bot is None or self.on_reprice is None or not bot.order_manager.needsReprice(price):
+            return
+        with self._lock:
+            if code not in self._repricing:
+                return
+            self._repricing.discard(code)  # Volta no próximo update, depois da reprecificação
+        self.on_reprice(bot, price)
+
+    def _run_in_thread(self, bot, price):
+        def run():
+            try:
+                bot.liveExit(price)
+            except Exception as e:
+                logging.error(f"[{bot.operation_code}] Erro na saída ao vivo: {str(e)}")
+            finally:
+                self.update(bot)
+        threading.Thread(target=run, name=f"price-watcher-{bot.operation_code}", daemon=True).start()
@@ -0,0 +1,151 @@
+import logging
+
+from binance.enums import ORDER_TYPE_STOP_LOSS_LIMIT, SIDE_SELL, TIME_IN_FORCE_GTC
+
+from modules.OrderTracker import _base36
+
+CLIENT_ID_PREFIX = "prot-"      # clientOrderId das ordens de proteção (distingue das ordens da estratégia)
+MODES = ("stop_limit", "oco")
+
+
+class ProtectiveOrderManager:
+    """
+    Mantém na corretora uma ordem de proteção para a posição comprada do bot:
+
+    - "stop_limit": STOP_LOSS_LIMIT de venda no preço de stop (`stop_loss_percentage` abaixo da compra);
+    - "oco": OCO de venda com o mesmo stop e um alvo LIMIT_MAKER (`take_profit_percentage` acima da compra).
+
+    `reconcile()` roda a cada execução: cria a ordem depois de uma compra, refaz quando a quantidade
+    ou o preço de compra mudam e cancela quando não há mais posição. Assim o stop é executado pelo
+    motor da corretora, sem esperar a próxima verificação do bot. O `stopLossTrigger` continua como
+    reserva (ex.: o preço passou direto pelo limite da STOP_LOSS_LIMIT).
+    """
+
+    def __init__(self, bot, mode="stop_limit", limit_offset=0.002, take_profit_percentage=None):
+        if mode not in MODES:
+            raise ValueError(f"Modo de proteção inválido: {mode} (use {', '.join(MODES)})")
+        if mode == "oco" and not take_profit_percentage:
+            raise ValueError("O modo OCO precisa de take_profit_percentage")
+        self.bot = bot
+        self.mode = mode
+        self.limit_offset = limit_offset            # Limite da STOP_LOSS_LIMIT abaixo do stop (folga para executar)
+        self.take_profit_percentage = take_profit_percentage
+
+    @staticmethod
+    def isProtective(order):
+        return str(order.get("clientOrderId", "")).startswith(CLIENT_ID_PREFIX)
+
+    def clientOrderId(self, quantity):
+        """
+        clientOrderId derivado da entrada (preço de compra em ticks) e da quantidade protegida: reenviar a mesma
+        proteção depois de um erro ambíguo usa o mesmo id e a corretora recusa a duplicata em vez de travar o saldo duas vezes.
+        """
+        bot = self.bot
+        entry = _base36(int(round(bot.last_buy_price / bot.tick_size)))
+        size = _base36(int(round(float(quantity) / bot.step_size)))
+        return f"{CLIENT_ID_PREFIX}{bot.operation_code}-{entry}-{size}"[:33]  # Folga para o -tp/-sl do OCO (limite de 36)
+
+    def protectiveOrders(self):
+        return [order for order in self.bot.open_orders or [] if self.isProtective(order)]
+
+    def desiredProtection(self):
+        """
+        (quantidade, preço de stop) que a posição atual precisa, já ajustados a step/tick como texto,
+        ou None se não houver o que proteger.
+        """
+        bot = self.bot
+        if not bot.actual_trade_position or not bot.last_buy_price:
+            return None
+        free = next((float(stock["free"]) for stock in bot.account_data["balances"]
+                     if stock["asset"] == bot.stock_code), 0.0)
+        # O saldo já travado pela proteção atual também conta; o travado por outras vendas, não
+        protected = sum(float(order["origQty"]) - float(order["executedQty"]) for order in self.protectiveOrders()
+                        if order["type"] == ORDER_TYPE_STOP_LOSS_LIMIT)
+        # Ajusta uma única vez: arredondar de novo um valor já arredondado pode perder um step
+        quantity = bot.adjust_to_step(free + protected, bot.step_size, as_string=True)
+        if float(quantity) < bot.step_size:
+            return None
+        stop_price = bot.adjust_to_step(bot.last_buy_price * (1 - bot.stop_loss_percentage), bot.tick_size, as_string=True)
+        return quantity, stop_price
+
+    def reconcile(self):
+        bot = self.bot
+        desired = self.desiredProtection()
+        current = self.protectiveOrders()
+        stop_leg = next((order for order in current if order["type"] == ORDER_TYPE_STOP_LOSS_LIMIT), None)
+
+        if desired is not None and stop_leg is not None:
+            quantity, stop_price = desired
+            remaining = float(stop_leg["origQty"]) - float(stop_leg["executedQty"])
+            if abs(remaining - float(quantity)) < bot.step_size / 2 and \
+                    abs(float(stop_leg["stopPrice"]) - float(stop_price)) < bot.tick_size / 2:
+                return stop_leg  # Proteção em dia
+
+        self.release()
+        if desired is None:
+            if current:
+                print(f"🛡️ [{bot.operation_code}] Sem posição: proteção cancelada")
+            return None
+
+        quantity, stop_price = desired
+        last_price = float(bot.stock_data["close_price"].iloc[-1]) if bot.stock_data is not None and not bot.stock_data.empty else None
+        if last_price is not None and last_price <= float(stop_price):
+            # A corretora recusa um stop que dispararia na hora: fica com o stopLossTrigger
+            print(f"🛡️ [{bot.operation_code}] Preço já abaixo do stop ({stop_price}): proteção não enviada")
+            return None
+        try:
+            order = self._place(quantity, stop_price)
+        except Exception as e:
+            logging.error(f"[{bot.operation_code}] Erro ao enviar a ordem de proteção: {str(e)}")
+            print(f"⚠️ [{bot.operation_code}] Erro ao enviar a ordem de proteção: {str(e)}")
+            return None
+        print(f"🛡️ [{bot.operation_code}] Proteção {self.mode}: {quantity} com stop em {stop_price}")
+        return order
+
+    def release(self):
+        """
+        Cancela as ordens de proteção abertas. Chamado também antes de cada venda da estratégia: a proteção
+        trava o saldo e a venda seria recusada por saldo insuficiente. O `reconcile` recria o que faltar.
+        """
+        bot = self.bot
+        current = self.protectiveOrders()
+        for order in current:
+            try:
+                bot.client_binance.cancel_order(symbol=bot.operation_code, orderId=order["orderId"])
+            except Exception as e:
+                # No OCO, cancelar uma perna já cancela a outra
+                logging.warning(f"[{bot.operation_code}] Ordem de proteção {order['orderId']} não cancelada: {str(e)}")
+        bot.open_orders = [order for order in bot.open_orders or [] if not self.isProtective(order)]
+        return current
+
+    def _place(self, quantity, stop_price):
+        bot = self.bot
+        client_id = self.clientOrderId(quantity)
+        limit_price = bot.adjust_to_step(float(stop_price) * (1 - self.limit_offset), bot.tick_size, as_string=True)
+        rules = getattr(bot, "order_rules", None)
+        stop_leg = {"symbol": bot.operation_code, "side": SIDE_SELL, "type": ORDER_TYPE_STOP_LOSS_LIMIT,
+                    "timeInForce": TIME_IN_FORCE_GTC, "quantity": quantity, "price": limit_price, "stopPrice": stop_price}
+        if rules is not None:
+            rules.check(stop_leg)
+        if self.mode == "stop_limit":
+            order = bot.client_binance.create_order(**stop_leg, newClientOrderId=client_id)
+            reports = [order]
+        else:
+            take_profit = bot.adjust_to_step(bot.last_buy_price * (1 + self.take_profit_percentage / 100),
+                                             bot.tick_size, as_string=True)
+            if rules is not None:
+                rules.check({"type": "LIMIT_MAKER", "quantity": quantity, "price": take_profit})
+            # Endpoint orderList/oco chamado direto: o create_oco_order muda de endpoint entre versões da python-binance
+            order = bot.client_binance._post("orderList/oco", True, data={
+                "symbol": bot.operation_code, "side": SIDE_SELL, "quantity": quantity,
+                "aboveType": "LIMIT_MAKER", "abovePrice": take_profit, "aboveClientOrderId": f"{client_id}-tp",
+                "belowType": ORDER_TYPE_STOP_LOSS_LIMIT, "belowStopPrice": stop_price, "belowPrice": limit_price,
+                "belowTimeInForce": TIME_IN_FORCE_GTC, "belowClientOrderId": f"{client_id}-sl",
+                "listClientOrderId": client_id,
+            })
+            reports = order.get("orderReports", [])
+        bot.open_orders = list(bot.open_orders or []) + reports
+        if bot.journal is not None:
+            for report in reports:
+                bot.journal.record_order(report, strategy="protective")
+        return order
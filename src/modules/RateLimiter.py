@@ -0,0 +1,88 @@
+import threading
+import time
+
+# Peso (REQUEST_WEIGHT) dos endpoints usados pelo bot; os demais contam como 1
+REQUEST_WEIGHTS = {
+    "klines": 2,
+    "account": 20,
+    "exchangeInfo": 20,
+    "openOrders": 6,
+    "allOrders": 20,
+    "myTrades": 20,
+    "ticker/price": 2,
+    "ticker/bookTicker": 2,
+    "depth": 5,             # Até 100 níveis (mais níveis: ver DEPTH_WEIGHTS)
+    "order/oco": 1,
+}
+
+
+# Peso do /depth pelo `limit` (até o limite indicado)
+DEPTH_WEIGHTS = ((100, 5), (500, 25), (1000, 50), (5000, 250))
+
+
+def request_weight(method, uri, params=None):
+    """Peso de uma requisição REST pelo caminho (ex.: .../api/v3/klines -> 2)."""
+    path = uri.split("?", 1)[0].rsplit("/v3/", 1)[-1]
+    if path == "order":
+        return 4 if method.lower() == "get" else 1
+    if path == "ticker/24hr":
+        return 2 if params and params.get("symbol") else 80  # Sem símbolo: todos os pares
+    if path == "depth" and params:
+        limit = int(params.get("limit", 100))
+        return next((weight for top, weight in DEPTH_WEIGHTS if limit <= top), DEPTH_WEIGHTS[-1][1])
+    return REQUEST_WEIGHTS.get(path, 1)
+
+
+class RateLimiter:
+    """
+    Limitador por peso de requisição (token bucket), no modelo do limite REQUEST_WEIGHT da Binance.
+
+    O orçamento (`weight_per_minute`) é reposto continuamente. `acquire(weight)` bloqueia até haver
+    peso disponível, então várias threads podem dividir o mesmo orçamento sem estourar o limite.
+    Uma margem de segurança (`safety_margin`) deixa espaço para chamadas fora do limitador.
+    """
+
+    def __init__(self, weight_per_minute=6000, safety_margin=0.1):
+        self.capacity = weight_per_minute * (1 - safety_margin)
+        self.refill_rate = self.capacity / 60.0   # Peso reposto por segundo
+        self.available = self.capacity
+        self.last_refill = time.monotonic()
+        self.blocked_until = 0.0
+        self.total_weight = 0
+        self.total_wait = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.last_refill
+        if elapsed > 0:
+            self.available = min(self.capacity, self.available + elapsed * self.refill_rate)
+            self.last_refill = now
+
+    def acquire(self, weight=1):
+        weight = min(weight, self.capacity)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.blocked_until and self.available >= weight:
+                    self.available -= weight
+                    self.total_weight += weight
+                    return
+                wait = max(self.blocked_until - now, (weight - self.available) / self.refill_rate)
+                self.total_wait += wait
+            time.sleep(wait)
+
+    def update_used_weight(self, used_weight):
+        """
+        Sincroniza com o cabeçalho `x-mbx-used-weight-1m` devolvido pela Binance.
+        Útil quando outros processos usam a mesma conta/IP.
+        """
+        with self._lock:
+            remaining = max(0.0, self.capacity - float(used_weight))
+            self.available = min(self.available, remaining)
+
+    def block_for(self, seconds):
+        """Pausa todas as requisições (ex.: resposta 429 com Retry-After)."""
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.available = 0.0
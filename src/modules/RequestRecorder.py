@@ -0,0 +1,159 @@
+import argparse
+import gzip
+import json
+import threading
+import time
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+
+import requests
+from binance.exceptions import BinanceAPIException
+
+from modules.BinanceClient import BinanceClient
+from modules.Metrics import _percentile
+
+RECORD_FILE = 'src/logs/requests.jsonl.gz'
+
+# Parâmetros que mudam a cada envio e não identificam a requisição
+VOLATILE_PARAMS = ("timestamp", "signature", "recvWindow")
+# Erros de rede recriados no replay pelo nome da classe
+NETWORK_ERRORS = {"ReadTimeout": requests.exceptions.ReadTimeout, "ConnectTimeout": requests.exceptions.ConnectTimeout,
+                  "Timeout": requests.exceptions.Timeout, "ConnectionError": requests.exceptions.ConnectionError}
+
+
+class ReplayMissError(LookupError):
+    """Requisição sem resposta gravada (o código mudou a sequência de chamadas, ou a gravação acabou)."""
+
+
+def _stable_params(params):
+    return {key: value for key, value in (params or {}).items() if key not in VOLATILE_PARAMS}
+
+
+def _params_key(params):
+    return json.dumps(_stable_params(params), sort_keys=True, default=str)
+
+
+class RequestRecorder:
+    """
+    Grava cada requisição do BinanceClient e a sua resposta (ou erro) em linhas JSON compactas num
+    arquivo gzip: `t` = ms desde o início da gravação, `d` = duração (ms), `m`/`u`/`p` = método,
+    caminho e parâmetros (sem timestamp/assinatura), e `r` (resposta) ou `e` (erro).
+    Compartilhado entre os clientes de todos os bots.
+    """
+
+    def __init__(self, path=RECORD_FILE):
+        self.path = path
+        self.started = time.time()
+        self.count = 0
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def record(self, method, uri, params, started, response=None, error=None):
+        entry = {"t": round((started - self.started) * 1000, 1), "d": round((time.time() - started) * 1000, 1),
+                 "m": method, "u": urlparse(uri).path, "p": _stable_params(params)}
+        if error is None:
+            entry["r"] = response
+        elif isinstance(error, BinanceAPIException):
+            entry["e"] = {"status": error.status_code, "code": error.code, "msg": error.message}
+        else:
+            entry["e"] = {"type": type(error).__name__, "msg": str(error)}
+        line = json.dumps(entry, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def load_recording(path):
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+class ReplayClient(BinanceClient):
+    """
+    Cliente sem rede que devolve as respostas de uma gravação do RequestRecorder, na ordem em que
+    foram vistas. Cada requisição consome a próxima resposta gravada com o mesmo método, caminho e
+    parâmetros (ou, se os parâmetros mudaram, com o mesmo método, caminho e símbolo: a resposta de
+    outro par nunca é servida; sem nenhuma, ReplayMissError).
+
+    Com `speed`, espera a duração gravada de cada requisição dividida por `speed` (1 = tempo real);
+    sem `speed`, responde na hora (para medir o custo de CPU do `execute()`).
+    """
+
+    def __init__(self, path_or_entries, speed=None, exchange_info_cache=None):
+        entries = load_recording(path_or_entries) if isinstance(path_or_entries, str) else list(path_or_entries)
+        self.entries = entries
+        self.speed = speed
+        self.served = 0
+        self._used = [False] * len(entries)
+        self._exact = defaultdict(deque)
+        self._loose = defaultdict(deque)
+        for index, entry in enumerate(entries):
+            self._exact[(entry["m"], entry["u"], _params_key(entry["p"]))].append(index)
+            self._loose[(entry["m"], entry["u"], (entry["p"] or {}).get("symbol"))].append(index)
+        self._replay_lock = threading.Lock()
+        super().__init__(sync=False, ping=False, exchange_info_cache=exchange_info_cache)
+        self.timestamp_offset = 0
+
+    def _next(self, method, path, params):
+        with self._replay_lock:
+            loose_key = (method, path, (params or {}).get("symbol"))
+            for candidates in (self._exact.get((method, path, _params_key(params))), self._loose.get(loose_key)):
+                while candidates:
+                    index = candidates.popleft()
+                    if not self._used[index]:
+                        self._used[index] = True
+                        self.served += 1
+                        return self.entries[index]
+        raise ReplayMissError(f"Sem resposta gravada para {method.upper()} {path} {_stable_params(params)}")
+
+    def _request(self, method, uri, signed, force_params=False, **kwargs):
+        entry = self._next(method, urlparse(uri).path, kwargs.get("data"))
+        if self.speed:
+            time.sleep(entry["d"] / 1000 / self.speed)
+        error = entry.get("e")
+        if error is None:
+            return entry["r"]
+        if "status" in error:
+            raise BinanceAPIException(None, error["status"], json.dumps({"code": error["code"], "msg": error["msg"]}))
+        raise NETWORK_ERRORS.get(error["type"], RuntimeError)(error["msg"])
+
+    @property
+    def remaining(self):
+        return self._used.count(False)
+
+
+def summarize(entries):
+    """{"MÉTODO caminho": {count, errors, p50, p95, max (ms), kb}} da gravação."""
+    groups = defaultdict(list)
+    for entry in entries:
+        groups[f"{entry['m'].upper()} {entry['u']}"].append(entry)
+    summary = {}
+    for endpoint, items in groups.items():
+        durations = sorted(item["d"] for item in items)
+        summary[endpoint] = {"count": len(items), "errors": sum(1 for item in items if "e" in item),
+                             "p50": _percentile(durations, 0.50), "p95": _percentile(durations, 0.95),
+                             "max": durations[-1],
+                             "kb": round(sum(len(json.dumps(item.get("r"))) for item in items) / 1024, 1)}
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo de uma gravação de requisições da Binance.")
+    parser.add_argument("--file", default=RECORD_FILE)
+    args = parser.parse_args(argv)
+    entries = load_recording(args.file)
+    span = (entries[-1]["t"] - entries[0]["t"]) / 1000 if entries else 0
+    print(f"🎞️ {len(entries)} requisições em {span:.0f}s")
+    print(f"  {'Endpoint':<36}{'n':>7}{'erros':>7}{'p50':>9}{'p95':>9}{'máx':>9}{'KB':>10}")
+    summary = summarize(entries)
+    for endpoint, stats in sorted(summary.items(), key=lambda item: -item[1]["count"]):
+        print(f"  {endpoint:<36}{stats['count']:>7}{stats['errors']:>7}{stats['p50']:>9}{stats['p95']:>9}"
+              f"{stats['max']:>9}{stats['kb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime
+
+from modules.ExecutionPool import PRIORITY_EXECUTE, PRIORITY_REPRICE, PRIORITY_STOP_LOSS
+from modules.Metrics import profiler
+
+TASK_EXECUTE = "execute"
+TASK_STOP_LOSS = "stop_loss"
+TASK_REPRICE = "reprice"
+
+
+def next_candle_close(now_ms, interval_ms, offset_ms=0):
+    """
+    Próximo fechamento de candle após `now_ms` (relógio local), calculado no relógio do servidor
+    (`offset_ms` = servidor - local) e convertido de volta para o relógio local.
+    """
+    server_now = now_ms + offset_ms
+    boundary = (server_now // interval_ms + 1) * interval_ms
+    return boundary - offset_ms
+
+
+def next_run_time(bot, now_ms, offset_ms=0, grace_period=2.0, align_to_candle=True):
+    """
+    Momento (ms, relógio local) da próxima execução do bot:
+    - depois de uma ordem, respeita o `delay_after_order` (cooldown pós-ordem);
+    - caso contrário, logo após o fechamento do próximo candle, mais a margem `grace_period`
+      para a Binance consolidar o candle fechado.
+    Com `align_to_candle=False`, usa o intervalo fixo do bot (`time_to_sleep`).
+    """
+    if not align_to_candle:
+        return now_ms + int(bot.time_to_sleep * 1000)
+    if getattr(bot, "order_placed", False):
+        return now_ms + int(bot.delay_after_order * 1000)
+    # Importado aqui: o pacote binance é pesado e o agendador é carregado antes dos bots
+    from binance.helpers import interval_to_milliseconds
+    interval_ms = interval_to_milliseconds(bot.candle_period)
+    return next_candle_close(now_ms, interval_ms, offset_ms) + int(grace_period * 1000)
+
+
+class TradeScheduler:
+    """
+    Agendador central dos bots. Mantém uma fila de prioridade (heap) com o próximo horário de
+    execução de cada bot e dispara cada um logo após o fechamento do candle do seu `candle_period`,
+    em vez de dormir um tempo fixo. O horário do servidor é corrigido pelo `timestamp_offset`
+    do BinanceClient.
+
+    Com um `ExecutionPool`, as execuções vão para o pool (concorrência limitada e um símbolo por vez);
+    sem pool, rodam em sequência na thread do agendador. Com `stop_loss_interval`, o stop loss de
+    cada bot também é verificado entre os candles, com prioridade sobre as execuções de rotina.
+    Com um `PriceWatcher`, o stop loss também é acionado pelo stream de preços, na mesma prioridade.
+    Bots com OrderManager têm a ordem limitada em andamento reprecificada a cada `reprice_interval`
+    (e pelo stream de preços, quando o mercado se afasta do limite).
+    """
+
+    def __init__(self, grace_period=2.0, error_delay=60, pool=None, align_to_candle=True, stop_loss_interval=None,
+                 state_store=None, price_watcher=None):
+        self.grace_period = grace_period            # Segundos após o fechamento do candle
+        self.align_to_candle = align_to_candle
+        self.error_delay = error_delay              # Espera após erro na execução (segundos)
+        self.pool = pool
+        self.stop_loss_interval = stop_loss_interval  # Segundos entre verificações de stop loss (None = desativado)
+        self.state_store = state_store              # StateStore: snapshot do bot após cada execução
+        self.price_watcher = price_watcher          # PriceWatcher: stop loss pelo preço ao vivo
+        if price_watcher is not None:
+            price_watcher.on_trigger = self._on_price_trigger
+            price_watcher.on_reprice = self._on_reprice_price
+        self.executions = {}
+        self.bots = {}                              # operation_code -> bot agendado
+        self._reprice_pending = set()               # Símbolos com uma reprecificação já na fila (no máximo uma)
+        self._queue = []
+        self._counter = itertools.count()
+        self._condition = threading.Condition()
+        self._running = False
+
+    def add(self, bot, first_run_ms=None):
+        """Agenda o bot. Sem `first_run_ms`, a primeira execução é imediata."""
+        now_ms = int(time.time() * 1000)
+        self.bots[bot.operation_code] = bot
+        self.executions.setdefault(bot.operation_code, 0)
+        self._push(first_run_ms if first_run_ms is not None else now_ms, TASK_EXECUTE, bot)
+        if self.stop_loss_interval:
+            self._push(now_ms + int(self.stop_loss_interval * 1000), TASK_STOP_LOSS, bot)
+        if self.price_watcher is not None:
+            self.price_watcher.watch(bot)
+
+    def remove(self, operation_code):
+        """Remove o bot do agendamento (as tarefas já na fila são descartadas ao vencer)."""
+        if self.price_watcher is not None:
+            self.price_watcher.unwatch(operation_code)
+        with self._condition:
+            self._reprice_pending.discard(operation_code)
+            return self.bots.pop(operation_code, None)
+
+    def _push(self, due_ms, kind, bot):
+        with self._condition:
+            if self.bots.get(bot.operation_code) is not bot:
+                return
+            heapq.heappush(self._queue, (due_ms, next(self._counter), kind, bot))
+            self._condition.notify()
+
+    def next_due(self):
+        with self._condition:
+            return self._queue[0][0] if self._queue else None
+
+    def _offset(self, bot):
+        return getattr(bot.client_binance, "timestamp_offset", 0) or 0
+
+    def _execute(self, bot):
+        self.executions[bot.operation_code] += 1
+        total = self.executions[bot.operation_code]
+        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            print(f"\n[{current_time}][{bot.operation_code}][{total}] Iniciando execução")
+            profiler.profile_call(bot.execute)
+            self._save_state(bot)
+            self._update_watcher(bot)
+            self._schedule_reprice(bot)
+            now_ms = int(time.time() * 1000)
+            due_ms = next_run_time(bot, now_ms, self._offset(bot), self.grace_period, self.align_to_candle)
+            print(f"✅ [{bot.operation_code}][{total}] Próxima execução em {(due_ms - now_ms)/60000:.2f} minutos "
+                  f"({datetime.fromtimestamp(due_ms / 1000).strftime('%H:%M:%S')})")
+            print("-" * 50)
+        except Exception as e:
+            logging.error(f"Erro na execução {total} do {bot.operation_code}: {str(e)}")
+            print(f"⚠️ Erro na execução: {str(e)}")
+            due_ms = int(time.time() * 1000) + self.error_delay * 1000
+        self._push(due_ms, TASK_EXECUTE, bot)
+
+    def _check_stop_loss(self, bot):
+        try:
+            if bot.checkStopLoss():
+                self._save_state(bot)
+                self._update_watcher(bot)
+        except Exception as e:
+            logging.error(f"Erro na verificação de stop loss do {bot.operation_code}: {str(e)}")
+        self._push(int(time.time() * 1000) + int(self.stop_loss_interval * 1000), TASK_STOP_LOSS, bot)
+
+    def _live_exit(self, bot, price):
+        try:
+            if bot.liveExit(price):
+                self._save_state(bot)
+        except Exception as e:
+            logging.error(f"Erro na saída ao vivo do {bot.operation_code}: {str(e)}")
+        finally:
+            self._update_watcher(bot)
+
+    def _on_price_trigger(self, bot, price):
+        """Chamado na thread do websocket: só enfileira a venda."""
+        if self.pool is None:
+            threading.Thread(target=self._live_exit, args=(bot, price), daemon=True).start()
+            return
+        self.pool.submit(bot.operation_code, self._live_exit, bot, price, priority=PRIORITY_STOP_LOSS)
+
+    def _schedule_reprice(self, bot):
+        manager = getattr(bot, "order_manager", None)
+        if manager is None or not manager.hasWorkingOrder():
+            return
+        with self._condition:
+            # Cada execução chama isto: com uma reprecificação já na fila, a cadeia existente segue sozinha
+            if bot.operation_code in self._reprice_pending or self.bots.get(bot.operation_code) is not bot:
+                return
+            self._reprice_pending.add(bot.operation_code)
+            self._push(int(time.time() * 1000) + int(manager.reprice_interval * 1000), TASK_REPRICE, bot)
+
+    def _reprice(self, bot, price=None):
+        manager = getattr(bot, "order_manager", None)
+        if manager is None or not manager.hasWorkingOrder():
+            return
+        if price is None and self.price_watcher is not None:
+            price = self.price_watcher.last_prices.get(bot.operation_code)
+        try:
+            status = manager.reprice(price)
+            if status in ("filled", "market"):
+                self._save_state(bot)
+        except Exception as e:
+            logging.error(f"Erro na reprecificação da ordem do {bot.operation_code}: {str(e)}")
+        self._update_watcher(bot)
+
+    def _reprice_task(self, bot):
+        # Agendada: reprecifica e, se a ordem continua aberta, volta para a fila
+        with self._condition:
+            self._reprice_pending.discard(bot.operation_code)
+        self._reprice(bot)
+        self._schedule_reprice(bot)
+
+    def _on_reprice_price(self, bot, price):
+        """Chamado na thread do websocket quando o preço se afasta do limite da ordem."""
+        if self.pool is None:
+            threading.Thread(target=self._reprice, args=(bot, price), daemon=True).start()
+            return
+        self.pool.submit(bot.operation_code, self._reprice, bot, price, priority=PRIORITY_REPRICE)
+
+    def _update_watcher(self, bot):
+        if self.price_watcher is not None:
+            self.price_watcher.update(bot)
+
+    def _save_state(self, bot):
+        if self.state_store is None:
+            return
+        try:
+            self.state_store.save(bot)
+        except Exception as e:
+            logging.error(f"Erro ao salvar o estado de {bot.operation_code}: {str(e)}")
+
+    def save_all(self):
+        """Salva o estado de todos os bots (ex.: ao receber SIGTERM)."""
+        if self.state_store is not None:
+            self.state_store.save_all(list(self.bots.values()))
+
+    def _dispatch(self, kind, bot):
+        task, priority = {
+            TASK_EXECUTE: (self._execute, PRIORITY_EXECUTE),
+            TASK_STOP_LOSS: (self._check_stop_loss, PRIORITY_STOP_LOSS),
+            TASK_REPRICE: (self._reprice_task, PRIORITY_REPRICE),
+        }[kind]
+        if self.pool is None:
+            task(bot)
+            return
+        self.pool.submit(bot.operation_code, task, bot, priority=priority)
+
+    def run(self):
+        """Loop principal: espera o próximo horário da fila e despacha a tarefa correspondente."""
+        self._running = True
+        while self._running:
+            with self._condition:
+                while self._running and (not self._queue or self._queue[0][0] > time.time() * 1000):
+                    timeout = (self._queue[0][0] - time.time() * 1000) / 1000 if self._queue else None
+                    self._condition.wait(timeout)
+                if not self._running:
+                    break
+                _, _, kind, bot = heapq.heappop(self._queue)
+                if self.bots.get(bot.operation_code) is not bot:
+                    continue
+            self._dispatch(kind, bot)
+
+    def stop(self):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
@@ -0,0 +1,340 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import secrets
+import signal
+import socket
+import threading
+import time
+from multiprocessing.managers import BaseManager
+
+from modules.ExchangeInfoCache import ExchangeInfoCache
+from modules.Logger import LOG_FILE, configureLogging
+from modules.Tracing import tracer
+from modules.RateLimiter import RateLimiter
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50505)
+HEARTBEAT_INTERVAL = 10     # Segundos entre heartbeats/consultas de atribuição dos workers
+HEARTBEAT_TIMEOUT = 45      # Worker sem heartbeat por mais tempo é considerado morto
+
+
+class ShardRegistry:
+    """
+    Registro dos workers e da distribuição dos ativos (vive no processo do coordenador).
+
+    Cada worker consulta a sua atribuição periodicamente. Quando um worker entra ou sai,
+    os ativos são redistribuídos movendo o mínimo possível entre os workers restantes.
+    """
+
+    def __init__(self, assets, min_workers=1, startup_timeout=30):
+        self.assets = {asset.operationCode: asset for asset in assets}
+        self.assignments = {}       # worker_id -> [operationCode]
+        self.heartbeats = {}        # worker_id -> último heartbeat (time.time)
+        self.releasing = {}         # operationCode -> worker que ainda precisa soltar o ativo
+        # Só distribui depois que os workers iniciais se registrarem (evita um ativo em dois workers na partida)
+        self.min_workers = min_workers
+        self.ready_at = time.time() + startup_timeout
+        self._lock = threading.Lock()
+
+    def register(self, worker_id):
+        with self._lock:
+            self.assignments.setdefault(worker_id, [])
+            self.heartbeats[worker_id] = time.time()
+            self._rebalance()
+
+    def remove(self, worker_id):
+        with self._lock:
+            if self.assignments.pop(worker_id, None) is not None:
+                self.heartbeats.pop(worker_id, None)
+                self.releasing = {code: owner for code, owner in self.releasing.items() if owner != worker_id}
+                self._rebalance()
+
+    def heartbeat(self, worker_id, holding=()):
+        """
+        Atualiza o heartbeat e devolve os ativos atribuídos ao worker. `holding`: ativos que o worker
+        ainda tem agendados; um ativo movido só é entregue ao novo dono quando sai dessa lista.
+        """
+        with self._lock:
+            if worker_id not in self.assignments:
+                return None  # Worker removido (ex.: heartbeat atrasado): deve se registrar de novo
+            self.heartbeats[worker_id] = time.time()
+            # Este heartbeat confirma que o worker soltou os ativos movidos dele que não estão mais em `holding`
+            self.releasing = {code: owner for code, owner in self.releasing.items()
+                              if owner != worker_id or code in holding}
+            if len(self.assignments) < self.min_workers and time.time() < self.ready_at:
+                return []
+            # Um ativo movido só é entregue depois que o dono anterior o soltar
+            return [self.assets[code] for code in self.assignments[worker_id] if code not in self.releasing]
+
+    def expire(self, timeout=HEARTBEAT_TIMEOUT):
+        """Remove workers sem heartbeat (ex.: máquinas remotas que caíram). Retorna os removidos."""
+        now = time.time()
+        with self._lock:
+            expired = [worker_id for worker_id, last in self.heartbeats.items() if now - last > timeout]
+        for worker_id in expired:
+            self.remove(worker_id)
+        return expired
+
+    def snapshot(self):
+        with self._lock:
+            return {worker_id: list(codes) for worker_id, codes in self.assignments.items()}
+
+    def _rebalance(self):
+        workers = sorted(self.assignments)
+        if not workers:
+            return
+        assigned = {code for codes in self.assignments.values() for code in codes}
+        pending = [code for code in self.assets if code not in assigned]
+        base, extra = divmod(len(self.assets), len(workers))
+        # Workers mais carregados primeiro ficam com as vagas extras (menos movimentação)
+        workers.sort(key=lambda worker_id: len(self.assignments[worker_id]), reverse=True)
+        targets = {worker_id: base + (1 if position < extra else 0) for position, worker_id in enumerate(workers)}
+        for worker_id in workers:
+            codes = self.assignments[worker_id]
+            while len(codes) > targets[worker_id]:
+                code = codes.pop()
+                self.releasing[code] = worker_id
+                pending.append(code)
+        for worker_id in workers:
+            codes = self.assignments[worker_id]
+            while len(codes) < targets[worker_id] and pending:
+                codes.append(pending.pop())
+
+
+class SharedServicesManager(BaseManager):
+    """Servidor local (socket TCP) que expõe o limitador de peso, o cache de exchangeInfo e o registro."""
+
+
+class SharedServicesClient(BaseManager):
+    """Lado do worker: proxies para os serviços do coordenador."""
+
+
+for _service in ("rate_limiter", "exchange_info", "registry"):
+    SharedServicesClient.register(_service)
+
+
+def connect(address=DEFAULT_ADDRESS, authkey=None):
+    """Conecta a um coordenador (local ou em outra máquina) e retorna o manager conectado."""
+    manager = SharedServicesClient(address=parse_address(address), authkey=_authkey(authkey))
+    manager.connect()
+    return manager
+
+
+def parse_address(address):
+    """(host, porta) a partir de "HOST:PORTA" ou de uma tupla."""
+    if isinstance(address, str):
+        host, port = address.rsplit(":", 1)
+        return host, int(port)
+    return tuple(address)
+
+
+def _authkey(authkey=None):
+    """Chave informada (texto ou bytes) ou a da variável SHARD_AUTHKEY; None se nenhuma."""
+    if isinstance(authkey, str):
+        authkey = authkey.encode()
+    return authkey or os.getenv("SHARD_AUTHKEY", "").encode() or None
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def run_shard(worker_id, address, authkey, settings):
+    """
+    Processo worker: conecta aos serviços compartilhados e executa os bots atribuídos a ele
+    com o TradeScheduler/ExecutionPool locais, acompanhando mudanças de atribuição.
+    """
+    from modules.BinanceClient import BinanceClient
+    from modules.BinanceRobot import BinanceTraderBot
+    from modules.ExecutionPool import ExecutionPool
+    from modules.OrderBook import OrderBookFeed
+    from modules.PriceWatcher import PriceWatcher
+    from modules.Scheduler import TradeScheduler
+    from modules.StateStore import StateStore
+    from modules.TradeJournal import TradeJournal
+
+    # Um arquivo de log por worker: processos diferentes não rotacionam o mesmo arquivo
+    base, extension = os.path.splitext(settings.get("log_file", LOG_FILE))
+    configureLogging(f"{base}-{worker_id}{extension}")
+    if settings.get("trace_file"):
+        base, extension = os.path.splitext(settings["trace_file"])
+        tracer.configure(f"{base}-{worker_id}{extension}")
+
+    manager = connect(address, authkey)
+    rate_limiter = manager.rate_limiter()
+    exchange_info = manager.exchange_info()
+    registry = manager.registry()
+    registry.register(worker_id)
+
+    pool = ExecutionPool(max_workers=settings.get("max_workers", 2))
+    state_store = StateStore(settings["state_dir"]) if settings.get("state_dir") else None
+    # Todos os workers podem gravar no mesmo arquivo: o SQLite serializa as transações entre processos
+    journal = TradeJournal(settings["journal_path"]) if settings.get("journal_path") else None
+    # Cada worker vigia só os seus símbolos (uma conexão por worker)
+    price_watcher = PriceWatcher(settings["price_stream"]) if settings.get("price_stream") else None
+    order_books = OrderBookFeed(BinanceClient(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_SECRET_KEY"), sync=False,
+                                              ping=False, rate_limiter=rate_limiter)) if settings.get("order_book") else None
+    scheduler = TradeScheduler(grace_period=settings.get("grace_period", 2.0), pool=pool,
+                               align_to_candle=settings.get("align_to_candle", True),
+                               stop_loss_interval=settings.get("stop_loss_interval"), state_store=state_store,
+                               price_watcher=price_watcher)
+    bots = {}
+    draining = set()    # Ativos movidos com uma execução ainda em andamento neste worker
+
+    def follow_assignment():
+        while True:
+            try:
+                assets = registry.heartbeat(worker_id, sorted(bots))
+                if assets is None:
+                    registry.register(worker_id)
+                    assets = registry.heartbeat(worker_id, sorted(bots)) or []
+            except (EOFError, ConnectionError, BrokenPipeError):
+                print(f"❌ [{worker_id}] Coordenador indisponível. Encerrando worker.")
+                scheduler.stop()
+                return
+            codes = {asset.operationCode for asset in assets}
+            for code in list(bots):
+                if code not in codes and code not in draining:
+                    scheduler.remove(code)
+                    if order_books is not None:
+                        order_books.remove(code)
+                    draining.add(code)
+            for code in list(draining):
+                # Só solta o ativo (e salva o estado) depois que a execução em andamento terminar
+                if not pool.drain(code, timeout=HEARTBEAT_INTERVAL / 2):
+                    print(f"⏳ [{worker_id}] {code} aguardando a execução em andamento para ser transferido")
+                    continue
+                if state_store is not None:
+                    state_store.save(bots[code])  # O novo dono do ativo continua deste estado
+                bots.pop(code)
+                draining.discard(code)
+                print(f"↪️ [{worker_id}] {code} transferido para outro worker")
+            for asset in assets:
+                if asset.operationCode in bots:
+                    continue
+                try:
+                    client = BinanceClient(os.getenv("BINANCE_API_KEY"), os.getenv("BINANCE_SECRET_KEY"),
+                                           sync=True, ping=False, sync_interval=30000, verbose=True,
+                                           rate_limiter=rate_limiter, exchange_info_cache=exchange_info)
+                    state = state_store.load(asset.operationCode) if state_store else None
+                    bot = BinanceTraderBot.fromAsset(asset, client=client, state=state, journal=journal,
+                                                   protective_mode=settings.get("protective_mode"),
+                                                   take_profit_percentage=settings.get("take_profit_percentage"),
+                                                   reprice_interval=settings.get("reprice_interval"),
+                                                   reprice_deadline=settings.get("reprice_deadline", 5 * 60),
+                                                   order_book=order_books.book(asset.operationCode) if order_books else None)
+                except Exception as e:
+                    logging.error(f"[{worker_id}] Erro ao iniciar o bot para {asset.operationCode}: {str(e)}")
+                    print(f"❌ [{worker_id}] Erro ao iniciar o bot de {asset.operationCode}: {str(e)}")
+                    continue
+                bots[asset.operationCode] = bot
+                scheduler.add(bot)
+                print(f"✅ [{worker_id}] Bot agendado para {asset.operationCode}")
+            time.sleep(HEARTBEAT_INTERVAL)
+
+    threading.Thread(target=follow_assignment, name="shard-assignment", daemon=True).start()
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+    if price_watcher is not None:
+        price_watcher.start()
+    if order_books is not None:
+        order_books.start()
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if price_watcher is not None:
+            price_watcher.stop()
+        if order_books is not None:
+            order_books.stop()
+        scheduler.save_all()
+        print(pool.summary())
+        if journal is not None:
+            journal.close()
+
+
+class ShardCoordinator:
+    """
+    Modo distribuído: um coordenador reparte os ativos entre N processos worker.
+
+    O coordenador hospeda um `SharedServicesManager` com um único `RateLimiter` (orçamento de peso
+    da conta/IP), um `ExchangeInfoCache` e o `ShardRegistry`. Os workers locais são processos
+    iniciados aqui; workers em outras máquinas podem se conectar ao mesmo endereço (`address`,
+    "HOST:PORTA" ou tupla) com `python -m modules.ShardCoordinator worker --address HOST:PORTA`
+    e a mesma chave (`authkey`, `--authkey` ou a variável SHARD_AUTHKEY).
+    Quando um worker morre, os seus ativos são redistribuídos e um novo processo é iniciado.
+    """
+
+    def __init__(self, assets, workers=None, address=DEFAULT_ADDRESS, authkey=None, settings=None,
+                 weight_per_minute=6000, restart_workers=True):
+        self.assets = list(assets)
+        self.workers = workers or os.cpu_count()
+        self.address = parse_address(address)
+        self.authkey = _authkey(authkey) or secrets.token_bytes(16)
+        self.settings = settings or {}
+        self.weight_per_minute = weight_per_minute
+        self.restart_workers = restart_workers
+        self.processes = {}
+        self.registry = ShardRegistry(self.assets, min_workers=self.workers)
+        self.rate_limiter = RateLimiter(weight_per_minute)
+        self.exchange_info = ExchangeInfoCache()
+        self._generation = 0
+
+    def start_services(self):
+        SharedServicesManager.register("rate_limiter", callable=lambda: self.rate_limiter)
+        SharedServicesManager.register("exchange_info", callable=lambda: self.exchange_info)
+        SharedServicesManager.register("registry", callable=lambda: self.registry)
+        manager = SharedServicesManager(address=self.address, authkey=self.authkey)
+        server = manager.get_server()
+        threading.Thread(target=server.serve_forever, name="shard-services", daemon=True).start()
+        return server
+
+    def _spawn(self):
+        self._generation += 1
+        worker_id = f"{socket.gethostname()}-{self._generation}"
+        process = multiprocessing.Process(target=run_shard, name=worker_id,
+                                          args=(worker_id, self.address, self.authkey, self.settings), daemon=True)
+        process.start()
+        self.processes[worker_id] = process
+        print(f"🚀 Worker {worker_id} iniciado (pid {process.pid})")
+
+    def run(self, poll_interval=5):
+        self.start_services()
+        for _ in range(self.workers):
+            self._spawn()
+        try:
+            while True:
+                time.sleep(poll_interval)
+                for worker_id, process in list(self.processes.items()):
+                    if process.is_alive():
+                        continue
+                    print(f"⚠️ Worker {worker_id} encerrou (código {process.exitcode}). Redistribuindo ativos...")
+                    logging.error(f"Worker {worker_id} encerrou com código {process.exitcode}")
+                    self.processes.pop(worker_id)
+                    self.registry.remove(worker_id)
+                    if self.restart_workers:
+                        self._spawn()
+                for worker_id in self.registry.expire():
+                    print(f"⚠️ Worker {worker_id} sem heartbeat. Ativos redistribuídos.")
+        except KeyboardInterrupt:
+            print("\n🔴 Encerrando workers...")
+            for process in self.processes.values():
+                process.terminate()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Worker remoto do modo distribuído.")
+    parser.add_argument("role", choices=["worker"])
+    parser.add_argument("--address", default=os.getenv("SHARD_ADDRESS", f"{DEFAULT_ADDRESS[0]}:{DEFAULT_ADDRESS[1]}"),
+                        help="HOST:PORTA do coordenador (padrão: variável SHARD_ADDRESS)")
+    parser.add_argument("--authkey", default=None, help="Chave do coordenador (padrão: variável SHARD_AUTHKEY)")
+    parser.add_argument("--id", default=None, help="Identificador do worker")
+    parser.add_argument("--max-workers", type=int, default=2)
+    args = parser.parse_args(argv)
+    worker_id = args.id or f"{socket.gethostname()}-{os.getpid()}"
+    run_shard(worker_id, parse_address(args.address), _authkey(args.authkey), {"max_workers": args.max_workers})
+
+
+if __name__ == "__main__":
+    main()
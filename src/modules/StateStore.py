@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+import threading
+import time
+
+
+class StateStore:
+    """
+    Snapshots do estado de cada bot em disco (um JSON por par em `directory`).
+
+    Guarda filtros (tick/step), posição, últimos preços de compra/venda, desconto parcial,
+    os candles em cache e o cursor de ordens, para que um reinício retome de onde parou
+    com consultas incrementais em vez de recarregar tudo da API.
+    """
+
+    def __init__(self, directory="src/state", max_age=24 * 60 * 60):
+        self.directory = directory
+        self.max_age = max_age      # Snapshots mais antigos que isso (segundos) são ignorados
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, operation_code):
+        return os.path.join(self.directory, f"{operation_code}.json")
+
+    def save(self, bot):
+        state = bot.getState()
+        path = self.path(bot.operation_code)
+        temporary = f"{path}.tmp"
+        with self._lock:
+            with open(temporary, "w") as file:
+                json.dump(state, file)
+            os.replace(temporary, path)  # Escrita atômica: nunca deixa um snapshot pela metade
+        return path
+
+    def save_all(self, bots):
+        for bot in bots:
+            try:
+                self.save(bot)
+            except Exception as e:
+                logging.error(f"Erro ao salvar o estado de {bot.operation_code}: {str(e)}")
+
+    def load(self, operation_code):
+        """Retorna o snapshot do par, ou None se não existir, estiver corrompido ou velho demais."""
+        path = self.path(operation_code)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as file:
+                state = json.load(file)
+        except (OSError, ValueError) as e:
+            logging.error(f"Snapshot inválido para {operation_code}: {str(e)}")
+            return None
+        if time.time() - state.get("saved_at", 0) > self.max_age:
+            return None
+        return state
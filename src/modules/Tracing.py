@@ -0,0 +1,148 @@
+import argparse
+import json
+import logging
+import queue
+import uuid
+from collections import defaultdict
+from logging.handlers import QueueHandler, QueueListener
+
+from modules.Logger import RotatingJsonFileHandler
+from modules.Metrics import _percentile
+
+TRACE_FILE = 'src/logs/traces.jsonl'
+
+# Etapas na ordem do caminho candle -> ordem (tempos no relógio do servidor, em ms)
+STAGES = ("candle_close", "data", "features", "decision", "order_sent", "transact", "order_ack")
+
+
+class Trace:
+    """Uma execução do bot: um ID de correlação e o instante de cada etapa."""
+
+    __slots__ = ("trace_id", "symbol", "stages", "order_ids")
+
+    def __init__(self, symbol):
+        self.trace_id = uuid.uuid4().hex[:12]
+        self.symbol = symbol
+        self.stages = {}
+        self.order_ids = []
+
+    def mark(self, stage, timestamp_ms):
+        # A primeira marca vale (o updateAllData depois da ordem não sobrescreve a recepção dos dados)
+        if timestamp_ms is not None:
+            self.stages.setdefault(stage, int(timestamp_ms))
+
+    def to_record(self):
+        """Linha compacta: tempo do fechamento do candle e os deslocamentos (ms) de cada etapa."""
+        origin = self.stages.get("candle_close", min(self.stages.values(), default=0))
+        record = {"id": self.trace_id, "s": self.symbol, "t0": origin,
+                  "d": {stage: self.stages[stage] - origin for stage in STAGES if stage in self.stages and stage != "candle_close"}}
+        if self.order_ids:
+            record["o"] = self.order_ids
+        return record
+
+
+class Tracer:
+    """
+    Grava um trace por execução em `src/logs/traces.jsonl` (assíncrono, com rotação).
+    Desligado até `configure(path)`: sem arquivo, `finish` não faz nada.
+    """
+
+    def __init__(self):
+        self.path = None
+        self._logger = logging.getLogger("traces")
+        self._logger.propagate = False
+        self._listener = None
+
+    @property
+    def enabled(self):
+        return self._listener is not None
+
+    def configure(self, path=TRACE_FILE, max_bytes=20 * 1024 * 1024, backup_count=7):
+        self.close()
+        handler = RotatingJsonFileHandler(path, max_bytes=max_bytes, backup_count=backup_count)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_queue = queue.SimpleQueue()
+        self._logger.handlers = [QueueHandler(trace_queue)]
+        self._logger.setLevel(logging.INFO)
+        self._listener = QueueListener(trace_queue, handler)
+        self._listener.start()
+        self.path = path
+        return self
+
+    def start(self, symbol):
+        return Trace(symbol)
+
+    def finish(self, trace):
+        if self._listener is not None and trace is not None and trace.stages:
+            self._logger.info(json.dumps(trace.to_record(), separators=(",", ":")))
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.stop()
+            for handler in self._listener.handlers:
+                handler.close()
+            self._listener = None
+            self._logger.handlers = []
+
+
+# Instância compartilhada pelo processo (configurada em main.py)
+tracer = Tracer()
+
+
+def load_traces(path=TRACE_FILE):
+    with open(path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+def summarize(traces, symbol=None):
+    """
+    {símbolo: {etapa: {count, p50, p95, p99, max}}} com a latência de cada etapa desde o fechamento
+    do candle ("data", "decision", ...) e entre etapas consecutivas ("data->features", ...).
+    """
+    samples = defaultdict(lambda: defaultdict(list))
+    for trace in traces:
+        if symbol is not None and trace["s"] != symbol:
+            continue
+        offsets = trace["d"]
+        previous = "candle_close"
+        for stage in STAGES[1:]:
+            if stage not in offsets:
+                continue
+            samples[trace["s"]][stage].append(offsets[stage])
+            samples[trace["s"]][f"{previous}->{stage}"].append(offsets[stage] - offsets.get(previous, 0))
+            previous = stage
+    summary = {}
+    for trace_symbol, stages in samples.items():
+        summary[trace_symbol] = {}
+        for stage, values in stages.items():
+            ordered = sorted(values)
+            summary[trace_symbol][stage] = {"count": len(ordered), "p50": _percentile(ordered, 0.50),
+                                            "p95": _percentile(ordered, 0.95), "p99": _percentile(ordered, 0.99),
+                                            "max": ordered[-1]}
+    return summary
+
+
+def print_summary(summary):
+    for symbol, stages in sorted(summary.items()):
+        print(f"\n📈 {symbol}")
+        print(f"  {'Etapa (ms)':<28}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'máx':>10}")
+        # Primeiro as latências desde o candle, depois as de cada trecho
+        for stage in sorted(stages, key=lambda name: ("->" in name, _stage_position(name))):
+            stats = stages[stage]
+            print(f"  {stage:<28}{stats['count']:>6}{stats['p50']:>10}{stats['p95']:>10}{stats['p99']:>10}{stats['max']:>10}")
+
+
+def _stage_position(name):
+    return STAGES.index(name.split("->")[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumo das latências candle -> ordem por símbolo.")
+    parser.add_argument("--file", default=TRACE_FILE)
+    parser.add_argument("--symbol", default=None)
+    args = parser.parse_args(argv)
+    print_summary(summarize(load_traces(args.file), args.symbol))
+
+
+if __name__ == "__main__":
+    main()
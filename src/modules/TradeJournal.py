@@ -0,0 +1,263 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    symbol TEXT NOT NULL,
+    order_id INTEGER NOT NULL,
+    client_order_id TEXT,
+    side TEXT,
+    type TEXT,
+    status TEXT,
+    price REAL,
+    orig_qty REAL,
+    executed_qty REAL,
+    quote_qty REAL,
+    time INTEGER,
+    update_time INTEGER,
+    strategy TEXT,
+    PRIMARY KEY (symbol, order_id)
+);
+CREATE INDEX IF NOT EXISTS idx_orders_symbol_time ON orders (symbol, time);
+
+CREATE TABLE IF NOT EXISTS fills (
+    symbol TEXT NOT NULL,
+    order_id INTEGER NOT NULL,
+    trade_id INTEGER NOT NULL,
+    price REAL,
+    qty REAL,
+    commission REAL,
+    commission_asset TEXT,
+    time INTEGER,
+    PRIMARY KEY (symbol, trade_id)
+);
+CREATE INDEX IF NOT EXISTS idx_fills_symbol_time ON fills (symbol, time);
+
+CREATE TABLE IF NOT EXISTS decisions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    symbol TEXT NOT NULL,
+    time INTEGER,
+    decision INTEGER,
+    strategy TEXT,
+    price REAL,
+    position INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_decisions_symbol_time ON decisions (symbol, time);
+"""
+
+UPSERT_ORDER = """
+INSERT INTO orders (symbol, order_id, client_order_id, side, type, status, price, orig_qty,
+                    executed_qty, quote_qty, time, update_time, strategy)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (symbol, order_id) DO UPDATE SET
+    status = excluded.status,
+    executed_qty = excluded.executed_qty,
+    quote_qty = excluded.quote_qty,
+    update_time = MAX(COALESCE(orders.update_time, 0), COALESCE(excluded.update_time, 0)),
+    strategy = COALESCE(orders.strategy, excluded.strategy)
+"""
+INSERT_FILL = "INSERT OR IGNORE INTO fills VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+INSERT_DECISION = "INSERT INTO decisions (symbol, time, decision, strategy, price, position) VALUES (?, ?, ?, ?, ?, ?)"
+
+_STATEMENTS = {"order": UPSERT_ORDER, "fill": INSERT_FILL, "decision": INSERT_DECISION}
+
+
+class TradeJournal:
+    """
+    Diário local das operações em SQLite (modo WAL): ordens, execuções (fills) e decisões.
+
+    Os `record_*` só colocam as linhas em uma fila; uma thread grava em lotes (uma transação
+    por lote), então o bot não espera o disco. As consultas usam uma conexão por thread e,
+    com o WAL, leem enquanto a thread de escrita grava.
+
+    O preço da última compra, consultado a cada execução, fica também em memória: a consulta não
+    espera a fila de escrita.
+    """
+
+    def __init__(self, path="src/state/journal.db", batch_size=500):
+        self.path = path
+        self.batch_size = batch_size
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._entries = {}                  # símbolo -> (time, preço médio) da última compra executada
+        self._entries_loaded = set()        # Símbolos com a última compra do disco já lida
+        self._filled = defaultdict(dict)    # (símbolo, orderId) -> {tradeId: quantidade} registrados neste processo
+        connection = self._connect()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(SCHEMA)
+        connection.commit()
+        self._queue = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="trade-journal", daemon=True)
+        self._writer.start()
+
+    def _connect(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # ---- Escrita (assíncrona) ----
+
+    def record_order(self, order, strategy=None):
+        """Registra uma ordem (resposta do create_order ou do histórico). Repetir a mesma ordem atualiza o status."""
+        symbol = order["symbol"]
+        timestamp = order.get("time") or order.get("transactTime")
+        executed_qty = float(order.get("executedQty") or 0)
+        quote_qty = float(order.get("cummulativeQuoteQty") or 0)
+        self._queue.put(("order", (
+            symbol, order["orderId"], order.get("clientOrderId"), order.get("side"), order.get("type"),
+            order.get("status"), float(order.get("price") or 0), float(order.get("origQty") or 0),
+            executed_qty, quote_qty, timestamp, order.get("updateTime") or timestamp, strategy,
+        )))
+        if order.get("side") == "BUY" and executed_qty > 0 and order.get("status") in ("FILLED", "PARTIALLY_FILLED"):
+            self._set_entry(symbol, timestamp or 0, quote_qty / executed_qty)
+        self.record_fills(symbol, [dict(fill, orderId=order["orderId"], time=timestamp) for fill in order.get("fills") or []])
+
+    def record_fills(self, symbol, trades):
+        """Registra execuções no formato do myTrades (ou dos `fills` da resposta da ordem, com orderId e time)."""
+        for trade in trades:
+            trade_id = trade.get("id", trade.get("tradeId"))
+            self._queue.put(("fill", (
+                symbol, trade["orderId"], trade_id, float(trade["price"]), float(trade["qty"]),
+                float(trade.get("commission") or 0), trade.get("commissionAsset"), trade.get("time"),
+            )))
+            with self._lock:
+                self._filled[(symbol, trade["orderId"])][trade_id] = float(trade["qty"])
+
+    def filled_qty(self, symbol, order_id):
+        """Quantidade da ordem já registrada em fills por este processo."""
+        with self._lock:
+            return sum(self._filled.get((symbol, order_id), {}).values())
+
+    def record_orders(self, orders):
+        for order in orders:
+            self.record_order(order)
+
+    def record_decision(self, symbol, decision, strategy=None, price=None, position=None, timestamp=None):
+        timestamp = timestamp if timestamp is not None else int(time.time() * 1000)
+        self._queue.put(("decision", (
+            symbol, timestamp, None if decision is None else int(decision), strategy, price,
+            None if position is None else int(position),
+        )))
+
+    def _write_loop(self):
+        connection = self._connect()
+        while True:
+            batch = [self._queue.get()]
+            # Junta no mesmo lote tudo o que já estiver na fila
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            closing = None in batch
+            rows = defaultdict(list)
+            for item in batch:
+                if item is not None:
+                    rows[item[0]].append(item[1])
+            try:
+                with connection:
+                    for kind, values in rows.items():
+                        connection.executemany(_STATEMENTS[kind], values)
+            except sqlite3.Error as e:
+                logging.error(f"Erro ao gravar {len(batch)} registros no diário de trades: {str(e)}")
+            for _ in batch:
+                self._queue.task_done()
+            if closing:
+                connection.close()
+                return
+
+    def flush(self):
+        """Espera a gravação de tudo o que já foi registrado."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+
+    # ---- Consultas ----
+
+    def _query(self, sql, parameters=()):
+        self.flush()  # Lê o que o próprio processo acabou de registrar
+        return self._connect().execute(sql, parameters).fetchall()
+
+    def _set_entry(self, symbol, timestamp, price):
+        with self._lock:
+            current = self._entries.get(symbol)
+            if current is None or timestamp >= current[0]:
+                self._entries[symbol] = (timestamp, price)
+
+    def last_entry_price(self, symbol):
+        """
+        Preço médio da última compra executada do par, ou None se não houver. Chamado a cada execução:
+        o disco é lido uma vez por símbolo (sem esperar a fila) e o resto vem do que foi registrado.
+        """
+        if symbol not in self._entries_loaded:
+            rows = self._connect().execute(
+                "SELECT time, quote_qty / executed_qty FROM orders "
+                "WHERE symbol = ? AND side = 'BUY' AND executed_qty > 0 AND status IN ('FILLED', 'PARTIALLY_FILLED') "
+                "ORDER BY time DESC LIMIT 1", (symbol,)).fetchall()
+            if rows:
+                self._set_entry(symbol, rows[0][0] or 0, rows[0][1])
+            self._entries_loaded.add(symbol)
+        entry = self._entries.get(symbol)
+        return entry[1] if entry else None
+
+    def _executed_orders(self, symbol=None, since=None):
+        sql = "SELECT symbol, side, executed_qty, quote_qty, strategy FROM orders WHERE executed_qty > 0"
+        parameters = []
+        if symbol is not None:
+            sql += " AND symbol = ?"
+            parameters.append(symbol)
+        if since is not None:
+            sql += " AND time >= ?"
+            parameters.append(since)
+        return self._query(sql + " ORDER BY symbol, time", parameters)
+
+    def _realized_trades(self, symbol=None, since=None):
+        """Percorre as ordens executadas com custo médio e devolve (símbolo, estratégia, lucro) de cada venda."""
+        positions = defaultdict(lambda: [0.0, 0.0])  # símbolo -> [quantidade, custo total]
+        trades = []
+        for order_symbol, side, quantity, quote, strategy in self._executed_orders(symbol, since):
+            position = positions[order_symbol]
+            if side == "BUY":
+                position[0] += quantity
+                position[1] += quote
+            elif position[0] > 0:
+                sold = min(quantity, position[0])
+                cost = position[1] * sold / position[0]
+                trades.append((order_symbol, strategy, quote * sold / quantity - cost))
+                position[0] -= sold
+                position[1] -= cost
+        return trades
+
+    def realized_pnl(self, symbol=None, since=None):
+        """Lucro realizado (na moeda de cotação, sem taxas) pelo custo médio de compra."""
+        return sum(profit for _, _, profit in self._realized_trades(symbol, since))
+
+    def strategy_stats(self, since=None):
+        """Por estratégia: decisões, vendas, acertos, taxa de acerto e lucro realizado."""
+        stats = defaultdict(lambda: {"decisions": 0, "trades": 0, "wins": 0, "realized_pnl": 0.0})
+        sql = "SELECT COALESCE(strategy, '-'), COUNT(*) FROM decisions"
+        rows = self._query(sql + (" WHERE time >= ?" if since is not None else "") + " GROUP BY 1",
+                           (since,) if since is not None else ())
+        for strategy, count in rows:
+            stats[strategy]["decisions"] = count
+        for _, strategy, profit in self._realized_trades(since=since):
+            entry = stats[strategy or "-"]
+            entry["trades"] += 1
+            entry["wins"] += profit > 0
+            entry["realized_pnl"] += profit
+        for entry in stats.values():
+            entry["win_rate"] = entry["wins"] / entry["trades"] if entry["trades"] else 0.0
+        return dict(stats)
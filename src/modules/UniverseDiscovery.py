@@ -0,0 +1,136 @@
+import dataclasses
+import logging
+import math
+import threading
+
+from Models.AssetStartModel import AssetStartModel
+from modules.OrderRules import OrderRules, quantize_down, to_decimal
+
+REQUIRED_ORDER_TYPES = ("LIMIT", "MARKET")
+
+
+class UniverseDiscovery:
+    """
+    Escolhe as moedas negociadas a partir de uma consulta ao exchangeInfo (guardada no ExchangeInfoCache)
+    e uma ao ticker de 24h de todos os pares, sem consultar símbolo por símbolo:
+
+    - pares da `quote_asset` em negociação, com ordens LIMIT e MARKET;
+    - volume de 24h (na moeda de cotação) de pelo menos `min_quote_volume` e spread até `max_spread_percentage`;
+    - ordenados pelo volume ajustado pelo spread, até `max_symbols`;
+    - `tradedQuantity` = `order_value` na moeda de cotação, no step do LOT_SIZE e acima do notional mínimo.
+
+    Com `start`, refaz a seleção a cada `interval` segundos e chama `on_change(added, removed, changed)`,
+    como o AssetConfigWatcher. Pares com posição aberta (`keep(par)` True) não são removidos.
+    """
+
+    def __init__(self, client, exchange_info=None, quote_asset="BRL", min_quote_volume=100_000,
+                 max_spread_percentage=0.3, max_symbols=10, order_value=100.0, defaults=None, exclude=()):
+        self.client = client
+        self.exchange_info = exchange_info            # ExchangeInfoCache compartilhado (os bots criados já o encontram cheio)
+        self.quote_asset = quote_asset
+        self.min_quote_volume = min_quote_volume
+        self.max_spread_percentage = max_spread_percentage
+        self.max_symbols = max_symbols
+        self.order_value = order_value
+        self.defaults = dict(defaults or {})          # Campos do AssetStartModel comuns a todas as moedas (candlePeriod...)
+        self.exclude = set(exclude)
+        self.assets = {}
+        self.ranking = []                             # [(par, volume 24h, spread %)] da última seleção
+        self._stop = threading.Event()
+
+    def discover(self):
+        """Seleção atual: lista de AssetStartModel, do par mais líquido para o menos."""
+        exchange_info = self.client.get_exchange_info()
+        if self.exchange_info is not None:
+            self.exchange_info.put_exchange_info(exchange_info)
+        tickers = {ticker["symbol"]: ticker for ticker in self.client.get_ticker()}
+
+        candidates = []
+        for info in exchange_info["symbols"]:
+            if not self._eligible(info):
+                continue
+            ticker = tickers.get(info["symbol"])
+            if ticker is None:
+                continue
+            bid, ask = float(ticker["bidPrice"]), float(ticker["askPrice"])
+            volume = float(ticker["quoteVolume"])
+            if bid <= 0 or ask <= 0 or volume < self.min_quote_volume:
+                continue
+            spread = (ask - bid) / ((ask + bid) / 2) * 100
+            if spread > self.max_spread_percentage:
+                continue
+            # Volume em escala log, descontado pelo spread: um par 10x mais líquido compensa um spread um pouco maior
+            score = math.log10(volume) - spread
+            candidates.append((score, info, float(ticker["lastPrice"]) or (bid + ask) / 2, volume, spread))
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        assets, ranking = [], []
+        for _, info, price, volume, spread in candidates:
+            if len(assets) >= self.max_symbols:
+                break
+            quantity = self.quantity(info, price)
+            if quantity is None:
+                continue
+            assets.append(AssetStartModel(**{**self.defaults, "stockCode": info["baseAsset"],
+                                             "operationCode": info["symbol"], "tradedQuantity": quantity}))
+            ranking.append((info["symbol"], volume, spread))
+        self.ranking = ranking
+        return assets
+
+    def _eligible(self, info):
+        return (info.get("status") == "TRADING" and info.get("quoteAsset") == self.quote_asset
+                and info.get("isSpotTradingAllowed", True) and info["symbol"] not in self.exclude
+                and all(order_type in info.get("orderTypes", REQUIRED_ORDER_TYPES) for order_type in REQUIRED_ORDER_TYPES))
+
+    def quantity(self, symbol_info, price):
+        """Quantidade de `order_value` ao `price`, arredondada para cima no step até cumprir minQty e o notional mínimo."""
+        rules = OrderRules.from_symbol_info(symbol_info)
+        price = to_decimal(price)
+        value = max(to_decimal(self.order_value), rules.min_notional * to_decimal("1.01"))
+        quantity = max(value / price, rules.min_qty)
+        if rules.step_size:
+            quantity = -quantize_down(-quantity, rules.step_size)  # Teto no step
+        if rules.max_qty and quantity > rules.max_qty:
+            return None
+        return float(quantity)
+
+    def refresh(self, keep=None):
+        """Refaz a seleção e retorna (added, removed, changed) em relação à anterior."""
+        current = {asset.operationCode: asset for asset in self.discover()}
+        added = [asset for code, asset in current.items() if code not in self.assets]
+        changed = []
+        for code, asset in current.items():
+            previous = self.assets.get(code)
+            if previous is None or previous == asset:
+                continue
+            # O preço muda a quantidade a cada rodada: só reajusta quando ela se afasta mais de 10%
+            if dataclasses.replace(previous, tradedQuantity=asset.tradedQuantity) == asset and \
+                    abs(asset.tradedQuantity / previous.tradedQuantity - 1) <= 0.1:
+                current[code] = previous
+                continue
+            changed.append(asset)
+        removed = []
+        for code, asset in self.assets.items():
+            if code in current:
+                continue
+            if keep is not None and keep(code):
+                current[code] = asset  # Posição aberta: continua até vender
+            else:
+                removed.append(asset)
+        self.assets = current
+        return added, removed, changed
+
+    def start(self, on_change, interval=6 * 60 * 60, keep=None):
+        def loop():
+            while not self._stop.wait(interval):
+                try:
+                    added, removed, changed = self.refresh(keep)
+                    if added or removed or changed:
+                        print(f"🔭 Universo {self.quote_asset}: +{len(added)} -{len(removed)} ~{len(changed)} moedas")
+                        on_change(added, removed, changed)
+                except Exception as e:
+                    logging.error(f"Erro na descoberta de moedas: {str(e)}")
+        threading.Thread(target=loop, name="universe-discovery", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
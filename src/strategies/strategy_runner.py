@@ -2,41 +2,59 @@
 from .moving_average import getMovingAverageTradeStrategy
 from .talib import sinal_compra_venda
 
-def runStrategies(stock_data, volatility_factor=0.5, fallback_activated=True):
+def runStrategies(stock_data, volatility_factor=0.5, fallback_activated=True,
+                  ema_windows=(7, 25, 99), macd_signal_window=7, ma_windows=(7, 40)):
     """
     Executa todas as estratégias disponíveis na ordem:
     1. EMA MACD (principal)
     2. MA Antecipation (secundária)
     3. Moving Average (fallback)
     """
+    return runNamedStrategies(stock_data, volatility_factor, fallback_activated,
+                              ema_windows, macd_signal_window, ma_windows)[1]
+
+def runNamedStrategies(stock_data, volatility_factor=0.5, fallback_activated=True,
+                       ema_windows=(7, 25, 99), macd_signal_window=7, ma_windows=(7, 40)):
+    """
+    Igual ao runStrategies, mas retorna (nome da estratégia que decidiu, decisão).
+    """
     # Primeira estratégia: EMA MACD
-    ema_macd_decision = sinal_compra_venda(stock_data) 
+    ema_macd_decision = sinal_compra_venda(stock_data, *ema_windows, signal_window=macd_signal_window)
     if ema_macd_decision is not None:
         print('Decisão baseada na estratégia EMA/MACD')
-        return ema_macd_decision
+        return "ema_macd", ema_macd_decision
         
     # Segunda estratégia: MA Antecipation
     # maant_trade_decision = getMovingAverageAntecipationTradeStrategy(stock_data, volatility_factor)
     # if maant_trade_decision is not None:
     #     print('Decisão baseada na estratégia MA Antecipation')
-    #     return maant_trade_decision
+    #     return "ma_antecipation", maant_trade_decision
 
     
     # Fallback strategy
     if fallback_activated:
         print('Estratégias principais inconclusivas\nExecutando estratégia de fallback...')
-        ma_trade_decision = getMovingAverageTradeStrategy(stock_data)
-        return ma_trade_decision
+        ma_trade_decision = getMovingAverageTradeStrategy(stock_data, *ma_windows)
+        return "moving_average", ma_trade_decision
     
-    return None
+    return None, None
 
 def run_all_strategies(bot):
     """
     Função auxiliar para executar todas as estratégias a partir do objeto bot
     """
-    return runStrategies(
+    return run_all_strategies_named(bot)[1]
+
+def run_all_strategies_named(bot):
+    """
+    Como o run_all_strategies, retornando também o nome da estratégia que decidiu
+    """
+    return runNamedStrategies(
         stock_data=bot.stock_data,
         volatility_factor=bot.volatility_factor,
-        fallback_activated=bot.fallback_activated
+        fallback_activated=bot.fallback_activated,
+        ema_windows=bot.ema_windows,
+        macd_signal_window=bot.macd_signal_window,
+        ma_windows=bot.ma_windows
     )
 
@@ -1,12 +1,16 @@
+import numpy as np
 import pandas as pd
 import talib as ta
 
-def sinal_compra_venda(stock_data: pd.DataFrame) -> bool:
+def sinal_compra_venda(stock_data: pd.DataFrame, fast_window=7, mid_window=25, slow_window=99, signal_window=7) -> bool:
     """
     Função para melhorar os sinais de compra e venda utilizando TA-Lib.
     
     Parâmetros:
         stock_data (pd.DataFrame): DataFrame contendo, no mínimo, a coluna 'close_price'.
+        fast_window, mid_window, slow_window: janelas das EMAs (padrão 7/25/99).
+            O MACD usa fast_window e mid_window como períodos rápido e lento.
+        signal_window: janela da linha de sinal do MACD (padrão 7).
         
     Retorna:
         bool: True se o último sinal for de compra (1) e False caso contrário.
@@ -17,12 +21,13 @@ def sinal_compra_venda(stock_data: pd.DataFrame) -> bool:
         return False
 
     # Cálculo das médias exponenciais (EMAs)
-    stock_data['EMA7'] = ta.EMA(stock_data['close_price'], timeperiod=7)
-    stock_data['EMA25'] = ta.EMA(stock_data['close_price'], timeperiod=25)
-    stock_data['EMA99'] = ta.EMA(stock_data['close_price'], timeperiod=99)
+    # (os nomes das colunas são mantidos mesmo quando as janelas mudam)
+    stock_data['EMA7'] = ta.EMA(stock_data['close_price'], timeperiod=fast_window)
+    stock_data['EMA25'] = ta.EMA(stock_data['close_price'], timeperiod=mid_window)
+    stock_data['EMA99'] = ta.EMA(stock_data['close_price'], timeperiod=slow_window)
 
     # Cálculo do MACD com os parâmetros especificados
-    macd, signal_line, _ = ta.MACD(stock_data['close_price'], fastperiod=7, slowperiod=25, signalperiod=7)
+    macd, signal_line, _ = ta.MACD(stock_data['close_price'], fastperiod=fast_window, slowperiod=mid_window, signalperiod=signal_window)
     stock_data['MACD'] = pd.Series(macd, index=stock_data.index)
     stock_data['Signal_Line'] = pd.Series(signal_line, index=stock_data.index)
 
@@ -62,7 +67,8 @@ def sinal_compra_venda(stock_data: pd.DataFrame) -> bool:
     stock_data.loc[venda_desvalorizacao & ((stock_data['signal'].shift(1) != -1) | (stock_data['signal'].shift(1).isna())), 'signal'] = -1
 
     # Preencher os sinais de forma contínua, propagando o último sinal válido
-    stock_data['signal'] = stock_data['signal'].replace(to_replace=0, method='ffill')
+    # (equivalente a replace(to_replace=0, method='ffill'), descontinuado no pandas 2.2)
+    stock_data['signal'] = stock_data['signal'].replace(0, np.nan).ffill().fillna(0).astype(int)
 
     # Retorna True se o último sinal for de compra (1) e False caso contrário
     final_signal = stock_data['signal'].iloc[-1]
@@ -0,0 +1,685 @@
+import unittest
+import sys
+import os
+import tempfile
+import json
+import io
+import math
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+from binance.exceptions import BinanceAPIException
+
+# Adiciona o diretório src ao path para poder importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backtest import VirtualClock, MatchingEngine, ReplayBacktester, SimulatedExchange, build_symbol_info
+from backtest.data import KlineStore, find_gaps, verify_continuity
+from backtest.downloader import KlineDownloader
+from backtest.optimizer import ParameterOptimizer
+from backtest.vectorized import IndicatorCache, run_backtest
+from backtest.walk_forward import WalkForwardRunner
+from benchmarks.run import compare
+from benchmarks.synthetic import generate_columns
+from Models.AssetStartModel import AssetStartModel
+from modules.Tracing import load_traces, summarize, tracer
+from strategies.talib import sinal_compra_venda
+
+
+def gerar_klines(total, interval_ms=60 * 60 * 1000, price=300000.0, seed=7):
+    """Gera candles sintéticos (passeio aleatório) no formato de `get_klines`."""
+    rng = np.random.default_rng(seed)
+    closes = price * np.exp(np.cumsum(rng.normal(0, 0.01, total)))
+    start = 1_700_000_000_000
+    klines, previous = [], price
+    for i, close in enumerate(closes):
+        high = max(previous, close) * 1.002
+        low = min(previous, close) * 0.998
+        open_time = start + i * interval_ms
+        klines.append([open_time, f"{previous:.2f}", f"{high:.2f}", f"{low:.2f}", f"{close:.2f}",
+                       "10.00000", open_time + interval_ms - 1, "0", 100, "0", "0", "0"])
+        previous = close
+    return klines
+
+
+class TestMatchingEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = VirtualClock(1_000)
+        self.engine = MatchingEngine(self.clock, fee_rate=0.001, slippage=0.0, participation_rate=0.5)
+        self.engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        self.engine.set_balance("BRL", 10000)
+        self.engine.set_last_price("BTCBRL", 100.0)
+
+    def test_limit_order_rounding_and_lock(self):
+        """Quantidade e preço são arredondados para step/tick e o saldo fica reservado"""
+        order = self.engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC",
+                                         quantity="1.23456", price="99.999")
+        self.assertEqual(order["origQty"], "1.23400000")
+        self.assertEqual(order["price"], "99.99000000")
+        self.assertEqual(order["status"], "NEW")
+        self.assertAlmostEqual(self.engine.balances["BRL"]["locked"], 1.234 * 99.99)
+
+    def test_partial_fill_by_volume_and_fees(self):
+        """Execução parcial limitada pelo volume do candle e taxa cobrada no ativo recebido"""
+        self.engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", quantity="4", price="99")
+        self.clock.advance_to(5_000)
+        self.engine.match_candle("BTCBRL", 2_000, 100, 101, 98, 99.5, volume=4)
+        order = self.engine.get_order("BTCBRL", orderId=1)
+        self.assertEqual(order["status"], "PARTIALLY_FILLED")
+        self.assertEqual(order["executedQty"], "2.00000000")
+        self.assertAlmostEqual(self.engine.balances["BTC"]["free"], 2 * 0.999)
+
+        self.engine.cancel_order("BTCBRL", orderId=1)
+        self.assertAlmostEqual(self.engine.balances["BRL"]["locked"], 0)
+        self.assertAlmostEqual(self.engine.balances["BRL"]["free"], 10000 - 2 * 99)
+
+    def test_rejects_below_min_notional(self):
+        """Ordens abaixo do MIN_NOTIONAL são rejeitadas como na Binance"""
+        with self.assertRaises(Exception) as context:
+            self.engine.create_order(symbol="BTCBRL", side="BUY", type="MARKET", quantity="0.05")
+        self.assertEqual(context.exception.code, -1013)
+
+
+class TestProtectiveOrders(unittest.TestCase):
+    def test_stop_follows_position_and_executes_on_exchange(self):
+        """A STOP_LOSS_LIMIT acompanha a posição e é executada pela corretora ao romper o stop"""
+        from functools import partial
+        from types import SimpleNamespace
+        from modules.BinanceRobot import BinanceTraderBot
+        from modules.ProtectiveOrders import ProtectiveOrderManager
+        clock = VirtualClock(1_000)
+        engine = MatchingEngine(clock, fee_rate=0.0, slippage=0.0, participation_rate=1.0)
+        engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        engine.set_balance("BTC", 1.0)
+        engine.set_last_price("BTCBRL", 100.0)
+        bot = SimpleNamespace(operation_code="BTCBRL", stock_code="BTC", client_binance=engine, journal=None,
+                              actual_trade_position=True, last_buy_price=100.0, stop_loss_percentage=0.02,
+                              step_size=0.001, tick_size=0.01, stock_data=pd.DataFrame({"close_price": [100.0]}),
+                              adjust_to_step=partial(BinanceTraderBot.adjust_to_step, None))
+        manager = ProtectiveOrderManager(bot)
+
+        def reconcile():
+            bot.account_data = engine.get_account()
+            bot.open_orders = engine.get_open_orders("BTCBRL")
+            return manager.reconcile()
+
+        first = reconcile()
+        self.assertEqual((first["type"], first["stopPrice"], first["origQty"]), ("STOP_LOSS_LIMIT", "98.00000000", "1.00000000"))
+        self.assertEqual(reconcile()["orderId"], first["orderId"])  # Nada mudou: mantém a ordem
+        # Id derivado da entrada e da quantidade: o reenvio da mesma proteção é recusado como duplicata
+        self.assertEqual(first["clientOrderId"], manager.clientOrderId("1.000"))
+        with self.assertRaises(BinanceAPIException) as duplicate:
+            manager._place("1.000", "98.00")
+        self.assertEqual(duplicate.exception.code, -2010)
+
+        bot.last_buy_price = 110.0  # Nova compra: o stop sobe
+        bot.stock_data = pd.DataFrame({"close_price": [110.0]})
+        moved = reconcile()
+        self.assertEqual(moved["stopPrice"], "107.80000000")
+        self.assertEqual([order["orderId"] for order in engine.get_open_orders("BTCBRL")], [moved["orderId"]])
+
+        clock.advance_to(10_000)
+        engine.match_candle("BTCBRL", 5_000, 108, 108, 107, 107.5, volume=10)
+        self.assertEqual(engine.get_order("BTCBRL", orderId=moved["orderId"])["status"], "FILLED")
+        self.assertAlmostEqual(engine.balances["BTC"]["free"] + engine.balances["BTC"]["locked"], 0.0)
+
+    def test_strategy_sell_releases_protection_with_managed_orders(self):
+        """Com OrderManager e proteção ativos, a venda da estratégia cancela antes o stop que trava o saldo"""
+        from modules import BinanceRobot as robot_module
+        from modules.ProtectiveOrders import ProtectiveOrderManager
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.01, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, initial_base=0.005, warmup=600)
+        clock = VirtualClock(int(replay.klines[609][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        with clock.patch_bot(), redirect_stdout(io.StringIO()):
+            bot = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, protective_mode="stop_limit",
+                                                          reprice_interval=15)
+            price = float(exchange.get_symbol_ticker(symbol="BTCBRL")["price"])
+            # Compra limitada em andamento abaixo do mercado (acompanhada pelo OrderManager, que não a leva
+            # até o preço) e a proteção da parte já comprada
+            bot.order_manager.chase_offset = -0.01
+            buy = exchange.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC",
+                                        quantity="0.01000", price=f"{price * 0.99:.2f}")
+            bot.order_manager.track(buy, "BUY", "0.01000")
+            bot.updateAllData()
+            bot.last_buy_price = price
+            protection = bot.protective_orders.reconcile()
+            self.assertEqual(protection["status"], "NEW")
+            self.assertFalse(bot.hasOpenSellOrder())  # A proteção não é uma venda da estratégia
+
+            bot.getFinalDecisionStrategy = lambda: False
+            bot.stopLossTrigger = lambda: False
+            bot.executeCycle()
+
+        orders = exchange.engine.get_all_orders("BTCBRL", limit=10)
+        strategy_sells = [order for order in orders if order["side"] == "SELL" and not ProtectiveOrderManager.isProtective(order)]
+        self.assertEqual(exchange.get_order(symbol="BTCBRL", orderId=protection["orderId"])["status"], "CANCELED")
+        self.assertEqual(exchange.get_order(symbol="BTCBRL", orderId=buy["orderId"])["status"], "CANCELED")
+        self.assertEqual([order["origQty"] for order in strategy_sells], ["0.00500000"])
+        self.assertAlmostEqual(exchange.engine.balances["BTC"]["free"] + exchange.engine.balances["BTC"]["locked"], 0.0)
+
+
+class TestOrderRules(unittest.TestCase):
+    def test_exact_quantizers_and_local_filter_validation(self):
+        """Quantização exata em Decimal e recusa local de LOT_SIZE/PRICE_FILTER/NOTIONAL"""
+        from modules.OrderRules import OrderFilterError, OrderRules
+        rules = OrderRules.from_symbol_info(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.00001))
+        # No float, floor(0.00099 / 0.00001) = 98: o ajuste perdia um step
+        self.assertEqual(rules.format_quantity(0.00099), "0.00099")
+        self.assertEqual(rules.format_price(101.239), "101.23")
+        self.assertEqual(rules.validate({"type": "LIMIT", "quantity": "0.00099", "price": "20000.00"}), [])
+
+        failures = rules.validate({"type": "LIMIT", "quantity": "0.000995", "price": "100.001"})
+        self.assertEqual([failure.split(":")[0] for failure in failures], ["PRICE_FILTER", "LOT_SIZE", "NOTIONAL"])
+        self.assertEqual(rules.validate({"type": "MARKET", "quantity": "0.00010"}, reference_price=200000.0), [])
+        with self.assertRaises(OrderFilterError):
+            rules.check({"type": "MARKET", "quantity": "0.00001"}, reference_price=200000.0)  # 2 BRL < 10
+
+
+class TestOrderManager(unittest.TestCase):
+    def test_reprices_with_cancel_replace_and_goes_to_market(self):
+        """A ordem limitada é reprecificada mantendo o parcial e o restante vai a mercado no prazo"""
+        from functools import partial
+        from types import SimpleNamespace
+        from modules.BinanceRobot import BinanceTraderBot
+        from modules.OrderManager import OrderManager
+        clock = VirtualClock(1_000)
+        engine = MatchingEngine(clock, fee_rate=0.0, slippage=0.0, participation_rate=0.1)
+        engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        engine.set_balance("BRL", 1000.0)
+        engine.set_last_price("BTCBRL", 100.0)
+        logged = []
+        bot = SimpleNamespace(operation_code="BTCBRL", client_binance=engine, journal=None, last_strategy=None,
+                              step_size=0.001, tick_size=0.01, last_buy_price=0.0, open_orders=[],
+                              partial_quantity_discount=0.0, logOrder=logged.append,
+                              submitOrder=lambda **params: (engine.create_order(**params), False),
+                              adjust_to_step=partial(BinanceTraderBot.adjust_to_step, None))
+        manager = OrderManager(bot, reprice_interval=15, deadline=60)
+        first = engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        manager.track(first, "BUY", "1.000")
+
+        clock.advance_to(10_000)
+        engine.match_candle("BTCBRL", 5_000, 100, 100.5, 98.9, 100.4, volume=4)  # Executa 0,4 a 99
+        self.assertEqual(manager.reprice(market_price=99.5), "repriced")
+        self.assertAlmostEqual(bot.partial_quantity_discount, 0.4)
+        replaced = manager.working.order
+        self.assertEqual((replaced["price"], replaced["origQty"]), ("99.50000000", "0.60000000"))
+        self.assertEqual(engine.get_order("BTCBRL", orderId=first["orderId"])["status"], "CANCELED")
+        self.assertEqual(manager.reprice(market_price=99.5), "kept")  # Já no preço
+
+        manager.working.started -= 60
+        self.assertEqual(manager.reprice(market_price=99.5), "market")
+        self.assertIsNone(manager.working)
+        self.assertAlmostEqual(engine.balances["BTC"]["free"], 1.0)
+        self.assertEqual([order["type"] for order in logged], ["LIMIT", "MARKET"])
+
+    def test_fill_before_cancel_does_not_go_to_market(self):
+        """Ordem executada entre o prazo e o cancelamento: o restante sai do executedQty da corretora"""
+        from functools import partial
+        from types import SimpleNamespace
+        from modules.BinanceRobot import BinanceTraderBot
+        from modules.OrderManager import OrderManager
+        clock = VirtualClock(1_000)
+        engine = MatchingEngine(clock, fee_rate=0.0, slippage=0.0, participation_rate=1.0)
+        engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        engine.set_balance("BRL", 1000.0)
+        engine.set_last_price("BTCBRL", 100.0)
+        fills = []
+
+        def late_cancel(**params):
+            clock.advance_to(clock.now_ms + 1_000)
+            engine.match_candle("BTCBRL", clock.now_ms - 500, 100, 100, 98.5, 99.5, volume=fills.pop(0))
+            return engine.cancel_order(**params)
+
+        client = SimpleNamespace(cancel_order=late_cancel, get_order=engine.get_order)
+        submitted = []
+        bot = SimpleNamespace(operation_code="BTCBRL", client_binance=client, journal=None, last_strategy=None,
+                              step_size=0.001, tick_size=0.01, last_buy_price=0.0, open_orders=[],
+                              partial_quantity_discount=0.0, logOrder=lambda order: None,
+                              submitOrder=lambda **params: (submitted.append(params) or engine.create_order(**params), False),
+                              adjust_to_step=partial(BinanceTraderBot.adjust_to_step, None))
+        manager = OrderManager(bot, deadline=60)
+
+        # Executa inteira antes do cancelamento: -2011, o get_order confirma FILLED e nada vai a mercado
+        fills.append(10)
+        order = engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        manager.track(order, "BUY", "1.000")
+        manager.working.started -= 60
+        self.assertEqual(manager.reprice(market_price=99.5), "filled")
+        self.assertEqual(submitted, [])
+        self.assertAlmostEqual(engine.balances["BTC"]["free"], 1.0)
+
+        # Executa 0,3 antes do cancelamento: a mercado vão só os 0,7 que faltam
+        fills.append(0.3)
+        order = engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        manager.track(order, "BUY", "1.000")
+        manager.working.started -= 60
+        self.assertEqual(manager.reprice(market_price=99.5), "market")
+        self.assertEqual(submitted[0]["quantity"], "0.700")
+        self.assertAlmostEqual(engine.balances["BTC"]["free"], 2.0)
+
+    def test_market_after_deadline_ends_the_cycle_without_new_buy(self):
+        """Prazo esgotado no executeCycle: o restante vai a mercado e o ciclo não envia outra compra"""
+        from modules import BinanceRobot as robot_module
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.01, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, warmup=600)
+        clock = VirtualClock(int(replay.klines[609][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        with clock.patch_bot(), redirect_stdout(io.StringIO()):
+            bot = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, reprice_interval=15, reprice_deadline=60)
+            bot.order_manager.chase_offset = -0.01  # A compra fica abaixo do mercado até o prazo
+            bot.getFinalDecisionStrategy = lambda: True
+            bot.stopLossTrigger = lambda: False
+            bot.executeCycle()
+            self.assertTrue(bot.order_manager.hasWorkingOrder())
+            clock.sleep(61)
+            bot.executeCycle()
+            self.assertFalse(bot.order_manager.hasWorkingOrder())
+            self.assertTrue(bot.actual_trade_position)
+
+        buys = [(order["type"], order["status"]) for order in exchange.engine.get_all_orders("BTCBRL", limit=10)
+                if order["side"] == "BUY"]
+        self.assertEqual(buys, [("LIMIT", "CANCELED"), ("MARKET", "FILLED")])
+        self.assertAlmostEqual(exchange.engine.balances["BTC"]["free"], 0.01 * 0.999)
+
+
+class TestOrderTracker(unittest.TestCase):
+    def test_timeout_resolved_by_client_order_id_without_double_submit(self):
+        """Timeout no envio: uma consulta pelo clientOrderId confirma a ordem e a mesma intenção não é reenviada"""
+        from functools import partial
+        from types import SimpleNamespace
+        import requests
+        from modules.BinanceRobot import BinanceTraderBot
+        from modules.OrderTracker import OrderTracker
+        clock = VirtualClock(1_000)
+        engine = MatchingEngine(clock, fee_rate=0.0, slippage=0.0)
+        engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        engine.set_balance("BRL", 1000.0)
+        engine.set_last_price("BTCBRL", 100.0)
+
+        def lost_response(**params):
+            engine.create_order(**params)  # Chega à corretora, mas a resposta se perde
+            raise requests.exceptions.ReadTimeout("read timed out")
+
+        client = SimpleNamespace(create_order=lost_response, get_order=engine.get_order)
+        bot = SimpleNamespace(operation_code="BTCBRL", client_binance=client, order_rules=None, allocator=None, trace=None,
+                              protective_orders=None, order_tracker=OrderTracker("BTCBRL"), markTrace=lambda *args: None,
+                              orderIntent=lambda params: (params["side"], params["type"], 1_700_000_000_000))
+        submit = partial(BinanceTraderBot.submitOrder, bot)
+        order, already_tracked = submit(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        self.assertEqual(order["clientOrderId"], "bot-BTCBRL-BL-s44we8")
+        self.assertFalse(already_tracked)  # Confirmada pela consulta: ainda não registrada por quem chamou
+        self.assertEqual(bot.order_tracker.get(order["clientOrderId"]).state, "NEW")
+
+        client.create_order = engine.create_order
+        again, already_tracked = submit(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        self.assertEqual(again["orderId"], order["orderId"])  # Já aberta: nada é reenviado
+        self.assertTrue(already_tracked)                      # ...nem registrado de novo
+        self.assertEqual(len(engine.get_open_orders("BTCBRL")), 1)
+
+        bot.order_tracker.update(engine.cancel_order("BTCBRL", orderId=order["orderId"]))
+        retry, _ = submit(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000", price="99.00")
+        self.assertEqual(retry["clientOrderId"], "bot-BTCBRL-BL-s44we8-2")  # Cancelada: nova tentativa
+
+    def test_order_not_visible_yet_is_checked_again_before_rejecting(self):
+        """-2013 logo depois de um timeout: uma segunda consulta encontra a ordem antes de marcá-la REJECTED"""
+        from types import SimpleNamespace
+        from binance.exceptions import BinanceAPIException
+        from modules.OrderTracker import OrderTracker
+        clock = VirtualClock(1_000)
+        engine = MatchingEngine(clock, fee_rate=0.0, slippage=0.0)
+        engine.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=0.01, step_size=0.001))
+        engine.set_balance("BRL", 1000.0)
+        engine.set_last_price("BTCBRL", 100.0)
+        tracker = OrderTracker("BTCBRL")
+        tracked, existing = tracker.prepare(("BUY", "LIMIT", 1_700_000_000_000))
+        self.assertFalse(existing)
+        lookups = []
+
+        def late_get_order(**params):
+            lookups.append(clock.now_ms)
+            if len(lookups) == 1:
+                # A ordem chegou à corretora, mas a primeira consulta ainda não a encontra
+                engine.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC", quantity="1.000",
+                                    price="99.00", newClientOrderId=tracked.client_id)
+                raise BinanceAPIException(None, 400, json.dumps({"code": -2013, "msg": "Order does not exist."}))
+            return engine.get_order(**params)
+
+        with clock.patch_bot():
+            order = tracker.resolve(SimpleNamespace(get_order=late_get_order), tracked)
+            self.assertEqual((order["clientOrderId"], tracked.state), (tracked.client_id, "NEW"))
+            self.assertEqual(lookups, [1_000, 2_000])
+
+            missing, _ = tracker.prepare(("SELL", "LIMIT", 1_700_000_000_000))
+            self.assertIsNone(tracker.resolve(SimpleNamespace(get_order=engine.get_order), missing))
+            self.assertEqual(missing.state, "REJECTED")
+
+
+class TestReplayBacktester(unittest.TestCase):
+    def test_replay_runs_bot_execute(self):
+        """O replay executa o BinanceTraderBot real com relógio virtual"""
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="1h",
+                                tempoEntreTrades=60 * 60, delayEntreOrdens=60 * 60)
+        result = ReplayBacktester(asset, gerar_klines(200), initial_quote=10000, warmup=120).run()
+        self.assertEqual(result.errors, [])
+        self.assertGreaterEqual(result.cycles, 80)
+        self.assertGreater(result.simulated_seconds, 79 * 60 * 60)
+        self.assertEqual(len(result.equity_curve), result.cycles + 1)
+
+    def test_virtual_clock_reaches_order_modules_and_restores_logging(self):
+        """Prazos do OrderManager e a espera do OrderTracker seguem o relógio virtual; o logging volta ao nível anterior"""
+        import logging
+        from modules import OrderManager, OrderTracker
+
+        clock = VirtualClock(1_700_000_000_000)
+        with clock.patch_bot():
+            self.assertIs(OrderManager.time, clock)
+            self.assertIs(OrderTracker.time, clock)
+            working = OrderManager.WorkingOrder({"orderId": 1, "executedQty": "0", "price": "1"}, "BUY", 1)
+            self.assertEqual(working.started, 1_700_000_000)
+        self.assertIsNot(OrderManager.time, clock)
+
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="1h")
+        logging.disable(logging.WARNING)
+        try:
+            ReplayBacktester(asset, gerar_klines(130), initial_quote=10000, warmup=120).run(max_cycles=2)
+            self.assertEqual(logging.root.manager.disable, logging.WARNING)
+        finally:
+            logging.disable(logging.NOTSET)
+
+    def test_live_take_profit_sells_position_at_market(self):
+        """O preço ao vivo no alvo de lucro vende a posição a mercado; abaixo dele, nada"""
+        from modules import BinanceRobot as robot_module
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.01, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, initial_base=0.01, warmup=600)
+        clock = VirtualClock(int(replay.klines[609][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        with clock.patch_bot(), redirect_stdout(io.StringIO()):
+            bot = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, take_profit_percentage=3)
+            bot.updateAllData()
+            bot.last_buy_price = float(exchange.get_symbol_ticker(symbol="BTCBRL")["price"]) / 1.05
+            self.assertFalse(bot.liveExit(bot.last_buy_price * 1.02))
+            self.assertTrue(bot.liveExit(bot.last_buy_price * 1.04))
+        self.assertEqual(bot.last_strategy, "take_profit")
+        sells = [order for order in exchange.engine.get_all_orders("BTCBRL", limit=10) if order["side"] == "SELL"]
+        self.assertEqual([(order["type"], order["status"]) for order in sells], [("MARKET", "FILLED")])
+
+    def test_limit_fills_reach_the_journal(self):
+        """Execuções parciais e finais de uma ordem limitada vão para a tabela de fills, sem duplicar"""
+        from modules import BinanceRobot as robot_module
+        from modules.TradeJournal import TradeJournal
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.01, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, warmup=600)
+        clock = VirtualClock(int(replay.klines[609][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        with tempfile.TemporaryDirectory() as directory:
+            journal = TradeJournal(os.path.join(directory, "journal.db"))
+            try:
+                with clock.patch_bot(), redirect_stdout(io.StringIO()):
+                    bot = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, journal=journal)
+                    bot.refreshOrders()
+                    price = float(exchange.get_symbol_ticker(symbol="BTCBRL")["price"]) * 0.99
+                    buy = exchange.create_order(symbol="BTCBRL", side="BUY", type="LIMIT", timeInForce="GTC",
+                                                quantity="0.01000", price=f"{price:.2f}")
+                    bot.refreshOrders()
+                    for volume in (0.04, 0.1, 0.1):  # participation_rate = 0.1: 0.004, depois o restante
+                        exchange.engine.match_candle("BTCBRL", clock.now_ms, price, price, price * 0.99, price, volume=volume)
+                        bot.refreshOrders()
+                journal.flush()
+                fills = journal._query("SELECT order_id, qty FROM fills ORDER BY trade_id")
+            finally:
+                journal.close()
+        self.assertEqual(exchange.get_order(symbol="BTCBRL", orderId=buy["orderId"])["status"], "FILLED")
+        self.assertEqual([order_id for order_id, _ in fills], [buy["orderId"]] * 2)
+        self.assertAlmostEqual(sum(qty for _, qty in fills), 0.01)
+
+    def test_allocator_sizes_the_order_without_overwriting_traded_quantity(self):
+        """Com o PortfolioAllocator a compra usa o tamanho alocado; o tradedQuantity configurado não muda"""
+        from modules import BinanceRobot as robot_module
+        from modules.PortfolioAllocator import PortfolioAllocator
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.01, tradedPercentage=10,
+                                candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, warmup=600)
+        clock = VirtualClock(int(replay.klines[609][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        allocator = PortfolioAllocator(exchange)
+        with clock.patch_bot(), redirect_stdout(io.StringIO()):
+            bot = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, allocator=allocator)
+            allocator.add(bot)
+            price = float(exchange.get_symbol_ticker(symbol="BTCBRL")["price"])
+            bot.getFinalDecisionStrategy = lambda: True
+            bot.executeCycle()
+        buys = [order for order in exchange.engine.get_all_orders("BTCBRL", limit=10) if order["side"] == "BUY"]
+        self.assertEqual(bot.traded_quantity, 0.01)
+        self.assertEqual(len(buys), 1)
+        self.assertNotAlmostEqual(float(buys[0]["origQty"]), 0.01)
+        # 10% de 10000 BRL, arredondado para baixo no step
+        self.assertAlmostEqual(float(buys[0]["origQty"]), math.floor(1000 / price / bot.step_size) * bot.step_size)
+
+    def test_state_snapshot_warm_restart(self):
+        """O bot restaurado de um snapshot não recarrega filtros e busca só os candles/ordens novos"""
+        from modules import BinanceRobot as robot_module
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(700), initial_quote=10000, warmup=600)
+        clock = VirtualClock(int(replay.klines[599][6]) + 1)
+        exchange = replay.build_exchange(clock)
+        with clock.patch(robot_module), redirect_stdout(io.StringIO()):
+            bot = replay.build_bot(robot_module, exchange)
+            bot.execute()
+            state = json.loads(json.dumps(bot.getState()))
+
+            clock.sleep(3 * 60 * 60)
+            requests_before = exchange.request_count
+            restored = robot_module.BinanceTraderBot.fromAsset(asset, client=exchange, state=state)
+            self.assertEqual(exchange.request_count, requests_before)  # Sem get_symbol_info
+            restored.execute()
+            # Snapshot de outro CANDLE_PERIOD: os candles gravados são descartados
+            other_period = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="15m")
+            self.assertEqual(robot_module.BinanceTraderBot.fromAsset(other_period, client=exchange, state=state).klines_cache, [])
+
+        self.assertEqual(len(restored.klines_cache), 500)
+        self.assertEqual(restored.klines_cache, exchange.get_klines(symbol="BTCBRL", interval="1h", limit=500))
+        self.assertEqual(restored.tick_size, bot.tick_size)
+
+    def test_execute_writes_latency_trace(self):
+        """Cada execute() grava um trace com as etapas desde o fechamento do candle"""
+        from modules import BinanceRobot as robot_module
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="1h")
+        replay = ReplayBacktester(asset, gerar_klines(620), initial_quote=10000, warmup=600)
+        clock = VirtualClock(int(replay.klines[599][6]) + 1 + 2000)  # 2s após o fechamento
+        exchange = replay.build_exchange(clock)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "traces.jsonl")
+            tracer.configure(path)
+            try:
+                with clock.patch(robot_module), redirect_stdout(io.StringIO()):
+                    bot = replay.build_bot(robot_module, exchange)
+                    for _ in range(5):
+                        bot.execute()
+                        clock.sleep(60 * 60)
+            finally:
+                tracer.close()
+            traces = load_traces(path)
+
+        self.assertEqual(len(traces), 5)
+        self.assertEqual(len({trace["id"] for trace in traces}), 5)
+        self.assertGreaterEqual(traces[0]["d"]["data"], 2000)
+        self.assertIn("decision", traces[0]["d"])
+        stages = summarize(traces)["BTCBRL"]
+        self.assertEqual(stages["data"]["count"], 5)
+        self.assertIn("data->features", stages)
+
+
+class TestPaperTrading(unittest.TestCase):
+    def test_virtual_accounts_share_market_data(self):
+        """Contas virtuais com configurações diferentes sobre os mesmos candles, com uma consulta de mercado por candle"""
+        import copy
+        import logging
+        from backtest import PaperTradingSession
+        from modules.BinanceRobot import BinanceTraderBot
+        klines = gerar_klines(540)
+        clock = VirtualClock(int(klines[509][6]) + 1)
+        data = SimulatedExchange(clock, "1h")
+        data.add_symbol(build_symbol_info("BTCBRL", "BTC", "BRL", step_size=0.00001), klines)
+        session = PaperTradingSession(data, "1h", clock=clock)
+        asset = AssetStartModel(stockCode="BTC", operationCode="BTCBRL", tradedQuantity=0.001, candlePeriod="1h")
+        logging.disable(logging.CRITICAL)
+        try:
+            with redirect_stdout(io.StringIO()):
+                for name, stop_loss in (("stop_1", 1.0), ("stop_5", 5.0)):
+                    variant = copy.copy(asset)
+                    variant.stopLossPercentage = stop_loss
+                    account = session.account(name, {"BRL": 1000.0}, latency_ms=100)
+                    session.add_bot(name, BinanceTraderBot.fromAsset(variant, client=account))
+                session.run(end_ms=int(klines[-1][6]))
+        finally:
+            logging.disable(logging.NOTSET)
+
+        self.assertEqual(session.errors, [])
+        self.assertIsNot(session.accounts["stop_1"].engine, session.accounts["stop_5"].engine)
+        self.assertLess(session.feed.requests, sum(account.request_count for account in session.accounts.values()))
+        self.assertIn("stop_5", session.summary("BRL"))
+        with self.assertRaises(AttributeError):
+            session.accounts["stop_1"]._post  # Nada assinado vai para o cliente de dados
+
+
+class TestRequestRecorder(unittest.TestCase):
+    def test_recorded_responses_replay_in_order_without_network(self):
+        """As respostas gravadas voltam na mesma ordem, inclusive os erros, sem acessar a rede"""
+        import requests
+        from binance.exceptions import BinanceAPIException
+        from modules.RequestRecorder import ReplayClient, ReplayMissError, RequestRecorder
+        klines = gerar_klines(3)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "requests.jsonl.gz")
+            recorder = RequestRecorder(path)
+            base = "https://api.binance.com/api/v3"
+            started = recorder.started
+            recorder.record("get", f"{base}/time", {}, started, response={"serverTime": 1})
+            recorder.record("get", f"{base}/klines", {"symbol": "BTCBRL", "interval": "1h", "limit": 3}, started, response=klines)
+            recorder.record("post", f"{base}/order", {"symbol": "BTCBRL", "timestamp": 5}, started,
+                            error=requests.exceptions.ReadTimeout("read timed out"))
+            recorder.record("get", f"{base}/order", {"symbol": "BTCBRL", "timestamp": 6}, started,
+                            error=BinanceAPIException(None, 400, json.dumps({"code": -2013, "msg": "Order does not exist."})))
+            recorder.record("get", f"{base}/time", {}, started, response={"serverTime": 2})
+            recorder.record("get", f"{base}/klines", {"symbol": "ETHBRL", "interval": "1h", "limit": 3}, started, response=klines)
+            recorder.close()
+
+            client = ReplayClient(path)
+        self.assertEqual(client.get_server_time(), {"serverTime": 1})
+        self.assertEqual(client.get_klines(limit=3, interval="1h", symbol="BTCBRL"), klines)
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            client.create_order(symbol="BTCBRL", side="BUY", type="MARKET", quantity="1")
+        with self.assertRaises(BinanceAPIException) as error:
+            client.get_order(symbol="BTCBRL", orderId=1)
+        self.assertEqual(error.exception.code, -2013)
+        self.assertEqual(client.get_server_time(), {"serverTime": 2})
+        # Parâmetros diferentes só casam com uma gravação do mesmo par: a do ETHBRL não serve ao BTCBRL
+        with self.assertRaises(ReplayMissError):
+            client.get_klines(limit=5, interval="1h", symbol="BTCBRL")
+        self.assertEqual(client.get_klines(limit=5, interval="1h", symbol="ETHBRL"), klines)
+        self.assertEqual(client.remaining, 0)
+        with self.assertRaises(ReplayMissError):
+            client.get_server_time()
+
+
+class TestVectorizedBacktest(unittest.TestCase):
+    def setUp(self):
+        x = np.arange(1500)
+        noise = np.random.default_rng(1).normal(0, 0.2, len(x))
+        self.close = 100 + np.linspace(0, 30, len(x)) + 5 * np.sin(x / 150) + noise
+        self.candles = {"close": self.close, "high": self.close * 1.003}
+
+    def test_decision_matches_strategy(self):
+        """A decisão vetorizada reproduz sinal_compra_venda em todas as janelas de 500 candles da série fixa"""
+        decision = IndicatorCache().decision("X", self.close, 7, 25, 99, 7)
+        mismatches = [t for t in range(499, len(self.close))
+                      if sinal_compra_venda(pd.DataFrame({"close_price": self.close[t - 499:t + 1]})) != bool(decision[t])]
+        self.assertEqual(mismatches, [])
+
+    def test_optimizer_writes_results(self):
+        """A busca em grade grava uma linha por combinação e símbolo no SQLite"""
+        with tempfile.TemporaryDirectory() as directory:
+            optimizer = ParameterOptimizer({"A": self.candles, "B": self.candles},
+                                           {"stopLossPercentage": [1, 3], "emaFastWindow": [5, 7]},
+                                           max_workers=1, db_path=os.path.join(directory, "opt.db"), verbose=False)
+            ranking = optimizer.grid_search()
+            self.assertEqual(len(ranking), 4)
+            best = optimizer.best(limit=1)[0]
+            self.assertEqual(best["symbols"], 2)
+            expected = run_backtest(self.candles, ranking[0]["params"]).metrics()["return_drawdown"]
+            self.assertAlmostEqual(best["return_drawdown"], expected)
+
+    def test_successive_halving_reuses_one_pool(self):
+        """As etapas do successive halving usam os mesmos candles compartilhados e o mesmo pool"""
+        from unittest import mock
+        from backtest import optimizer as optimizer_module
+        with tempfile.TemporaryDirectory() as directory:
+            optimizer = ParameterOptimizer({"A": self.candles},
+                                           {"stopLossPercentage": [1, 2, 3], "emaFastWindow": [3, 5, 7]},
+                                           max_workers=1, db_path=os.path.join(directory, "opt.db"), verbose=False)
+            with mock.patch.object(optimizer_module, "SharedCandles", wraps=optimizer_module.SharedCandles) as shared:
+                ranking = optimizer.successive_halving(9, eta=3, seed=1)
+            self.assertEqual(shared.call_count, 1)
+            self.assertEqual(len(ranking), 3)
+
+    def test_walk_forward_stitches_out_of_sample(self):
+        """O walk-forward costura as janelas de teste em uma curva contínua"""
+        runner = WalkForwardRunner({"A": self.candles}, {"stopLossPercentage": [1, 3]},
+                                   train_bars=300, test_bars=200, max_workers=1, verbose=False)
+        windows = runner.windows(len(self.close))
+        self.assertEqual(windows[0], (499, 799, 799, 999))
+        result = runner.run()["A"]
+        self.assertEqual(len(result.equity), len(self.close) - windows[0][2])
+        self.assertEqual(result.metrics()["windows"], len(windows))
+
+
+class FakeKlinesClient:
+    """Cliente mínimo que pagina uma lista de klines como o endpoint /api/v3/klines."""
+
+    def __init__(self, klines):
+        self.klines = klines
+
+    def get_klines(self, symbol, interval, startTime=0, endTime=None, limit=500):
+        rows = [k for k in self.klines if k[0] >= startTime and (endTime is None or k[0] <= endTime)]
+        return rows[:limit]
+
+
+class TestKlineDownloader(unittest.TestCase):
+    def test_resume_and_gaps(self):
+        """O download retoma do último candle salvo e aponta os buracos da série"""
+        klines = gerar_klines(3000, interval_ms=60_000)
+        del klines[1000:1005]
+        with tempfile.TemporaryDirectory() as directory:
+            store = KlineStore(directory)
+            KlineDownloader(FakeKlinesClient(klines), store, verbose=False).download(
+                ["BTCBRL"], ["1m"], end=klines[1500][0])
+            downloader = KlineDownloader(FakeKlinesClient(klines), store, verbose=False)
+            report = downloader.download(["BTCBRL"], ["1m"], end=klines[-1][0] + 60_000)
+
+            columns = store.load("BTCBRL", "1m")
+            self.assertEqual(len(columns["open_time"]), len(klines))
+            self.assertEqual(downloader.requests, 1 + 2)  # Primeiro candle + 2 páginas após o retomado
+            self.assertEqual(find_gaps(columns["open_time"], 60_000), [(klines[999][0], klines[1000][0], 5)])
+            self.assertEqual(len(report[("BTCBRL", "1m")]["gaps"]), 1)
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_synthetic_candles_and_regression_check(self):
+        """Candles sintéticos contínuos e reprodutíveis; a comparação aponta regressões"""
+        columns = generate_columns(1000, "1h", seed=3)
+        self.assertEqual(verify_continuity(columns, 60 * 60 * 1000), [])
+        self.assertTrue(np.all(columns["high"] >= np.maximum(columns["open"], columns["close"])))
+        np.testing.assert_array_equal(columns["close"], generate_columns(1000, "1h", seed=3)["close"])
+
+        baseline = {"results": [{"name": "a", "bars": 500, "symbols": 1, "median": 1.0},
+                                {"name": "b", "bars": 500, "symbols": 1, "median": 1.0}]}
+        current = {"results": [{"name": "a", "bars": 500, "symbols": 1, "median": 1.5},
+                               {"name": "b", "bars": 500, "symbols": 1, "median": 1.05}]}
+        _, regressions = compare(current, baseline, threshold=0.10)
+        self.assertEqual(regressions, [("a", 500, 1)])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,61 @@
+import unittest
+import sys
+import os
+import tempfile
+
+# Adiciona o diretório src ao path para poder importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.TradeJournal import TradeJournal
+
+
+def order(order_id, side, quantity, quote, time, status="FILLED"):
+    return {"symbol": "BTCBRL", "orderId": order_id, "side": side, "type": "LIMIT", "status": status,
+            "price": str(quote / quantity), "origQty": str(quantity), "executedQty": str(quantity),
+            "cummulativeQuoteQty": str(quote), "time": time, "updateTime": time}
+
+
+class TestTradeJournal(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.journal = TradeJournal(os.path.join(self.directory.name, "journal.db"))
+
+    def tearDown(self):
+        self.journal.close()
+        self.directory.cleanup()
+
+    def test_entry_price_pnl_and_strategy_stats(self):
+        """Preço de entrada, lucro pelo custo médio e estatísticas por estratégia"""
+        self.journal.record_order(order(1, "BUY", 1.0, 100.0, 1000), strategy="ema_macd")
+        self.journal.record_order(order(2, "BUY", 1.0, 120.0, 2000), strategy="ema_macd")
+        self.journal.record_order(order(3, "SELL", 2.0, 260.0, 3000), strategy="moving_average")
+        self.journal.record_order(order(4, "BUY", 0.5, 70.0, 4000, status="NEW"), strategy="ema_macd")
+        # O histórico atualiza o status sem apagar a estratégia registrada no envio
+        self.journal.record_orders([order(3, "SELL", 2.0, 260.0, 3000)])
+        self.journal.record_decision("BTCBRL", True, "ema_macd", 100.0, False, timestamp=900)
+        self.journal.record_decision("BTCBRL", False, "moving_average", 130.0, True, timestamp=2900)
+
+        self.assertAlmostEqual(self.journal.last_entry_price("BTCBRL"), 120.0)
+        self.assertIsNone(self.journal.last_entry_price("ETHBRL"))
+        self.assertAlmostEqual(self.journal.realized_pnl("BTCBRL"), 40.0)
+        stats = self.journal.strategy_stats()
+        self.assertEqual(stats["moving_average"]["trades"], 1)
+        self.assertEqual(stats["moving_average"]["win_rate"], 1.0)
+        self.assertEqual(stats["ema_macd"]["decisions"], 1)
+
+    def test_entry_price_without_waiting_for_writes(self):
+        """O preço de entrada vem da memória sem esperar a fila; num diário reaberto, do disco"""
+        self.journal.record_order(order(1, "BUY", 1.0, 100.0, 1000))
+        self.journal.flush = lambda: self.fail("last_entry_price não deve esperar a fila de escrita")
+        self.assertAlmostEqual(self.journal.last_entry_price("BTCBRL"), 100.0)
+        self.journal.record_order(order(2, "BUY", 2.0, 220.0, 2000))
+        self.journal.record_order(order(0, "BUY", 1.0, 90.0, 500))  # Histórico antigo não troca a entrada
+        self.assertAlmostEqual(self.journal.last_entry_price("BTCBRL"), 110.0)
+        del self.journal.flush
+        self.journal.close()
+        self.journal = TradeJournal(self.journal.path)
+        self.assertAlmostEqual(self.journal.last_entry_price("BTCBRL"), 110.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,341 @@
+import unittest
+import sys
+import os
+import threading
+import time
+import urllib.request
+from types import SimpleNamespace
+
+# Adiciona o diretório src ao path para poder importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.ExecutionPool import ExecutionPool, PRIORITY_STOP_LOSS
+from modules.Metrics import MetricsServer, PhaseMetrics, Profiler
+from modules.OrderBook import OrderBook, OrderBookFeed
+from modules.PortfolioAllocator import PortfolioAllocator
+from modules.PriceWatcher import LocalStreamTransport, PriceWatcher
+from modules.Scheduler import TradeScheduler, next_candle_close, next_run_time
+
+HOUR = 60 * 60 * 1000
+
+
+class TestScheduler(unittest.TestCase):
+    def setUp(self):
+        self.bot = SimpleNamespace(candle_period="1h", delay_after_order=10 * 60, time_to_sleep=5 * 60,
+                                   order_placed=False)
+
+    def test_runs_after_candle_close_with_server_offset(self):
+        """A próxima execução cai logo após o fechamento do candle no relógio do servidor"""
+        now = 100 * HOUR + 20 * 60 * 1000
+        self.assertEqual(next_run_time(self.bot, now, offset_ms=0, grace_period=2), 101 * HOUR + 2000)
+        # Relógio local 1,5s atrasado em relação ao servidor
+        self.assertEqual(next_candle_close(now, HOUR, offset_ms=1500), 101 * HOUR - 1500)
+
+    def test_cooldown_after_order(self):
+        """Depois de uma ordem o bot espera o delay_after_order, não o próximo candle"""
+        self.bot.order_placed = True
+        now = 100 * HOUR + 55 * 60 * 1000
+        self.assertEqual(next_run_time(self.bot, now), now + 10 * 60 * 1000)
+        self.assertEqual(next_run_time(self.bot, now, align_to_candle=False), now + 5 * 60 * 1000)
+
+    def test_single_pending_reprice_per_symbol(self):
+        """Várias execuções com a ordem aberta deixam só uma reprecificação na fila"""
+        manager = SimpleNamespace(reprice_interval=30, hasWorkingOrder=lambda: True)
+        bot = SimpleNamespace(operation_code="BTCBRL", order_manager=manager)
+        scheduler = TradeScheduler()
+        scheduler.bots[bot.operation_code] = bot
+        for _ in range(3):
+            scheduler._schedule_reprice(bot)
+        self.assertEqual([task[2] for task in scheduler._queue].count("reprice"), 1)
+        # Ao rodar, a tarefa libera a vaga e agenda a próxima da cadeia
+        scheduler._queue.clear()
+        scheduler._reprice = lambda bot, price=None: None
+        scheduler._reprice_task(bot)
+        scheduler._schedule_reprice(bot)
+        self.assertEqual(len(scheduler._queue), 1)
+        scheduler.remove(bot.operation_code)
+        self.assertNotIn(bot.operation_code, scheduler._reprice_pending)
+
+
+class TestExecutionPool(unittest.TestCase):
+    def test_symbol_exclusion_and_priority(self):
+        """Um símbolo por vez e stop loss antes das execuções de rotina"""
+        pool = ExecutionPool(max_workers=2)
+        gate, order, active = threading.Event(), [], set()
+
+        def task(name, key):
+            self.assertNotIn(key, active)
+            active.add(key)
+            if name == "bloqueia":
+                gate.wait(5)
+            time.sleep(0.01)
+            order.append(name)
+            active.discard(key)
+
+        pool.submit("BTCBRL", task, "bloqueia", "BTCBRL")
+        time.sleep(0.05)
+        pool.submit("BTCBRL", task, "rotina", "BTCBRL")
+        pool.submit("BTCBRL", task, "stop", "BTCBRL", priority=PRIORITY_STOP_LOSS)
+        pool.submit("ETHBRL", task, "outro", "ETHBRL").result(5)  # Não espera o BTCBRL
+        self.assertEqual(pool.queue_depth(), 2)
+        gate.set()
+        pool.shutdown()
+        self.assertEqual(order, ["outro", "bloqueia", "stop", "rotina"])
+        self.assertEqual(pool.metrics()["completed"], 4)
+
+    def test_drain_cancels_queued_and_waits_running(self):
+        """Antes de entregar um símbolo: o que está na fila é cancelado e o que roda termina"""
+        pool = ExecutionPool(max_workers=1)
+        gate, order = threading.Event(), []
+        running = pool.submit("BTCBRL", lambda: gate.wait(5) and order.append("rodando"))
+        time.sleep(0.05)
+        queued = pool.submit("BTCBRL", order.append, "na fila")
+        other = pool.submit("ETHBRL", order.append, "outro")
+        self.assertFalse(pool.drain("BTCBRL", timeout=0.05))  # Ainda em execução
+        gate.set()
+        self.assertTrue(pool.drain("BTCBRL", timeout=5))
+        other.result(5)
+        pool.shutdown()
+        self.assertTrue(running.done() and queued.cancelled())
+        self.assertEqual(order, ["rodando", "outro"])
+
+
+class TestMetrics(unittest.TestCase):
+    def test_phase_percentiles_and_endpoint(self):
+        """Percentis por fase no /metrics e profiler ligado/desligado pelo endpoint"""
+        metrics = PhaseMetrics()
+        for milliseconds in range(1, 101):
+            metrics.record("BTCBRL", "get_klines", milliseconds / 1000)
+        metrics.add_gauges("pool", lambda: {"queue_depth": 3})
+        stats = metrics.summary()[("BTCBRL", "get_klines")]
+        self.assertEqual(stats["count"], 100)
+        self.assertAlmostEqual(stats["p50"], 0.051)
+        self.assertAlmostEqual(stats["p99"], 0.1)
+
+        profiler = Profiler()
+        server = MetricsServer(port=0, metrics=metrics, profiler_instance=profiler).start()
+        try:
+            def get(path):
+                with urllib.request.urlopen(f"http://127.0.0.1:{server.port}{path}") as response:
+                    return response.read().decode()
+            body = get("/metrics")
+            self.assertIn('bot_phase_seconds{symbol="BTCBRL",phase="get_klines",quantile="0.95"} 0.096000', body)
+            self.assertIn("bot_pool_queue_depth 3", body)
+            get("/profile/start?mode=cprofile")
+            profiler.profile_call(sorted, range(1000))
+            get("/profile/stop")
+            self.assertIn("sorted", get("/profile"))
+        finally:
+            server.stop()
+
+
+class TestPriceWatcher(unittest.TestCase):
+    def test_stop_loss_from_stream_without_waiting_for_loop(self):
+        """O bookTicker abaixo do stop ou no alvo de lucro aciona a venda pelo pool, uma vez por posição"""
+        sold = []
+        bots = [SimpleNamespace(operation_code=f"C{i:03d}BRL", actual_trade_position=i in (7, 9), last_buy_price=100.0,
+                                stop_loss_percentage=0.05, take_profit_percentage=0.03 if i == 9 else None,
+                                liveExit=lambda price, i=i: sold.append((i, price)) or True)
+                for i in range(300)]
+        transport = LocalStreamTransport()
+        watcher = PriceWatcher("bookTicker", transport=transport, resubscribe_delay=0)
+        pool = ExecutionPool(max_workers=1)
+        scheduler = TradeScheduler(pool=pool, price_watcher=watcher)
+        try:
+            for bot in bots:
+                scheduler.add(bot, first_run_ms=time.time() * 1000 + HOUR)
+            watcher.start()
+            self.assertEqual(len(transport.streams), 300)  # Uma conexão para todos os símbolos
+
+            def tick(i, bid):
+                transport.publish(f"c{i:03d}brl@bookTicker", {"s": f"C{i:03d}BRL", "b": str(bid), "a": str(bid + 0.1)})
+
+            tick(3, 50.0)    # Sem posição: ignorado
+            tick(7, 98.0)    # Entre o stop e a compra: nada
+            tick(7, 120.0)   # Sem alvo de lucro configurado: nada
+            tick(7, 94.0)
+            tick(7, 93.0)    # Venda já enfileirada: não duplica
+            tick(9, 102.0)   # Abaixo do alvo (3%): nada
+            tick(9, 103.5)
+            deadline = time.time() + 5
+            while len(sold) < 2 and time.time() < deadline:
+                time.sleep(0.01)
+            pool.shutdown()
+            self.assertEqual(sorted(sold), [(7, 94.0), (9, 103.5)])
+            self.assertEqual(watcher.last_prices["C003BRL"], 50.0)
+        finally:
+            watcher.stop()
+            pool.shutdown(wait=False)
+
+
+class TestOrderBook(unittest.TestCase):
+    def test_snapshot_diffs_gap_recovery_and_fill_price(self):
+        """Snapshot + diferenças em sequência; um buraco recarrega o snapshot"""
+        snapshots = [
+            {"lastUpdateId": 100, "bids": [["99.0", "1.0"], ["98.0", "2.0"]], "asks": [["101.0", "1.0"], ["102.0", "3.0"]]},
+            {"lastUpdateId": 200, "bids": [["97.0", "5.0"]], "asks": [["103.0", "5.0"]]},
+        ]
+        client = SimpleNamespace(get_order_book=lambda symbol, limit: snapshots.pop(0))
+        transport = LocalStreamTransport()
+        feed = OrderBookFeed(client, transport=transport)
+        book = feed.book("BTCBRL")
+        feed.start()
+
+        def diff(first, last, bids=(), asks=()):
+            transport.publish("btcbrl@depth@100ms", {"e": "depthUpdate", "s": "BTCBRL", "U": first, "u": last,
+                                                       "b": list(bids), "a": list(asks)})
+
+        def wait_synced():
+            deadline = time.time() + 5
+            while not book.synced and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(book.synced)
+
+        try:
+            diff(95, 101, bids=[["99.5", "0.5"]])    # Em buffer até o snapshot; cobre o lastUpdateId + 1
+            wait_synced()
+            diff(102, 102, asks=[["101.0", "0"], ["101.5", "0.4"]])
+            self.assertEqual((book.best_bid(), book.best_ask(), book.spread()), (99.5, 101.5, 2.0))
+            self.assertEqual(book.top(2), ([(99.5, 0.5), (99.0, 1.0)], [(101.5, 0.4), (102.0, 3.0)]))
+            self.assertEqual(book.price_to_fill("BUY", 1.0), 102.0)
+            self.assertEqual(book.price_to_fill("SELL", 1.2), 99.0)
+            self.assertIsNone(book.price_to_fill("BUY", 10))
+
+            diff(150, 201)                            # Buraco (103..149): volta ao snapshot
+            self.assertIsNone(book.best_bid())
+            wait_synced()
+            self.assertEqual((book.best_bid(), book.best_ask(), book.last_update_id), (97.0, 103.0, 201))
+        finally:
+            feed.stop()
+
+    def test_first_live_event_bridges_snapshot(self):
+        """O primeiro evento depois do snapshot pode começar antes do lastUpdateId; os seguintes, não"""
+        book = OrderBook("BTCBRL", client=None)
+        book.load_snapshot({"lastUpdateId": 105, "bids": [["99.0", "1.0"]], "asks": [["101.0", "1.0"]]})
+        book.on_event({"U": 101, "u": 110, "b": [["99.5", "0.5"]], "a": []})
+        self.assertTrue(book.synced)
+        self.assertEqual((book.best_bid(), book.last_update_id), (99.5, 110))
+        book.on_event({"U": 111, "u": 112, "b": [], "a": [["100.5", "2.0"]]})
+        self.assertEqual((book.best_ask(), book.last_update_id), (100.5, 112))
+
+        book._loading = True  # Sem snapshot novo: só confere que o buraco derruba o livro
+        book.on_event({"U": 120, "u": 125, "b": [], "a": []})
+        self.assertFalse(book.synced)
+
+
+class TestPortfolioAllocator(unittest.TestCase):
+    def test_sizes_from_one_snapshot_under_balance_and_asset_limits(self):
+        """Uma consulta de conta e de preços dimensiona todos os bots, sem passar do saldo livre"""
+        calls = []
+        account = {"balances": [{"asset": "BRL", "free": "600", "locked": "0"},
+                                {"asset": "ETH", "free": "2", "locked": "0"}]}
+        client = SimpleNamespace(
+            get_account=lambda: calls.append("account") or account,
+            get_all_tickers=lambda: calls.append("tickers") or [{"symbol": "BTCBRL", "price": "100"},
+                                                                 {"symbol": "ETHBRL", "price": "200"},
+                                                                 {"symbol": "SOLBRL", "price": "10"}])
+
+        def bot(stock, percentage, position=False):
+            return SimpleNamespace(stock_code=stock, operation_code=f"{stock}BRL", traded_percentage=percentage,
+                                   step_size=0.001, actual_trade_position=position)
+
+        allocator = PortfolioAllocator(client, max_asset_percentage=30)
+        # O ETH tem saldo (mesmo com o bot marcado como vendido); o SOL está marcado como comprado, mas sem saldo
+        for item in (bot("BTC", 50), bot("ETH", 50), bot("SOL", 20, position=True)):
+            allocator.add(item)
+        self.assertIs(allocator.accountSnapshot(), allocator.accountSnapshot())
+        self.assertEqual(calls, ["account", "tickers"])
+        # Patrimônio 1000 BRL: BTC quer 30% (teto) e SOL 20% = 500, mas só há 600 livres -> cabem os dois
+        self.assertEqual(allocator.size("BTCBRL"), 3.0)
+        self.assertEqual(allocator.size("SOLBRL"), 20.0)
+        self.assertEqual(allocator.size("ETHBRL"), 0.0)   # Já comprado pelo saldo do snapshot
+
+        account["balances"][0]["free"] = "250"           # Saldo menor: as compras encolhem na mesma proporção
+        allocator.invalidate()
+        allocator.accountSnapshot()
+        self.assertAlmostEqual(allocator.size("BTCBRL"), 1.5)
+        self.assertAlmostEqual(allocator.size("SOLBRL"), 10.0)
+
+
+
+class TestAssetConfig(unittest.TestCase):
+    def test_validates_file_and_reloads_only_changed_assets(self):
+        """O arquivo é validado contra o AssetStartModel e o exchangeInfo, e a recarga informa só as diferenças"""
+        import tempfile
+        from modules.AssetConfig import AssetConfigWatcher, ConfigError, load_assets, validate_symbols
+        symbols = {"BTCBRL": {"symbol": "BTCBRL", "status": "TRADING", "baseAsset": "BTC"},
+                   "ETHBRL": {"symbol": "ETHBRL", "status": "TRADING", "baseAsset": "ETH"}}
+        base = '[defaults]\ncandlePeriod = "1h"\nstopLossPercentage = 2\n\n'
+        btc = '[[assets]]\nstockCode = "BTC"\noperationCode = "BTCBRL"\ntradedQuantity = 0.01\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "assets.toml")
+            with open(path, "w") as file:
+                file.write(base + btc + '[[assets]]\nstockCode = "BNB"\noperationCode = "BNRBRL"\ntradedQuantity = "x"\nstopLoss = 1\n')
+            with self.assertRaises(ConfigError) as error:
+                load_assets(path)
+            self.assertEqual(len(error.exception.problems), 3)  # Campo desconhecido, tipo errado e par que não começa por BNB
+
+            with open(path, "w") as file:
+                file.write(base + btc + '[[assets]]\nstockCode = "ETH"\noperationCode = "ETHBRRL"\ntradedQuantity = 0.03\n')
+            with self.assertRaises(ConfigError):
+                validate_symbols(load_assets(path), symbols.get)
+
+            with open(path, "w") as file:
+                file.write(base + btc)
+            assets = validate_symbols(load_assets(path), symbols.get)
+            self.assertEqual((assets[0].candlePeriod, assets[0].stopLossPercentage), ("1h", 2))
+
+            changes = []
+            watcher = AssetConfigWatcher(path, assets, lambda *diff: changes.append(diff), lookup=symbols.get)
+            with open(path, "w") as file:
+                file.write(base + btc.replace("0.01", "0.02") + '[[assets]]\nstockCode = "ETH"\noperationCode = "ETHBRL"\ntradedQuantity = 0.03\n')
+            os.utime(path, ns=(time.time_ns(), time.time_ns() + 10**9))
+            added, removed, changed = watcher.check()
+            self.assertEqual(([a.operationCode for a in added], removed, [a.tradedQuantity for a in changed]), (["ETHBRL"], [], [0.02]))
+            with open(path, "w") as file:
+                file.write("assets = [")  # Arquivo quebrado: mantém a configuração anterior
+            self.assertIsNone(watcher.check())
+            self.assertEqual(sorted(watcher.assets), ["BTCBRL", "ETHBRL"])
+            self.assertEqual(len(changes), 1)
+
+
+class TestUniverseDiscovery(unittest.TestCase):
+    def test_selects_liquid_pairs_and_sizes_from_filters(self):
+        """Uma consulta de exchangeInfo e uma de ticker 24h: filtra por cotação, status, volume e spread"""
+        from backtest import build_symbol_info
+        from modules.ExchangeInfoCache import ExchangeInfoCache
+        from modules.UniverseDiscovery import UniverseDiscovery
+        symbols = [build_symbol_info("BTCBRL", "BTC", "BRL", tick_size=1, step_size=0.00001, min_notional=10),
+                   build_symbol_info("ETHBRL", "ETH", "BRL", tick_size=0.01, step_size=0.0001, min_notional=10),
+                   build_symbol_info("DOGEBRL", "DOGE", "BRL", tick_size=0.0001, step_size=1, min_notional=10),
+                   build_symbol_info("XRPBRL", "XRP", "BRL", tick_size=0.0001, step_size=1, min_notional=10),
+                   build_symbol_info("BTCUSDT", "BTC", "USDT", tick_size=0.01, step_size=0.00001)]
+        symbols[3]["status"] = "BREAK"
+
+        def ticker(symbol, last, bid, ask, volume):
+            return {"symbol": symbol, "lastPrice": str(last), "bidPrice": str(bid), "askPrice": str(ask), "quoteVolume": str(volume)}
+
+        calls = []
+        client = SimpleNamespace(
+            get_exchange_info=lambda: calls.append("exchangeInfo") or {"symbols": symbols},
+            get_ticker=lambda: calls.append("ticker") or [
+                ticker("BTCBRL", 350000, 349990, 350010, 5_000_000), ticker("ETHBRL", 17000, 16990, 17010, 800_000),
+                ticker("DOGEBRL", 0.9, 0.88, 0.92, 900_000), ticker("XRPBRL", 3, 2.99, 3.01, 2_000_000),
+                ticker("BTCUSDT", 60000, 59999, 60001, 9_000_000_000)])
+        cache = ExchangeInfoCache()
+        discovery = UniverseDiscovery(client, cache, quote_asset="BRL", min_quote_volume=500_000,
+                                      max_spread_percentage=0.5, order_value=50, defaults={"candlePeriod": "4h"})
+        added, removed, changed = discovery.refresh()
+
+        self.assertEqual(calls, ["exchangeInfo", "ticker"])
+        self.assertEqual([asset.operationCode for asset in added], ["BTCBRL", "ETHBRL"])  # DOGE: spread; XRP: fora de negociação
+        self.assertEqual([asset.tradedQuantity for asset in added], [0.00015, 0.003])       # 50 BRL com teto no step
+        self.assertEqual(added[0].candlePeriod, "4h")
+        self.assertIsNotNone(cache.get("DOGEBRL"))  # Os bots criados depois encontram o exchangeInfo no cache
+
+        discovery.min_quote_volume = 1_000_000
+        added, removed, changed = discovery.refresh(keep=lambda code: False)
+        self.assertEqual(([a.operationCode for a in added], [a.operationCode for a in removed], changed), ([], ["ETHBRL"], []))
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,49 @@
+import unittest
+import sys
+import os
+from unittest import mock
+
+# Adiciona o diretório src ao path para poder importar os módulos
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Models.AssetStartModel import AssetStartModel
+from modules.ShardCoordinator import ShardCoordinator, ShardRegistry
+
+
+class TestShardRegistry(unittest.TestCase):
+    def test_rebalance_and_handoff(self):
+        """Ativos são divididos entre os workers e só mudam de dono depois de soltos"""
+        assets = [AssetStartModel(f"C{i}", f"C{i}BRL", 1, "1h") for i in range(5)]
+        registry = ShardRegistry(assets)
+        registry.register("a")
+        self.assertEqual(len(registry.heartbeat("a")), 5)
+
+        registry.register("b")
+        self.assertEqual(registry.heartbeat("b"), [])         # "a" ainda não soltou os ativos movidos
+        self.assertEqual(len(registry.heartbeat("a")), 3)
+        self.assertEqual(len(registry.heartbeat("b")), 2)
+
+        # Um ativo movido ainda agendado (execução em andamento) não é entregue até sair do `holding`
+        registry.register("c")
+        moved = [code for code, owner in registry.releasing.items()]
+        held = [asset.operationCode for asset in registry.heartbeat("a", holding=[f"C{i}BRL" for i in range(5)])]
+        self.assertEqual(registry.heartbeat("c"), [])
+        registry.heartbeat("a", holding=held)
+        self.assertEqual([asset.operationCode for asset in registry.heartbeat("c")], moved)
+        registry.remove("c")
+
+        registry.remove("a")                                   # Worker morto: tudo vai para "b"
+        self.assertEqual(len(registry.heartbeat("b")), 5)
+        self.assertIsNone(registry.heartbeat("a"))
+
+    def test_address_and_authkey_from_settings(self):
+        """Endereço "HOST:PORTA" e chave configuráveis; sem chave, uma aleatória por execução"""
+        assets = [AssetStartModel("C0", "C0BRL", 1, "1h")]
+        coordinator = ShardCoordinator(assets, workers=1, address="0.0.0.0:6000", authkey="segredo")
+        self.assertEqual((coordinator.address, coordinator.authkey), (("0.0.0.0", 6000), b"segredo"))
+        with mock.patch.dict(os.environ, {"SHARD_AUTHKEY": ""}):
+            self.assertEqual(len(ShardCoordinator(assets, workers=1).authkey), 16)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)